@@ -0,0 +1,120 @@
+"""
+Index registry for the TaskFlow database
+
+Kept apart from server.py so scripts and tests can read or apply the index
+specification without importing the application (its clients, blob store
+and startup hooks).
+"""
+
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Index registry: every query a handler issues must be served by one of these.
+# ensure_indexes runs at startup and from scripts/init_db.py; createIndexes is
+# a no-op for an index that already exists with the same definition.
+INDEXES = {
+    "organizations": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("subdomain", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING)]),
+        IndexModel([("role", ASCENDING), ("organization_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "projects": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "stories": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("project_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel(
+            [("organization_id", ASCENDING), ("title", TEXT), ("description", TEXT), ("brd", TEXT), ("prd", TEXT)],
+            weights={"title": 10, "description": 3, "brd": 1, "prd": 1}, name="stories_text"
+        ),
+    ],
+    "tasks": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("assigned_to", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("project_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("story_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("start_date", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("end_date", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("target_date", ASCENDING)]),
+        IndexModel(
+            [("organization_id", ASCENDING), ("title", TEXT), ("description", TEXT)],
+            weights={"title": 10, "description": 1}, name="tasks_text"
+        ),
+    ],
+    "comments": [
+        IndexModel([("task_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "team_members": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("email", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "departments": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "action_history": [
+        IndexModel([("organization_id", ASCENDING)]),
+        IndexModel([("organization_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("entity_type", ASCENDING), ("entity_id", ASCENDING)]),
+    ],
+    "analytics_snapshots": [
+        IndexModel([("organization_id", ASCENDING), ("project_id", ASCENDING), ("day", ASCENDING)], unique=True),
+        IndexModel([("organization_id", ASCENDING), ("day", DESCENDING)]),
+    ],
+    "blobs": [
+        IndexModel([("sha256", ASCENDING)], unique=True),
+    ],
+    "collection_versions": [
+        IndexModel([("organization_id", ASCENDING)], unique=True),
+    ],
+    "document_versions": [
+        IndexModel([("organization_id", ASCENDING), ("collection", ASCENDING), ("id", ASCENDING)], unique=True),
+    ],
+    "dashboard_counters": [
+        IndexModel([("organization_id", ASCENDING)], unique=True),
+    ],
+    "task_events": [
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=3600),
+    ],
+    "roles": [IndexModel([("level", ASCENDING)])],
+    "statuses": [IndexModel([("order", ASCENDING)])],
+    "priorities": [IndexModel([("level", ASCENDING)])],
+    "task_types": [IndexModel([("name", ASCENDING)])],
+    "department_templates": [IndexModel([("name", ASCENDING)])],
+}
+
+# Indexes are created one at a time so a single conflict (an existing index
+# with different options, or duplicates blocking a unique index) is logged
+# without stopping the rest.
+async def ensure_indexes(database) -> dict:
+    failed = {}
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await database[collection].create_indexes([index])
+            except OperationFailure as e:
+                failed[f"{collection}.{index.document['name']}"] = str(e)
+                logger.error("Could not create index %s on %s: %s", index.document['name'], collection, e)
+    return failed
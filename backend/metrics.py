@@ -0,0 +1,364 @@
+"""
+Prometheus metrics for the TaskFlow API
+
+A small in-process registry rendered in the Prometheus text exposition
+format, so no client library is needed. Histograms use fixed buckets and
+labels are bounded (route templates, collection and command names), which
+keeps recording to a bisect and a counter bump under a per-metric lock.
+Updates may come from driver threads: pymongo calls command listeners on
+whichever thread ran the command.
+
+MetricsMiddleware records request latency per route template and the number
+of requests in flight. CommandMetrics is a pymongo CommandListener recording
+database command latency per collection and command; observe_event takes the
+CommandEvents the memory storage backend sends to its listeners.
+
+CommandBudget counts the commands each HTTP request issues through a context
+variable (Motor copies the context onto its executor threads, so driver
+events land on the right request). CommandBudgetMiddleware logs requests
+that go over the budget or repeat a command in a loop.
+"""
+
+import collections
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = [(labels, self._snapshot(value)) for labels, value in self._series.items()]
+        for labels, value in sorted(series):
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _snapshot(self, value):
+        return value
+
+    def _samples(self, labels: tuple, value) -> list:
+        return [f"{self.name}{label_text(self.labelnames, labels)} {format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        # Unlabelled series exist from the start, so they scrape as 0 rather than absent
+        if not self.labelnames:
+            self._series[()] = 0
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+        if not self.labelnames:
+            self._series[()] = 0
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple = (), value: float = 0):
+        with self._lock:
+            self._series[labels] = value
+
+    def set_function(self, function):
+        """Sample the unlabelled value from function() each time the gauge renders"""
+        self._function = function
+
+    def render(self) -> list:
+        if self._function is not None:
+            self.set((), self._function())
+        return super().render()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: tuple, value: float):
+        # Per-bucket counts (not cumulative) followed by the sum; render adds them up
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _snapshot(self, value):
+        return list(value)
+
+    def _samples(self, labels: tuple, value) -> list:
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value):
+            total += count
+            le = f'le="{format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{label_text(self.labelnames, labels, le)} {total}")
+        lines.append(f"{self.name}_sum{label_text(self.labelnames, labels)} {format_value(value[-1])}")
+        lines.append(f"{self.name}_count{label_text(self.labelnames, labels)} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics; asking for an existing name returns the registered metric"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = HTTP_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request under its route template
+
+    Requests no route matched share the "unmatched" label, so scanners probing
+    random paths cannot grow the registry.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+        )
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+        )
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight.dec()
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            self.duration.observe(labels, elapsed)
+            self.requests.inc(labels + (str(status),))
+
+
+def command_collection(event) -> str:
+    """Collection a pymongo CommandStartedEvent targets, "" for database commands"""
+    name = event.command_name
+    target = event.command.get("collection" if name == "getMore" else name)
+    return target if isinstance(target, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Database command latency and failures per collection and command"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.duration = registry.histogram(
+            "mongodb_command_duration_seconds", "Database command latency by collection and command",
+            ("collection", "command"), COMMAND_BUCKETS
+        )
+        self.failures = registry.counter(
+            "mongodb_command_failures_total", "Failed database commands by collection and command",
+            ("collection", "command")
+        )
+        # started() is the only event carrying the command, so the collection
+        # is remembered until the matching succeeded/failed event
+        self._collections = {}
+
+    def observe(self, collection: str, command: str, duration: float, succeeded: bool):
+        labels = (collection, command)
+        self.duration.observe(labels, duration)
+        if not succeeded:
+            self.failures.inc(labels)
+
+    def observe_event(self, event):
+        """Listener for MemoryClient.listeners"""
+        self.observe(event.collection, event.command_name, event.duration, event.succeeded)
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def _finish(self, event, succeeded: bool):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        self.observe(collection, event.command_name, event.duration_micros / 1e6, succeeded)
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+# Cursor batches scale with the result size rather than with the code path,
+# and session cleanup is driver housekeeping; neither counts against a request
+UNCOUNTED_COMMANDS = {"getMore", "killCursors", "endSessions"}
+
+# (collection, command) pairs issued by the current request; None outside one
+request_commands = contextvars.ContextVar("request_commands", default=None)
+
+
+class CommandBudget(monitoring.CommandListener):
+    """Per-request database command counter
+
+    Requests issuing more than limit commands, or the same command on the
+    same collection more than repeat_limit times (the N+1 pattern), are
+    logged with a breakdown. 0 disables either check. With header set,
+    responses report the count so far in X-DB-Commands.
+    """
+
+    def __init__(self, limit: int, repeat_limit: int, header: bool = False):
+        self.limit = limit
+        self.repeat_limit = repeat_limit
+        self.header = header
+
+    def count(self, collection: str, command: str):
+        commands = request_commands.get()
+        if commands is not None and command not in UNCOUNTED_COMMANDS:
+            # list.append is atomic, so concurrent driver threads need no lock
+            commands.append((collection, command))
+
+    def observe_event(self, event):
+        """Listener for MemoryClient.listeners"""
+        self.count(event.collection, event.command_name)
+
+    def started(self, event):
+        self.count(command_collection(event), event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def check(self, method: str, route: str, commands: list):
+        if not commands:
+            return
+        counts = collections.Counter(f"{collection}.{command}" if collection else command for collection, command in commands)
+        breakdown = ", ".join(f"{name} x{count}" for name, count in counts.most_common())
+        if self.limit and len(commands) > self.limit:
+            logger.warning("%s %s issued %d database commands, over the budget of %d: %s",
+                           method, route, len(commands), self.limit, breakdown)
+        if self.repeat_limit:
+            name, count = counts.most_common(1)[0]
+            if count > self.repeat_limit:
+                logger.warning("%s %s issued %s %d times in one request (possible N+1): %s",
+                               method, route, name, count, breakdown)
+
+
+class CommandBudgetMiddleware:
+    """ASGI middleware giving each HTTP request its own command count"""
+
+    def __init__(self, app, budget: CommandBudget):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        commands = []
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start" and self.budget.header:
+                # Streaming responses only count what ran before the body started
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-commands", str(len(commands)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_commands.set(commands)
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            request_commands.reset(token)
+            route = scope.get("route")
+            self.budget.check(scope["method"], route.path if route is not None else scope["path"], commands)
@@ -0,0 +1,31 @@
+"""
+Password hashing primitives for TaskFlow
+
+Synchronous bcrypt helpers, free of application state so scripts can hash
+passwords without importing server.py. server.py runs them on its bounded
+hashing thread pool.
+"""
+
+import hashlib
+import hmac
+import os
+
+import bcrypt
+
+# Raising BCRYPT_ROUNDS re-hashes stored passwords on each user's next login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# Older releases stored unsalted SHA-256 hex digests
+def is_legacy_hash(hashed: str) -> bool:
+    return not hashed.startswith("$2")
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    if is_legacy_hash(hashed):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+def password_needs_rehash(hashed: str) -> bool:
+    return is_legacy_hash(hashed) or int(hashed.split("$")[2]) != BCRYPT_ROUNDS
@@ -1,24 +1,145 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Header, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Header, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 import os
 import logging
 from pathlib import Path
+from urllib.parse import quote
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date, timedelta
 import base64
 import hashlib
+import re
+import json
+import csv
+import io
+import asyncio
+import time
+import weakref
+from functools import lru_cache
+from collections import OrderedDict
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import CommandBudget, CommandBudgetMiddleware, CommandMetrics, Counter, MetricsMiddleware, MetricsRegistry
+from storage import MemoryClient
+from indexes import ensure_indexes as apply_indexes
+from passwords import hash_password_sync, password_needs_rehash, verify_password_sync
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage backend: "mongo" talks to MONGO_URL through Motor; "memory" keeps
+# every collection in this process (storage.py) and snapshots changed
+# collections to STORAGE_SNAPSHOT_DIR every STORAGE_SNAPSHOT_INTERVAL seconds
+# and on shutdown. Memory mode is single-process: run one worker.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+STORAGE_SNAPSHOT_DIR = os.environ.get('STORAGE_SNAPSHOT_DIR', str(ROOT_DIR / 'data'))
+STORAGE_SNAPSHOT_INTERVAL = float(os.environ.get('STORAGE_SNAPSHOT_INTERVAL', '30'))
+
+# Prometheus metrics served at /api/metrics: request latency per route from
+# MetricsMiddleware, and database command latency per collection from a
+# driver command listener (or the memory backend's listener hook).
+metrics = MetricsRegistry()
+command_metrics = CommandMetrics(metrics)
+
+# Query budget: every request counts the database commands it issues. Requests
+# over QUERY_BUDGET commands, or repeating one command on one collection more
+# than QUERY_REPEAT_LIMIT times (an N+1 loop), are logged with a breakdown;
+# 0 disables a check. DEBUG adds the count to responses as X-DB-Commands.
+QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', '10'))
+QUERY_REPEAT_LIMIT = int(os.environ.get('QUERY_REPEAT_LIMIT', '5'))
+DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
+command_budget = CommandBudget(QUERY_BUDGET, QUERY_REPEAT_LIMIT, header=DEBUG)
+
+if STORAGE_BACKEND == "memory":
+    client = MemoryClient(STORAGE_SNAPSHOT_DIR or None, STORAGE_SNAPSHOT_INTERVAL)
+    client.listeners.extend([command_metrics.observe_event, command_budget.observe_event])
+    db = client[os.environ.get('DB_NAME', 'taskflow')]
+else:
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[command_metrics, command_budget])
+    db = client[os.environ['DB_NAME']]
+
+# Dashboard counters: when enabled, mutation handlers keep a per-org
+# counters document up to date so /dashboard/stats is a single find_one.
+DASHBOARD_COUNTERS_ENABLED = os.environ.get('DASHBOARD_COUNTERS', 'false').lower() == 'true'
+DASHBOARD_RECONCILE_ATTEMPTS = 5
+
+# Keyset pagination for list endpoints: pages hold DEFAULT_PAGE_SIZE rows
+# unless ?limit= asks for more, up to MAX_PAGE_SIZE
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# List endpoints return stored documents as-is through orjson instead of
+# re-validating every row against the response model
+FAST_LIST_RESPONSES = os.environ.get('FAST_LIST_RESPONSES', 'true').lower() == 'true'
+
+# Audit logging: "strict" (the default) awaits every action_history insert;
+# "batched" opts in to queueing entries and writing them with insert_many in
+# the background, trading durability of the last flush interval for request
+# latency. Organizations listed in AUDIT_STRICT_ORGS are always written
+# synchronously. The queue's depth, drops and flush latency are exported on
+# /api/metrics as the audit_* series.
+AUDIT_MODE = os.environ.get('AUDIT_MODE', 'strict').lower()
+AUDIT_STRICT_ORGS = {o for o in os.environ.get('AUDIT_STRICT_ORGS', '').split(',') if o}
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', '0.5'))
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_ENQUEUE_TIMEOUT = float(os.environ.get('AUDIT_ENQUEUE_TIMEOUT', '1.0'))
+
+# Maximum number of tasks accepted by the bulk endpoints
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '500'))
+
+# Attachment blobs are stored once per SHA-256 digest under BLOB_STORAGE_DIR
+BLOB_STORAGE_DIR = Path(os.environ.get('BLOB_STORAGE_DIR', ROOT_DIR / 'blobs'))
+BLOB_CHUNK_SIZE = 1024 * 1024
+MAX_ATTACHMENT_SIZE = int(os.environ.get('MAX_ATTACHMENT_SIZE', str(100 * 1024 * 1024)))
+MAX_LOGO_SIZE = int(os.environ.get('MAX_LOGO_SIZE', str(5 * 1024 * 1024)))
+
+# In-process caches for rarely-changing data. Invalidation is local to the
+# worker, so the TTL bounds how stale other workers can be. Hits, misses,
+# evictions and size are exported per cache as the cache_* metrics.
+ORG_CACHE_TTL = float(os.environ.get('ORG_CACHE_TTL', '300'))
+MASTER_DATA_CACHE_TTL = float(os.environ.get('MASTER_DATA_CACHE_TTL', '3600'))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))
+
+# Task change feed: "local" fans events out inside this process only;
+# "mongo" publishes through the task_events collection and every worker
+# tails it with a change stream (requires a replica set). Open streams and
+# events dropped from slow subscribers are exported as the stream_* metrics.
+EVENT_BACKEND = os.environ.get('EVENT_BACKEND', 'local').lower()
+EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', '100'))
+EVENT_KEEPALIVE_SECONDS = float(os.environ.get('EVENT_KEEPALIVE_SECONDS', '15'))
+
+# Analytics snapshots: a background job rolls each organization's tasks up
+# into one document per project per day for the burndown and cumulative-flow
+# charts. Every worker runs it; writes are idempotent upserts. 0 disables.
+# Runs, failures, snapshots written and the last run time are exported as the
+# analytics_snapshot_* metrics.
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.environ.get('ANALYTICS_SNAPSHOT_INTERVAL', '3600'))
+ANALYTICS_DEFAULT_DAYS = 30
+
+# Password hashing: bcrypt (cost BCRYPT_ROUNDS, see passwords.py) runs on a
+# small dedicated thread pool so a burst of logins queues there instead of
+# stalling the event loop. Callers wait for a free worker for up to PASSWORD_HASH_TIMEOUT seconds and
+# only get 503 (with Retry-After) when that wait runs out. At rounds 12 a hash
+# takes roughly 250ms, so 4 workers sustain about 16 hashes/s and the default
+# 10s wait absorbs a burst of about 160 logins beyond that rate.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+
+# Search is served by per-organization text indexes on tasks and stories.
+# Results are ranked by text score, so paging follows an opaque offset cursor
+# (X-Next-Cursor, as on the list endpoints) and stops at SEARCH_MAX_OFFSET.
+SEARCH_MAX_OFFSET = 1000
+SEARCH_SNIPPET_LENGTH = 160
 
 # Create the main app
 app = FastAPI()
@@ -30,7 +151,8 @@ class Organization(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     subdomain: str
-    logo: str = ""  # Base64 encoded logo
+    logo: str = ""  # URL of the logo served by /organizations/{id}/logo
+    logo_hash: str = ""
     theme: dict = {
         "primaryColor": "#1E40AF",
         "secondaryColor": "#3B82F6",
@@ -70,6 +192,18 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
 
+# What the API returns for a user: never the password hash
+class UserPublic(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    email: str
+    role: str = "Developer"
+    organization_id: Optional[str] = None
+    avatar: str = ""
+    created_at: datetime
+    is_active: bool = True
+
 class UserCreate(BaseModel):
     name: str
     email: str
@@ -147,6 +281,16 @@ class StoryUpdate(BaseModel):
     prd: Optional[str] = None
     priority: Optional[str] = None
 
+class Attachment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int
+    sha256: str
+    uploaded_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
 class Task(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -155,8 +299,8 @@ class Task(BaseModel):
     story_id: Optional[str] = None
     title: str
     description: str
-    attachments: List[str] = []
-    comments: List[dict] = []
+    attachments: List[Attachment] = []
+    comment_count: int = 0
     assigned_to: Optional[str] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
@@ -167,6 +311,7 @@ class Task(BaseModel):
     status: str = "TODO"
     team: str = "Development"
     linked_tasks: List[str] = []
+    version: int = 0
     created_by: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -200,11 +345,29 @@ class TaskUpdate(BaseModel):
     team: Optional[str] = None
     linked_tasks: Optional[List[str]] = None
 
+class TaskBulkUpdateItem(TaskUpdate):
+    id: str
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
 class CommentCreate(BaseModel):
     task_id: str
     user: str
     text: str
 
+class Comment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    organization_id: str
+    task_id: str
+    user: str
+    text: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
 class TeamMember(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -245,11 +408,45 @@ class DepartmentCreate(BaseModel):
     color: str = "#3B82F6"
 
 # Helper functions
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == hashed
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+# One semaphore per event loop, created on first use; it holds a slot per
+# worker so queued jobs wait here, where the wait can time out
+password_slots = weakref.WeakKeyDictionary()
+
+async def run_password_job(func, *args):
+    loop = asyncio.get_running_loop()
+    slots = password_slots.get(loop)
+    if slots is None:
+        slots = password_slots[loop] = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+    try:
+        await asyncio.wait_for(slots.acquire(), PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many password checks in progress; retry shortly", headers={"Retry-After": "1"})
+    try:
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        slots.release()
+
+async def hash_password(password: str) -> str:
+    return await run_password_job(hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await run_password_job(verify_password_sync, password, hashed)
+
+# Upgrade a legacy or outdated hash while the plaintext is at hand. Best
+# effort: when every hashing worker is busy the upgrade waits for a later
+# login rather than adding a second hash to this one's latency.
+async def upgrade_password_hash(user: dict, password: str):
+    slots = password_slots.get(asyncio.get_running_loop())
+    if slots is not None and slots.locked():
+        logger.info("Hashing pool busy, deferring password upgrade for user %s", user['id'])
+        return
+    try:
+        hashed = await hash_password(password)
+    except HTTPException:
+        logger.info("Hashing pool busy, deferring password upgrade for user %s", user['id'])
+        return
+    await db.users.update_one({"id": user['id'], "password": user['password']}, {"$set": {"password": hashed}})
 
 async def get_organization_id(x_organization_id: Optional[str] = Header(None)) -> str:
     if not x_organization_id or x_organization_id == "null":
@@ -257,10 +454,8 @@ async def get_organization_id(x_organization_id: Optional[str] = Header(None)) -
         return "null"
     return x_organization_id
 
-async def log_action(org_id: str, user: str, action: str, entity_type: str, entity_id: str, entity_name: str, details: dict = {}):
-    if org_id == "null":
-        return
-    action_log = ActionHistory(
+def action_entry(org_id: str, user: str, action: str, entity_type: str, entity_id: str, entity_name: str, details: dict = {}) -> dict:
+    return ActionHistory(
         organization_id=org_id,
         user=user,
         action=action,
@@ -268,10 +463,800 @@ async def log_action(org_id: str, user: str, action: str, entity_type: str, enti
         entity_id=entity_id,
         entity_name=entity_name,
         details=details
+    ).model_dump()
+
+async def log_action(org_id: str, user: str, action: str, entity_type: str, entity_id: str, entity_name: str, details: dict = {}):
+    if org_id == "null":
+        return
+    await log_actions(org_id, [action_entry(org_id, user, action, entity_type, entity_id, entity_name, details)])
+
+async def log_actions(org_id: str, entries: List[dict]):
+    if org_id == "null" or not entries:
+        return
+    if AUDIT_MODE == "strict" or org_id in AUDIT_STRICT_ORGS or not audit_queue.running:
+        if len(entries) == 1:
+            await db.action_history.insert_one(entries[0])
+        else:
+            await db.action_history.insert_many(entries, ordered=False)
+    else:
+        for entry in entries:
+            await audit_queue.put(entry)
+
+class AuditQueue:
+    def __init__(self, batch_size: int, flush_interval: float, max_size: int, enqueue_timeout: float, registry: MetricsRegistry):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.enqueue_timeout = enqueue_timeout
+        self.entries = registry.counter("audit_entries_total", "Audit entries by what happened to them", ("outcome",))
+        self.flush_duration = registry.histogram("audit_flush_duration_seconds", "Audit batch insert latency")
+        registry.gauge("audit_queue_depth", "Audit entries waiting to be written").set_function(
+            lambda: self._queue.qsize() if self._queue else 0
+        )
+        registry.gauge("audit_queue_capacity", "Audit entries the queue holds before producers wait").set((), max_size)
+        self._queue = None
+        self._worker = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done() and not self._closing
+
+    def start(self):
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def put(self, doc: dict):
+        # Producers wait for room up to enqueue_timeout; past that the entry is
+        # dropped rather than stalling the request indefinitely.
+        try:
+            await asyncio.wait_for(self._queue.put(doc), self.enqueue_timeout)
+            self.entries.inc(("enqueued",))
+        except asyncio.TimeoutError:
+            self.entries.inc(("dropped",))
+            logger.warning("Audit queue full, dropped %s entry for %s", doc['action'], doc['entity_id'])
+
+    async def drain(self):
+        if self._worker is None:
+            return
+        self._closing = True
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            doc = await self._queue.get()
+            if doc is None:
+                break
+            batch = [doc]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if doc is None:
+                    stopping = True
+                    break
+                batch.append(doc)
+            await self._write(batch)
+
+    async def _write(self, batch: list):
+        started = time.perf_counter()
+        try:
+            await db.action_history.insert_many(batch, ordered=False)
+            self.entries.inc(("written",), len(batch))
+        except Exception:
+            self.entries.inc(("dropped",), len(batch))
+            logger.exception("Failed to write %d audit entries", len(batch))
+        finally:
+            self.flush_duration.observe((), time.perf_counter() - started)
+
+audit_queue = AuditQueue(AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_QUEUE_SIZE, AUDIT_ENQUEUE_TIMEOUT, metrics)
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+# List endpoints page on a stable (created_at, id) sort, or (key, id) for
+# lists ordered by another field, newest first where descending is set. The
+# cursor is an opaque token for the last row returned and is handed back in
+# the X-Next-Cursor header, so response bodies stay plain lists.
+def encode_cursor(doc: dict, key: str = "created_at") -> str:
+    raw = json.dumps([doc[key], doc['id']], default=json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+async def paginate(collection, query: dict, projection: dict, limit: int, cursor: Optional[str], response: Response,
+                   key: str = "created_at", descending: bool = False) -> list:
+    after = "$lt" if descending else "$gt"
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        # ANDed rather than merged so a caller's own $or (or key filter) survives
+        query = {"$and": [query, {
+            key: {"$lte" if descending else "$gte": value},
+            "$or": [{key: {after: value}}, {key: value, "id": {after: last_id}}]
+        }]}
+    direction = DESCENDING if descending else ASCENDING
+    docs = await collection.find(query, projection).sort([(key, direction), ("id", direction)]).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], key)
+    return docs
+
+# Documents written by the handlers already have the response shape, so the
+# fast path skips response_model validation. To keep list rows identical to
+# the validated detail routes, reads project to the model's fields, static
+# defaults fill fields older documents predate (default_factory fields are
+# always written at creation), and UTC datetimes end in "Z" as pydantic
+# writes them. Headers set on the injected response (e.g.
+# X-Next-Cursor) are carried over.
+class ListJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+def model_projection(model) -> dict:
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+@lru_cache(maxsize=None)
+def model_defaults(model) -> dict:
+    return {
+        name: field.default for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+def list_response(docs: list, response: Response, model=None, trimmed: bool = False):
+    if not FAST_LIST_RESPONSES and not trimmed:
+        return docs
+    if model and not trimmed:
+        defaults = model_defaults(model)
+        docs = [{**defaults, **doc} for doc in docs]
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    return ListJSONResponse(docs, headers=headers)
+
+# Turns ?fields=a,b,c into a Mongo projection so unrequested fields never leave
+# the database. id and created_at are always returned because they key the
+# pagination cursor.
+def fields_projection(fields: Optional[str], model) -> dict:
+    if not fields:
+        return model_projection(model)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in requested}}
+
+# Conditional GET: every org keeps a version stamp per collection, and per
+# document for detail routes, that the mutation handlers replace on each
+# write. ETags are derived from the stamp and the request URL, so a client
+# that is current gets a 304 without the collection itself being queried.
+# Anything never written since stamps existed reads as version "0"; reads
+# never write a stamp.
+async def bump_collection_version(org_id: str, collection: str) -> str:
+    version = uuid.uuid4().hex
+    await db.collection_versions.update_one({"organization_id": org_id}, {"$set": {collection: version}}, upsert=True)
+    return version
+
+async def collection_version(org_id: str, collection: str) -> str:
+    doc = await db.collection_versions.find_one({"organization_id": org_id}, {"_id": 0, collection: 1})
+    return (doc or {}).get(collection) or "0"
+
+async def bump_document_version(org_id: str, collection: str, doc_id: str) -> str:
+    version = uuid.uuid4().hex
+    await db.document_versions.update_one(
+        {"organization_id": org_id, "collection": collection, "id": doc_id}, {"$set": {"version": version}}, upsert=True
     )
-    doc = action_log.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.action_history.insert_one(doc)
+    return version
+
+async def document_version(org_id: str, collection: str, doc_id: str) -> str:
+    doc = await db.document_versions.find_one({"organization_id": org_id, "collection": collection, "id": doc_id}, {"_id": 0, "version": 1})
+    return doc["version"] if doc else "0"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+# Detail routes pass the path parameter holding the document id, so their
+# ETag only changes when that document does
+def conditional_get(collection: str, id_param: Optional[str] = None):
+    async def check_etag(request: Request, response: Response, org_id: str = Depends(get_organization_id), if_none_match: Optional[str] = Header(None)) -> str:
+        if id_param:
+            version = await document_version(org_id, collection, request.path_params[id_param])
+        else:
+            version = await collection_version(org_id, collection)
+        key = f"{version}:{request.url.path}?{request.url.query}"
+        etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return etag
+    return check_etag
+
+# Counts every dashboard figure in a single round trip: tasks are unioned with
+# the other org-scoped collections and split by $facet.
+async def compute_dashboard_counts(org_id: str) -> dict:
+    def tagged(collection: str) -> dict:
+        return {"$project": {"_id": 0, "collection": {"$literal": collection}, "status": 1, "priority": 1}}
+
+    pipeline = [
+        {"$match": {"organization_id": org_id}},
+        tagged("tasks"),
+    ]
+    for collection in ("projects", "stories", "team_members"):
+        pipeline.append({"$unionWith": {
+            "coll": collection,
+            "pipeline": [{"$match": {"organization_id": org_id}}, tagged(collection)]
+        }})
+    pipeline.append({"$facet": {
+        "collections": [{"$group": {"_id": "$collection", "count": {"$sum": 1}}}],
+        "status": [{"$match": {"collection": "tasks"}}, {"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+        "priority": [{"$match": {"collection": "tasks"}}, {"$group": {"_id": "$priority", "count": {"$sum": 1}}}]
+    }})
+    result = await db.tasks.aggregate(pipeline).to_list(1)
+    facets = result[0] if result else {}
+    counts = {name: 0 for name in ("projects", "tasks", "stories", "team_members")}
+    counts.update({row['_id']: row['count'] for row in facets.get('collections', [])})
+    counts['status'] = {row['_id']: row['count'] for row in facets.get('status', []) if row['_id']}
+    counts['priority'] = {row['_id']: row['count'] for row in facets.get('priority', []) if row['_id']}
+    return counts
+
+# Reconciling is a compare-and-set on the counters document's revision, which
+# every bump increments: the revision is read before counting, and the rebuilt
+# document only replaces that revision. A write landing in between makes the
+# replace miss and the count is retried, so a concurrent $inc is never lost.
+# A missing document is first seeded empty (without reconciled_at, so stats
+# reads keep reconciling) so that bumps during the first count still register.
+# Returns the counts and whether they were stored.
+async def reconcile_dashboard_counters(org_id: str) -> tuple:
+    for _ in range(DASHBOARD_RECONCILE_ATTEMPTS):
+        current = await db.dashboard_counters.find_one_and_update(
+            {"organization_id": org_id}, {"$setOnInsert": {"revision": 0}},
+            projection={"_id": 0, "revision": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        revision = current.get("revision", 0)
+        counts = await compute_dashboard_counts(org_id)
+        result = await db.dashboard_counters.replace_one(
+            {"organization_id": org_id, "revision": current.get("revision")},
+            {"organization_id": org_id, **counts, "revision": revision, "reconciled_at": datetime.now(timezone.utc)}
+        )
+        if result.matched_count:
+            return counts, True
+    logger.warning("Dashboard counters for %s changed during %d reconcile attempts", org_id, DASHBOARD_RECONCILE_ATTEMPTS)
+    return counts, False
+
+# Counters that do not exist yet are left alone; the next stats read seeds them.
+async def bump_dashboard_counters(org_id: str, inc: dict):
+    if not DASHBOARD_COUNTERS_ENABLED or org_id == "null":
+        return
+    inc = {k: v for k, v in inc.items() if v}
+    if inc:
+        await db.dashboard_counters.update_one({"organization_id": org_id}, {"$inc": {**inc, "revision": 1}})
+
+class TTLCache:
+    def __init__(self, name: str, max_size: int, ttl: float, registry: MetricsRegistry):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lookups = registry.counter("cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+        self.evictions = registry.counter("cache_evictions_total", "Entries evicted to stay within max size", ("cache",))
+        self.entries = registry.gauge("cache_entries", "Entries held, including expired ones not yet looked up", ("cache",))
+        registry.gauge("cache_max_entries", "Entries held before the least recently used is evicted", ("cache",)).set((name,), max_size)
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+                self.entries.set((self.name,), len(self._entries))
+            self.lookups.inc((self.name, "miss"))
+            return None
+        self._entries.move_to_end(key)
+        self.lookups.inc((self.name, "hit"))
+        return entry[1]
+    
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions.inc((self.name,))
+        self.entries.set((self.name,), len(self._entries))
+    
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self.entries.set((self.name,), len(self._entries))
+    
+    async def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+org_cache = TTLCache("organizations", CACHE_MAX_ENTRIES, ORG_CACHE_TTL, metrics)
+master_data_cache = TTLCache("master_data", 64, MASTER_DATA_CACHE_TTL, metrics)
+
+async def get_cached_organization(org_id: str) -> Optional[dict]:
+    return await org_cache.get_or_load(org_id, lambda: db.organizations.find_one({"id": org_id}, {"_id": 0}))
+
+# Each subscriber gets a bounded buffer. A subscriber that falls behind has
+# its buffer replaced by a single "resync" event telling it to refetch.
+class Subscription:
+    def __init__(self, org_id: str, max_size: int, dropped: Counter):
+        self.org_id = org_id
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = dropped
+    
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped.inc((), self.queue.qsize())
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "organization_id": self.org_id})
+
+class Broadcaster:
+    def __init__(self, buffer_size: int, registry: MetricsRegistry):
+        self.buffer_size = buffer_size
+        self.backend = None
+        self.subscribers = registry.gauge("stream_subscribers", "Open event stream connections")
+        self.organizations = registry.gauge("stream_organizations", "Organizations with an open event stream")
+        self.dropped = registry.counter("stream_events_dropped_total", "Events discarded from slow subscribers' buffers")
+        self._subscribers = {}
+    
+    def subscribe(self, org_id: str) -> Subscription:
+        subscription = Subscription(org_id, self.buffer_size, self.dropped)
+        self._subscribers.setdefault(org_id, set()).add(subscription)
+        self.subscribers.inc()
+        self.organizations.set((), len(self._subscribers))
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.org_id, set())
+        if subscription in subscribers:
+            subscribers.discard(subscription)
+            self.subscribers.dec()
+        if not subscribers:
+            self._subscribers.pop(subscription.org_id, None)
+        self.organizations.set((), len(self._subscribers))
+    
+    def deliver(self, event: dict):
+        for subscription in list(self._subscribers.get(event['organization_id'], ())):
+            subscription.offer(event)
+    
+    async def publish(self, event: dict):
+        if event['organization_id'] == "null":
+            return
+        if self.backend is None:
+            self.deliver(event)
+        else:
+            await self.backend.publish(event)
+
+class MongoChangeStreamBackend:
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+        self._watcher = None
+    
+    async def publish(self, event: dict):
+        await db.task_events.insert_one({**event, "created_at": datetime.now(timezone.utc)})
+    
+    async def start(self):
+        self._watcher = asyncio.create_task(self._watch())
+    
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+    
+    async def _watch(self):
+        while True:
+            try:
+                async with db.task_events.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        event = change['fullDocument']
+                        event.pop('_id', None)
+                        event.pop('created_at', None)
+                        self.broadcaster.deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Task event change stream failed, reconnecting")
+                await asyncio.sleep(1)
+
+broadcaster = Broadcaster(EVENT_BUFFER_SIZE, metrics)
+
+def task_event(event_type: str, org_id: str, task_id: str, title: str, user: Optional[str], details: Optional[dict] = None) -> dict:
+    return {
+        "type": event_type,
+        "organization_id": org_id,
+        "task_id": task_id,
+        "title": title,
+        "user": user or "System",
+        "details": details or {},
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+# Content-addressed blob store: files live at <root>/<aa>/<bb>/<sha256>, so
+# identical uploads share one file. The blobs collection tracks references.
+class BlobStore:
+    def __init__(self, root: Path):
+        self.root = root
+    
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+    
+    def staging_path(self) -> Path:
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / uuid.uuid4().hex
+    
+    # Writes an upload to a staging file and returns (staged path, digest,
+    # size). The blob only moves into place once retain_blob holds a ref.
+    async def stage(self, upload: UploadFile, max_size: int) -> tuple:
+        tmp_path = self.staging_path()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as fh:
+                while chunk := await upload.read(BLOB_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(status_code=413, detail="File too large")
+                    digest.update(chunk)
+                    await asyncio.to_thread(fh.write, chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path, digest.hexdigest(), size
+    
+    async def stage_bytes(self, data: bytes) -> tuple:
+        tmp_path = self.staging_path()
+        await asyncio.to_thread(tmp_path.write_bytes, data)
+        return tmp_path, hashlib.sha256(data).hexdigest()
+    
+    # Moves a staged file into place unless the blob is already there
+    def place(self, tmp_path: Path, digest: str):
+        target = self.path_for(digest)
+        if target.exists():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, target)
+    
+    async def stream(self, digest: str, start: int, end: int):
+        with open(self.path_for(digest), "rb") as fh:
+            fh.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(fh.read, min(BLOB_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    # Moves a blob out of its content address, returning where it went (or
+    # None when it was already gone) so an aborted delete can put it back
+    def discard(self, digest: str) -> Optional[Path]:
+        trash_path = self.staging_path()
+        try:
+            os.replace(self.path_for(digest), trash_path)
+        except FileNotFoundError:
+            return None
+        return trash_path
+
+blob_store = BlobStore(BLOB_STORAGE_DIR)
+
+# Blobs are shared by content and reference counted in db.blobs. A retain
+# takes its ref before placing the staged file, so it re-writes a file that a
+# concurrent release removed. A release moves the file aside, deletes the
+# record only while no refs remain, and puts the file back when a retain got
+# in first.
+async def retain_blob(staged: Path, digest: str, size: int, content_type: str):
+    try:
+        await db.blobs.update_one(
+            {"sha256": digest},
+            {"$inc": {"ref_count": 1}, "$setOnInsert": {"size": size, "content_type": content_type, "created_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        blob_store.place(staged, digest)
+    finally:
+        staged.unlink(missing_ok=True)
+
+async def release_blob(digest: str):
+    blob = await db.blobs.find_one_and_update(
+        {"sha256": digest}, {"$inc": {"ref_count": -1}},
+        projection={"_id": 0, "ref_count": 1}, return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob["ref_count"] > 0:
+        return
+    trash_path = blob_store.discard(digest)
+    if await db.blobs.find_one_and_delete({"sha256": digest, "ref_count": {"$lte": 0}}):
+        if trash_path:
+            trash_path.unlink(missing_ok=True)
+    elif trash_path:
+        blob_store.place(trash_path, digest)
+        trash_path.unlink(missing_ok=True)
+
+# Organization logos arrive as base64 (optionally a data: URL) and are kept in
+# the blob store; organization documents only carry the URL and digest.
+def logo_url(org_id: str, digest: str) -> str:
+    return f"/api/organizations/{org_id}/logo?v={digest[:16]}"
+
+async def store_logo(org_id: str, logo: str) -> dict:
+    content_type = "image/png"
+    payload = logo
+    if logo.startswith("data:"):
+        header, _, payload = logo.partition(",")
+        content_type = header[5:].split(";")[0] or content_type
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Logo must be base64 encoded")
+    if len(data) > MAX_LOGO_SIZE:
+        raise HTTPException(status_code=413, detail="Logo too large")
+    staged, digest = await blob_store.stage_bytes(data)
+    await retain_blob(staged, digest, len(data), content_type)
+    return {"logo": logo_url(org_id, digest), "logo_hash": digest, "logo_content_type": content_type}
+
+# Parses a single "bytes=" Range header into an inclusive (start, end) pair.
+# Returns None when the whole file should be sent.
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            start = size - int(end_text)
+            end = size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+# Analytics snapshots hold per-status task counts and story points for one
+# project on one UTC day. A day is built from the previous day's snapshots
+# plus that day's task creations and logged status/story point changes; the
+# first day for an organization is a baseline taken from the tasks themselves,
+# rolled back through any changes logged after that day ended.
+def day_bounds(day: date) -> tuple:
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+def shift_bucket(bucket: dict, status: str, points: Optional[int], sign: int):
+    bucket['counts'][status] = bucket['counts'].get(status, 0) + sign
+    bucket['points'][status] = bucket['points'].get(status, 0) + sign * (points or 0)
+
+async def baseline_snapshots(org_id: str, end: datetime) -> dict:
+    projects = {}
+    pipeline = [
+        {"$match": {"organization_id": org_id, "created_at": {"$lt": end}}},
+        {"$group": {
+            "_id": {"project_id": "$project_id", "status": "$status"},
+            "tasks": {"$sum": 1},
+            "points": {"$sum": {"$ifNull": ["$story_points", 0]}}
+        }}
+    ]
+    async for row in db.tasks.aggregate(pipeline):
+        bucket = projects.setdefault(row['_id']['project_id'], {"counts": {}, "points": {}})
+        bucket['counts'][row['_id']['status']] = row['tasks']
+        bucket['points'][row['_id']['status']] = row['points']
+    if end > datetime.now(timezone.utc):
+        return projects
+
+    # A past day: the first old value logged after it ended is what a task
+    # held that day, so move those tasks back to it
+    events = await db.action_history.find({
+        "organization_id": org_id,
+        "timestamp": {"$gte": end},
+        "entity_type": "task",
+        "$or": [{"action": "status_changed"}, {"details.old_story_points": {"$exists": True}}]
+    }, {"_id": 0, "entity_id": 1, "details": 1}).sort("timestamp", 1).to_list(None)
+    earlier = {}
+    for event in events:
+        values = earlier.setdefault(event['entity_id'], {})
+        for field in ("old_status", "old_story_points"):
+            if field in event['details']:
+                values.setdefault(field, event['details'][field])
+    if not earlier:
+        return projects
+    async for task in db.tasks.find(
+        {"organization_id": org_id, "id": {"$in": list(earlier)}, "created_at": {"$lt": end}},
+        {"_id": 0, "id": 1, "project_id": 1, "status": 1, "story_points": 1}
+    ):
+        values = earlier[task['id']]
+        bucket = projects.setdefault(task['project_id'], {"counts": {}, "points": {}})
+        shift_bucket(bucket, task['status'], task.get('story_points'), -1)
+        shift_bucket(bucket, values.get('old_status', task['status']), values.get('old_story_points', task.get('story_points')), 1)
+    for bucket in projects.values():
+        bucket['counts'] = {status: count for status, count in bucket['counts'].items() if count}
+        bucket['points'] = {status: points for status, points in bucket['points'].items() if status in bucket['counts']}
+    return projects
+
+async def replay_snapshots(org_id: str, previous: List[dict], start: datetime, end: datetime) -> dict:
+    projects = {doc['project_id']: {"counts": dict(doc['counts']), "points": dict(doc['points'])} for doc in previous}
+    created = {
+        task['id'] async for task in db.tasks.find(
+            {"organization_id": org_id, "created_at": {"$gte": start, "$lt": end}}, {"_id": 0, "id": 1}
+        )
+    }
+    events = await db.action_history.find({
+        "organization_id": org_id,
+        "timestamp": {"$gte": start, "$lt": end},
+        "entity_type": "task",
+        "$or": [{"action": "status_changed"}, {"details.old_story_points": {"$exists": True}}]
+    }, {"_id": 0, "entity_id": 1, "action": 1, "details": 1}).sort("timestamp", 1).to_list(None)
+    task_events = {}
+    for event in events:
+        task_events.setdefault(event['entity_id'], []).append(event['details'])
+    if not created and not task_events:
+        return projects
+
+    tasks = {
+        task['id']: task async for task in db.tasks.find(
+            {"organization_id": org_id, "id": {"$in": list(created | set(task_events))}},
+            {"_id": 0, "id": 1, "project_id": 1, "status": 1, "story_points": 1}
+        )
+    }
+    # A task's state at the start of the day (or at creation) is the first
+    # old value logged for it that day; without one, its current value.
+    state = {}
+    for task_id, task in tasks.items():
+        details = task_events.get(task_id, [])
+        status = next((d['old_status'] for d in details if 'old_status' in d), None)
+        points = next((d['old_story_points'] for d in details if 'old_story_points' in d), task.get('story_points'))
+        state[task_id] = (status or ("TODO" if task_id in created else task['status']), points)
+        if task_id in created:
+            shift_bucket(projects.setdefault(task['project_id'], {"counts": {}, "points": {}}), *state[task_id], 1)
+
+    for event in events:
+        task = tasks.get(event['entity_id'])
+        if not task:
+            continue
+        details = event['details']
+        old_status, old_points = state[task['id']]
+        new_status = details.get('status', old_status) if event['action'] == "status_changed" else old_status
+        new_points = details.get('story_points', old_points) if 'old_story_points' in details else old_points
+        bucket = projects.setdefault(task['project_id'], {"counts": {}, "points": {}})
+        shift_bucket(bucket, old_status, old_points, -1)
+        shift_bucket(bucket, new_status, new_points, 1)
+        state[task['id']] = (new_status, new_points)
+    return projects
+
+async def build_snapshots(org_id: str, day: date) -> int:
+    start, end = day_bounds(day)
+    previous = await db.analytics_snapshots.find(
+        {"organization_id": org_id, "day": (day - timedelta(days=1)).isoformat()}, {"_id": 0}
+    ).to_list(None)
+    if previous:
+        projects = await replay_snapshots(org_id, previous, start, end)
+    else:
+        projects = await baseline_snapshots(org_id, end)
+    if not projects:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"organization_id": org_id, "project_id": project_id, "day": day.isoformat()},
+            {"$set": {
+                "counts": bucket['counts'],
+                "points": bucket['points'],
+                "total_tasks": sum(bucket['counts'].values()),
+                "total_points": sum(bucket['points'].values()),
+                "computed_at": now,
+                "complete": now >= end
+            }},
+            upsert=True
+        )
+        for project_id, bucket in projects.items()
+    ]
+    await db.analytics_snapshots.bulk_write(operations, ordered=False)
+    return len(operations)
+
+class SnapshotScheduler:
+    def __init__(self, interval: float, registry: MetricsRegistry):
+        self.interval = interval
+        self.runs = registry.counter("analytics_snapshot_runs_total", "Completed analytics snapshot runs")
+        self.failures = registry.counter("analytics_snapshot_failures_total", "Analytics snapshot runs that raised")
+        self.snapshots_written = registry.counter("analytics_snapshots_written_total", "Project-day snapshots upserted")
+        self.last_run = registry.gauge("analytics_snapshot_last_run_timestamp_seconds", "Unix time the last snapshot run completed")
+        self._worker = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    # Rebuilds every organization from its first incomplete snapshot day through
+    # today, so today's partial snapshot is refreshed and gaps are filled.
+    async def run_once(self) -> int:
+        today = datetime.now(timezone.utc).date()
+        written = 0
+        async for org in db.organizations.find({}, {"_id": 0, "id": 1}):
+            latest = await db.analytics_snapshots.find_one(
+                {"organization_id": org['id']}, {"_id": 0, "day": 1, "complete": 1}, sort=[("day", -1)]
+            )
+            day = today
+            if latest:
+                day = date.fromisoformat(latest['day']) + timedelta(days=1 if latest.get('complete') else 0)
+            while day <= today:
+                written += await build_snapshots(org['id'], day)
+                day += timedelta(days=1)
+        self.runs.inc()
+        self.snapshots_written.inc((), written)
+        self.last_run.set((), time.time())
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.failures.inc()
+                logger.exception("Analytics snapshot run failed")
+            await asyncio.sleep(self.interval)
+
+snapshot_scheduler = SnapshotScheduler(ANALYTICS_SNAPSHOT_INTERVAL, metrics)
+
+# Indexes are declared in indexes.py; this applies them to the live database
+async def ensure_indexes(database=None) -> dict:
+    return await apply_indexes(database if database is not None else db)
+
+@app.on_event("startup")
+async def start_storage():
+    if STORAGE_BACKEND == "memory":
+        client.start()
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes()
 
 # Create super admin on startup
 @app.on_event("startup")
@@ -281,36 +1266,52 @@ async def create_super_admin():
         super_admin = User(
             name="Super Admin",
             email="admin@gmail.com",
-            password=hash_password("12345"),
+            password=await hash_password("12345"),
             role="SuperAdmin",
             organization_id=None
         )
         doc = super_admin.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
         await db.users.insert_one(doc)
         logger.info("Super admin created: admin@gmail.com / 12345")
 
+@app.on_event("startup")
+async def start_audit_queue():
+    if AUDIT_MODE != "strict":
+        audit_queue.start()
+
+@app.on_event("startup")
+async def start_event_backend():
+    if EVENT_BACKEND == "mongo" and STORAGE_BACKEND == "memory":
+        logger.error("EVENT_BACKEND=mongo needs change streams; using local events with memory storage")
+    elif EVENT_BACKEND == "mongo":
+        broadcaster.backend = MongoChangeStreamBackend(broadcaster)
+        await broadcaster.backend.start()
+
+@app.on_event("startup")
+async def start_snapshot_scheduler():
+    if ANALYTICS_SNAPSHOT_INTERVAL > 0:
+        snapshot_scheduler.start()
+
 # Authentication Endpoints
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(input: LoginRequest):
     user = await db.users.find_one({"email": input.email}, {"_id": 0})
-    if not user or not verify_password(input.password, user['password']):
+    if not user or not await verify_password(input.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     if not user.get('is_active', True):
         raise HTTPException(status_code=403, detail="User account is inactive")
     
+    if password_needs_rehash(user['password']):
+        await upgrade_password_hash(user, input.password)
+    
     # Get organization if user has one
     organization = None
     if user.get('organization_id'):
-        organization = await db.organizations.find_one({"id": user['organization_id']}, {"_id": 0})
-        if organization and isinstance(organization.get('created_at'), str):
-            organization['created_at'] = datetime.fromisoformat(organization['created_at'])
+        organization = await get_cached_organization(user['organization_id'])
     
     # Remove password from response
     user_data = {k: v for k, v in user.items() if k != 'password'}
-    if isinstance(user_data.get('created_at'), str):
-        user_data['created_at'] = datetime.fromisoformat(user_data['created_at'])
     
     # Generate simple token (in production, use JWT)
     token = f"{user['id']}:{user['email']}:{user['role']}"
@@ -321,7 +1322,7 @@ async def login(input: LoginRequest):
         token=token
     )
 
-@api_router.post("/auth/register", response_model=User)
+@api_router.post("/auth/register", response_model=UserPublic)
 async def register(input: UserCreate):
     # Check if email exists
     existing = await db.users.find_one({"email": input.email})
@@ -329,16 +1330,11 @@ async def register(input: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_dict = input.model_dump()
-    user_dict['password'] = hash_password(user_dict['password'])
+    user_dict['password'] = await hash_password(user_dict['password'])
     user_obj = User(**user_dict)
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.users.insert_one(doc)
-    
-    # Remove password from response
-    user_data = user_obj.model_dump()
-    del user_data['password']
-    return user_data
+    return doc
 
 # Organization Endpoints (Super Admin only)
 @api_router.post("/organizations")
@@ -360,7 +1356,6 @@ async def create_organization(input: OrganizationCreate, x_user_role: Optional[s
     org_dict = {
         "name": input.name,
         "subdomain": input.subdomain,
-        "logo": input.logo or "",
         "theme": input.theme or {
             "primaryColor": "#1E40AF",
             "secondaryColor": "#3B82F6",
@@ -371,7 +1366,9 @@ async def create_organization(input: OrganizationCreate, x_user_role: Optional[s
     }
     org_obj = Organization(**org_dict)
     doc = org_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    if input.logo:
+        doc.update(await store_logo(org_obj.id, input.logo))
+        org_obj.logo, org_obj.logo_hash = doc['logo'], doc['logo_hash']
     await db.organizations.insert_one(doc)
     
     # Generate random password for admin
@@ -383,13 +1380,12 @@ async def create_organization(input: OrganizationCreate, x_user_role: Optional[s
     admin_user = User(
         name=input.admin_name,
         email=input.admin_email,
-        password=hash_password(admin_password),
+        password=await hash_password(admin_password),
         temp_password=admin_password,  # Store for retrieval
         role="Admin",
         organization_id=org_obj.id
     )
     admin_doc = admin_user.model_dump()
-    admin_doc['created_at'] = admin_doc['created_at'].isoformat()
     await db.users.insert_one(admin_doc)
     
     # Return organization with admin credentials
@@ -403,22 +1399,17 @@ async def create_organization(input: OrganizationCreate, x_user_role: Optional[s
     return org_response
 
 @api_router.get("/organizations", response_model=List[Organization])
-async def get_organizations(x_user_role: Optional[str] = Header(None)):
+async def get_organizations(response: Response, x_user_role: Optional[str] = Header(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     if x_user_role != "SuperAdmin":
         raise HTTPException(status_code=403, detail="Only super admin can view all organizations")
-    orgs = await db.organizations.find({}, {"_id": 0}).to_list(1000)
-    for org in orgs:
-        if isinstance(org['created_at'], str):
-            org['created_at'] = datetime.fromisoformat(org['created_at'])
-    return orgs
+    orgs = await paginate(db.organizations, {}, model_projection(Organization), limit, cursor, response)
+    return list_response(orgs, response, Organization)
 
 @api_router.get("/organizations/{org_id}", response_model=Organization)
 async def get_organization(org_id: str):
-    org = await db.organizations.find_one({"id": org_id}, {"_id": 0})
+    org = await get_cached_organization(org_id)
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
-    if isinstance(org['created_at'], str):
-        org['created_at'] = datetime.fromisoformat(org['created_at'])
     return org
 
 @api_router.patch("/organizations/{org_id}", response_model=Organization)
@@ -430,15 +1421,47 @@ async def update_organization(org_id: str, input: OrganizationUpdate, x_user_rol
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.organizations.update_one({"id": org_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    # Clients echo the logo URL back unchanged; only new image data is stored
+    logo = update_data.pop('logo', None)
+    replace_logo = logo is not None and not logo.startswith(f"/api/organizations/{org_id}/logo")
+    if replace_logo:
+        if logo:
+            update_data.update(await store_logo(org_id, logo))
+        else:
+            update_data.update({"logo": "", "logo_hash": "", "logo_content_type": ""})
+    if not update_data:
+        org = await get_cached_organization(org_id)
+        if not org:
+            raise HTTPException(status_code=404, detail="Organization not found")
+        return org
+    
+    # The previous document tells us which logo blob to release
+    old_org = await db.organizations.find_one_and_update(
+        {"id": org_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if not old_org:
+        if update_data.get('logo_hash'):
+            await release_blob(update_data['logo_hash'])
         raise HTTPException(status_code=404, detail="Organization not found")
+    if replace_logo and old_org.get('logo_hash'):
+        await release_blob(old_org['logo_hash'])
     
-    org = await db.organizations.find_one({"id": org_id}, {"_id": 0})
-    if isinstance(org['created_at'], str):
-        org['created_at'] = datetime.fromisoformat(org['created_at'])
+    org = {**old_org, **update_data}
+    org_cache.set(org_id, org)
     return org
 
+@api_router.get("/organizations/{org_id}/logo")
+async def get_organization_logo(org_id: str, if_none_match: Optional[str] = Header(None)):
+    org = await get_cached_organization(org_id)
+    if not org or not org.get('logo_hash'):
+        raise HTTPException(status_code=404, detail="Logo not found")
+    
+    etag = f'"{org["logo_hash"]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(blob_store.path_for(org['logo_hash']), media_type=org.get('logo_content_type') or "image/png", headers=headers)
+
 @api_router.get("/organizations/{org_id}/admin")
 async def get_org_admin_credentials(org_id: str, x_user_role: Optional[str] = Header(None)):
     if x_user_role != "SuperAdmin":
@@ -474,7 +1497,7 @@ async def reset_org_admin_password(org_id: str, x_user_role: Optional[str] = Hea
     await db.users.update_one(
         {"id": admin['id']},
         {"$set": {
-            "password": hash_password(new_password),
+            "password": await hash_password(new_password),
             "temp_password": new_password
         }}
     )
@@ -495,10 +1518,9 @@ async def create_user(input: UserCreate, org_id: str = Depends(get_organization_
     
     user_dict = input.model_dump()
     user_dict['organization_id'] = org_id if org_id != "null" else None
-    user_dict['password'] = hash_password(user_dict['password'])
+    user_dict['password'] = await hash_password(user_dict['password'])
     user_obj = User(**user_dict)
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.users.insert_one(doc)
     await log_action(org_id, x_user_name or "System", "created", "user", user_obj.id, user_obj.name)
     
@@ -507,16 +1529,14 @@ async def create_user(input: UserCreate, org_id: str = Depends(get_organization_
     del user_data['password']
     return user_data
 
-@api_router.get("/users")
-async def get_users(org_id: str = Depends(get_organization_id)):
+@api_router.get("/users", response_model=List[UserPublic])
+async def get_users(response: Response, org_id: str = Depends(get_organization_id), fields: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     query = {"organization_id": org_id} if org_id != "null" else {}
-    users = await db.users.find(query, {"_id": 0, "password": 0}).to_list(1000)
-    for user in users:
-        if isinstance(user['created_at'], str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-    return users
+    projection = fields_projection(fields, UserPublic)
+    users = await paginate(db.users, query, projection, limit, cursor, response)
+    return list_response(users, response, UserPublic, trimmed=bool(fields))
 
-@api_router.get("/users/{user_id}")
+@api_router.get("/users/{user_id}", response_model=UserPublic)
 async def get_user(user_id: str, org_id: str = Depends(get_organization_id)):
     query = {"id": user_id}
     if org_id != "null":
@@ -524,8 +1544,6 @@ async def get_user(user_id: str, org_id: str = Depends(get_organization_id)):
     user = await db.users.find_one(query, {"_id": 0, "password": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if isinstance(user['created_at'], str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
     return user
 
 @api_router.patch("/users/{user_id}")
@@ -538,13 +1556,12 @@ async def update_user(user_id: str, input: UserUpdate, org_id: str = Depends(get
     if org_id != "null":
         query["organization_id"] = org_id
     
-    result = await db.users.update_one(query, {"$set": update_data})
-    if result.matched_count == 0:
+    user = await db.users.find_one_and_update(
+        query, {"$set": update_data}, projection={"_id": 0, "password": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-    if isinstance(user['created_at'], str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
     await log_action(org_id, x_user_name or "System", "updated", "user", user_id, user['name'], update_data)
     return user
 
@@ -556,26 +1573,22 @@ async def create_project(input: ProjectCreate, org_id: str = Depends(get_organiz
     project_dict['created_by'] = x_user_name
     project_obj = Project(**project_dict)
     doc = project_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.projects.insert_one(doc)
+    await bump_dashboard_counters(org_id, {"projects": 1})
+    await bump_collection_version(org_id, "projects")
     await log_action(org_id, x_user_name or "System", "created", "project", project_obj.id, project_obj.name)
     return project_obj
 
-@api_router.get("/projects", response_model=List[Project])
-async def get_projects(org_id: str = Depends(get_organization_id)):
-    projects = await db.projects.find({"organization_id": org_id}, {"_id": 0}).to_list(1000)
-    for project in projects:
-        if isinstance(project['created_at'], str):
-            project['created_at'] = datetime.fromisoformat(project['created_at'])
-    return projects
+@api_router.get("/projects", response_model=List[Project], dependencies=[Depends(conditional_get("projects"))])
+async def get_projects(response: Response, org_id: str = Depends(get_organization_id), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    projects = await paginate(db.projects, {"organization_id": org_id}, model_projection(Project), limit, cursor, response)
+    return list_response(projects, response, Project)
 
-@api_router.get("/projects/{project_id}", response_model=Project)
+@api_router.get("/projects/{project_id}", response_model=Project, dependencies=[Depends(conditional_get("projects", "project_id"))])
 async def get_project(project_id: str, org_id: str = Depends(get_organization_id)):
     project = await db.projects.find_one({"id": project_id, "organization_id": org_id}, {"_id": 0})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if isinstance(project['created_at'], str):
-        project['created_at'] = datetime.fromisoformat(project['created_at'])
     return project
 
 # Story Endpoints
@@ -586,29 +1599,25 @@ async def create_story(input: StoryCreate, org_id: str = Depends(get_organizatio
     story_dict['created_by'] = x_user_name
     story_obj = Story(**story_dict)
     doc = story_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.stories.insert_one(doc)
+    await bump_dashboard_counters(org_id, {"stories": 1})
+    await bump_collection_version(org_id, "stories")
     await log_action(org_id, x_user_name or "System", "created", "story", story_obj.id, story_obj.title)
     return story_obj
 
-@api_router.get("/stories", response_model=List[Story])
-async def get_stories(org_id: str = Depends(get_organization_id), project_id: Optional[str] = None):
+@api_router.get("/stories", response_model=List[Story], dependencies=[Depends(conditional_get("stories"))])
+async def get_stories(response: Response, org_id: str = Depends(get_organization_id), project_id: Optional[str] = None, fields: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     query = {"organization_id": org_id}
     if project_id:
         query["project_id"] = project_id
-    stories = await db.stories.find(query, {"_id": 0}).to_list(1000)
-    for story in stories:
-        if isinstance(story['created_at'], str):
-            story['created_at'] = datetime.fromisoformat(story['created_at'])
-    return stories
+    stories = await paginate(db.stories, query, fields_projection(fields, Story), limit, cursor, response)
+    return list_response(stories, response, Story, trimmed=bool(fields))
 
-@api_router.get("/stories/{story_id}", response_model=Story)
+@api_router.get("/stories/{story_id}", response_model=Story, dependencies=[Depends(conditional_get("stories", "story_id"))])
 async def get_story(story_id: str, org_id: str = Depends(get_organization_id)):
     story = await db.stories.find_one({"id": story_id, "organization_id": org_id}, {"_id": 0})
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
-    if isinstance(story['created_at'], str):
-        story['created_at'] = datetime.fromisoformat(story['created_at'])
     return story
 
 @api_router.patch("/stories/{story_id}", response_model=Story)
@@ -617,22 +1626,23 @@ async def update_story(story_id: str, input: StoryUpdate, org_id: str = Depends(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.stories.update_one({"id": story_id, "organization_id": org_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    story = await db.stories.find_one_and_update(
+        {"id": story_id, "organization_id": org_id}, {"$set": update_data},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    story = await db.stories.find_one({"id": story_id}, {"_id": 0})
-    if isinstance(story['created_at'], str):
-        story['created_at'] = datetime.fromisoformat(story['created_at'])
+    await bump_collection_version(org_id, "stories")
+    await bump_document_version(org_id, "stories", story_id)
     await log_action(org_id, x_user_name or "System", "updated", "story", story_id, story['title'], update_data)
     return story
 
 # Task Endpoints
-@api_router.post("/tasks", response_model=Task)
-async def create_task(input: TaskCreate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+def build_task(input: TaskCreate, org_id: str, user: Optional[str]) -> Task:
     task_dict = input.model_dump()
     task_dict['organization_id'] = org_id
-    task_dict['created_by'] = x_user_name
+    task_dict['created_by'] = user
     
     # Handle "none" and "unassigned" values
     if task_dict.get('story_id') == 'none':
@@ -640,16 +1650,164 @@ async def create_task(input: TaskCreate, org_id: str = Depends(get_organization_
     if task_dict.get('assigned_to') == 'unassigned':
         task_dict['assigned_to'] = None
     
-    task_obj = Task(**task_dict)
+    return Task(**task_dict)
+
+def task_update_fields(input: TaskUpdate) -> dict:
+    update_data = {k: v for k, v in input.model_dump(exclude={"id"}).items() if v is not None}
+    if not update_data:
+        return {}
+    
+    # Handle "none" and "unassigned" values
+    if update_data.get('story_id') == 'none':
+        update_data['story_id'] = None
+    if update_data.get('assigned_to') == 'unassigned':
+        update_data['assigned_to'] = None
+    
+    update_data['updated_at'] = datetime.now(timezone.utc)
+    return update_data
+
+def task_counter_inc(old_task: Optional[dict], update_data: dict) -> dict:
+    counter_inc = {}
+    for field in ("status", "priority"):
+        if field in update_data and old_task and old_task.get(field) != update_data[field]:
+            counter_inc[f"{field}.{old_task.get(field)}"] = counter_inc.get(f"{field}.{old_task.get(field)}", 0) - 1
+            counter_inc[f"{field}.{update_data[field]}"] = counter_inc.get(f"{field}.{update_data[field]}", 0) + 1
+    return counter_inc
+
+# Task edits may send If-Match with the task's version: the ETag from GET or
+# PATCH /tasks/{id}, or the version from the task body, quoted or bare. The
+# write then only applies to that version, so concurrent board edits fail with
+# 412 instead of silently overwriting each other. Every write to a task bumps
+# its version, which makes the version a validator for the whole document.
+def task_etag(task: dict) -> str:
+    return f'"{task.get("version", 0)}"'
+
+def if_match_version(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="If-Match must carry a task version")
+
+# Classifies an edit for the audit log; status and story point changes record
+# the old value so analytics snapshots can replay them.
+def task_update_action(old_task: Optional[dict], update_data: dict) -> str:
+    if 'story_points' in update_data and old_task and old_task.get('story_points') != update_data['story_points']:
+        update_data['old_story_points'] = old_task.get('story_points')
+    if 'status' in update_data and old_task and old_task['status'] != update_data['status']:
+        update_data['old_status'] = old_task['status']
+        return "status_changed"
+    if 'assigned_to' in update_data:
+        return "assigned"
+    return "updated"
+
+@api_router.post("/tasks", response_model=Task)
+async def create_task(input: TaskCreate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+    task_obj = build_task(input, org_id, x_user_name)
     doc = task_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
     await db.tasks.insert_one(doc)
+    await bump_dashboard_counters(org_id, {
+        "tasks": 1,
+        f"status.{task_obj.status}": 1,
+        f"priority.{task_obj.priority}": 1
+    })
+    await bump_collection_version(org_id, "tasks")
     await log_action(org_id, x_user_name or "System", "created", "task", task_obj.id, task_obj.title)
+    await broadcaster.publish(task_event("created", org_id, task_obj.id, task_obj.title, x_user_name, {"task": task_obj.model_dump()}))
     return task_obj
 
-@api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(org_id: str = Depends(get_organization_id), project_id: Optional[str] = None, story_id: Optional[str] = None, status: Optional[str] = None, assigned_to: Optional[str] = None):
+@api_router.post("/tasks/bulk")
+async def bulk_create_tasks(input: TaskBulkCreate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+    tasks = [build_task(item, org_id, x_user_name) for item in input.tasks]
+    failed = {}
+    try:
+        await db.tasks.bulk_write([InsertOne(task.model_dump()) for task in tasks], ordered=False)
+    except BulkWriteError as e:
+        failed = {error['index']: error.get('errmsg', 'Write failed') for error in e.details.get('writeErrors', [])}
+    
+    results = []
+    counter_inc = {}
+    entries = []
+    events = []
+    for index, task in enumerate(tasks):
+        if index in failed:
+            results.append({"index": index, "id": task.id, "status": "error", "error": failed[index]})
+            continue
+        results.append({"index": index, "id": task.id, "status": "created"})
+        for key in ("tasks", f"status.{task.status}", f"priority.{task.priority}"):
+            counter_inc[key] = counter_inc.get(key, 0) + 1
+        entries.append(action_entry(org_id, x_user_name or "System", "created", "task", task.id, task.title))
+        events.append(task_event("created", org_id, task.id, task.title, x_user_name, {"task": task.model_dump()}))
+    
+    await bump_dashboard_counters(org_id, counter_inc)
+    if entries:
+        await bump_collection_version(org_id, "tasks")
+    await log_actions(org_id, entries)
+    for event in events:
+        await broadcaster.publish(event)
+    return {"created": len(entries), "failed": len(failed), "results": results}
+
+@api_router.patch("/tasks/bulk")
+async def bulk_update_tasks(input: TaskBulkUpdate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+    ids = [item.id for item in input.tasks]
+    old_tasks = {
+        task['id']: task
+        async for task in db.tasks.find({"id": {"$in": ids}, "organization_id": org_id}, {"_id": 0, "id": 1, "title": 1, "status": 1, "priority": 1, "story_points": 1})
+    }
+    
+    results = [None] * len(input.tasks)
+    pending = []
+    seen = set()
+    for index, item in enumerate(input.tasks):
+        update_data = task_update_fields(item)
+        if item.id in seen:
+            results[index] = {"index": index, "id": item.id, "status": "error", "error": "Duplicate task in batch"}
+        elif not update_data:
+            results[index] = {"index": index, "id": item.id, "status": "error", "error": "No fields to update"}
+        elif item.id not in old_tasks:
+            results[index] = {"index": index, "id": item.id, "status": "error", "error": "Task not found"}
+        else:
+            pending.append((index, item.id, update_data))
+        seen.add(item.id)
+    
+    failed = {}
+    if pending:
+        operations = [
+            UpdateOne({"id": task_id, "organization_id": org_id}, {"$set": update_data, "$inc": {"version": 1}})
+            for _, task_id, update_data in pending
+        ]
+        try:
+            await db.tasks.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index']: error.get('errmsg', 'Write failed') for error in e.details.get('writeErrors', [])}
+    
+    counter_inc = {}
+    entries = []
+    events = []
+    for position, (index, task_id, update_data) in enumerate(pending):
+        if position in failed:
+            results[index] = {"index": index, "id": task_id, "status": "error", "error": failed[position]}
+            continue
+        old_task = old_tasks[task_id]
+        for key, value in task_counter_inc(old_task, update_data).items():
+            counter_inc[key] = counter_inc.get(key, 0) + value
+        action = task_update_action(old_task, update_data)
+        title = update_data.get('title', old_task['title'])
+        entries.append(action_entry(org_id, x_user_name or "System", action, "task", task_id, title, update_data))
+        events.append(task_event(action, org_id, task_id, title, x_user_name, update_data))
+        results[index] = {"index": index, "id": task_id, "status": "updated", "action": action}
+    
+    await bump_dashboard_counters(org_id, counter_inc)
+    if entries:
+        await bump_collection_version(org_id, "tasks")
+    await log_actions(org_id, entries)
+    for event in events:
+        await broadcaster.publish(event)
+    return {"updated": len(entries), "failed": len(input.tasks) - len(entries), "results": results}
+
+@api_router.get("/tasks", response_model=List[Task], dependencies=[Depends(conditional_get("tasks"))])
+async def get_tasks(response: Response, org_id: str = Depends(get_organization_id), project_id: Optional[str] = None, story_id: Optional[str] = None, status: Optional[str] = None, assigned_to: Optional[str] = None, fields: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     query = {"organization_id": org_id}
     if project_id:
         query["project_id"] = project_id
@@ -659,78 +1817,159 @@ async def get_tasks(org_id: str = Depends(get_organization_id), project_id: Opti
         query["status"] = status
     if assigned_to:
         query["assigned_to"] = assigned_to
-    tasks = await db.tasks.find(query, {"_id": 0}).to_list(1000)
-    for task in tasks:
-        if isinstance(task['created_at'], str):
-            task['created_at'] = datetime.fromisoformat(task['created_at'])
-        if isinstance(task['updated_at'], str):
-            task['updated_at'] = datetime.fromisoformat(task['updated_at'])
-    return tasks
+    tasks = await paginate(db.tasks, query, fields_projection(fields, Task), limit, cursor, response)
+    return list_response(tasks, response, Task, trimmed=bool(fields))
 
+# The task's own version is its validator, so revalidating still reads the
+# task: a 304 costs the same single command as a 200, minus the body.
 @api_router.get("/tasks/{task_id}", response_model=Task)
-async def get_task(task_id: str, org_id: str = Depends(get_organization_id)):
+async def get_task(task_id: str, response: Response, org_id: str = Depends(get_organization_id), if_none_match: Optional[str] = Header(None)):
     task = await db.tasks.find_one({"id": task_id, "organization_id": org_id}, {"_id": 0})
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    if isinstance(task['created_at'], str):
-        task['created_at'] = datetime.fromisoformat(task['created_at'])
-    if isinstance(task['updated_at'], str):
-        task['updated_at'] = datetime.fromisoformat(task['updated_at'])
+    headers = {"ETag": task_etag(task), "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
     return task
 
 @api_router.patch("/tasks/{task_id}", response_model=Task)
-async def update_task(task_id: str, input: TaskUpdate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
-    update_data = {k: v for k, v in input.model_dump().items() if v is not None}
+async def update_task(task_id: str, input: TaskUpdate, response: Response, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None), if_match: Optional[str] = Header(None)):
+    update_data = task_update_fields(input)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    # Handle "none" and "unassigned" values
-    if update_data.get('story_id') == 'none':
-        update_data['story_id'] = None
-    if update_data.get('assigned_to') == 'unassigned':
-        update_data['assigned_to'] = None
-    
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
-    old_task = await db.tasks.find_one({"id": task_id, "organization_id": org_id}, {"_id": 0})
+    query = {"id": task_id, "organization_id": org_id}
+    expected_version = if_match_version(if_match)
+    if expected_version is not None:
+        # Tasks written before versioning have no field and count as version 0
+        query["version"] = expected_version if expected_version else {"$in": [0, None]}
     
-    result = await db.tasks.update_one({"id": task_id, "organization_id": org_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    # The previous document drives the counters and the audit entry
+    old_task = await db.tasks.find_one_and_update(
+        query, {"$set": update_data, "$inc": {"version": 1}},
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if not old_task:
+        if expected_version is not None and await db.tasks.find_one({"id": task_id, "organization_id": org_id}, {"_id": 1}):
+            raise HTTPException(status_code=412, detail="Task has been modified; reload and retry")
         raise HTTPException(status_code=404, detail="Task not found")
+    task = {**old_task, **update_data, "version": old_task.get('version', 0) + 1}
     
-    task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
-    if isinstance(task['created_at'], str):
-        task['created_at'] = datetime.fromisoformat(task['created_at'])
-    if isinstance(task['updated_at'], str):
-        task['updated_at'] = datetime.fromisoformat(task['updated_at'])
-    
-    action = "updated"
-    if 'status' in update_data and old_task and old_task['status'] != update_data['status']:
-        action = "status_changed"
-        update_data['old_status'] = old_task['status']
-    elif 'assigned_to' in update_data:
-        action = "assigned"
-    
+    await bump_dashboard_counters(org_id, task_counter_inc(old_task, update_data))
+    await bump_collection_version(org_id, "tasks")
+    action = task_update_action(old_task, update_data)
     await log_action(org_id, x_user_name or "System", action, "task", task_id, task['title'], update_data)
+    await broadcaster.publish(task_event(action, org_id, task_id, task['title'], x_user_name, {**update_data, "version": task['version']}))
+    response.headers["ETag"] = task_etag(task)
     return task
 
 @api_router.post("/tasks/{task_id}/comments")
 async def add_comment(task_id: str, input: CommentCreate, org_id: str = Depends(get_organization_id)):
-    from pydantic import BaseModel
-    class Comment(BaseModel):
-        id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-        user: str
-        text: str
-        created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
-    
-    comment = Comment(user=input.user, text=input.text)
-    result = await db.tasks.update_one({"id": task_id, "organization_id": org_id}, {"$push": {"comments": comment.model_dump()}})
-    if result.matched_count == 0:
+    task = await db.tasks.find_one_and_update(
+        {"id": task_id, "organization_id": org_id},
+        {"$inc": {"comment_count": 1, "version": 1}},
+        projection={"_id": 0, "title": 1}
+    )
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
+    comment = Comment(organization_id=org_id, task_id=task_id, user=input.user, text=input.text)
+    await db.comments.insert_one(comment.model_dump())
+    await bump_collection_version(org_id, "tasks")
     await log_action(org_id, input.user, "commented", "task", task_id, task['title'], {"comment": input.text})
+    await broadcaster.publish(task_event("commented", org_id, task_id, task['title'], input.user, {"comment": comment.model_dump()}))
     return {"message": "Comment added successfully", "comment": comment}
 
+@api_router.get("/tasks/{task_id}/comments", response_model=List[Comment])
+async def get_comments(task_id: str, response: Response, org_id: str = Depends(get_organization_id), limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    comments = await paginate(db.comments, {"task_id": task_id, "organization_id": org_id}, model_projection(Comment), limit, cursor, response)
+    return list_response(comments, response, Comment)
+
+# Attachment Endpoints
+@api_router.post("/tasks/{task_id}/attachments", response_model=Attachment)
+async def upload_attachment(task_id: str, file: UploadFile = File(...), org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+    staged, digest, size = await blob_store.stage(file, MAX_ATTACHMENT_SIZE)
+    content_type = file.content_type or "application/octet-stream"
+    await retain_blob(staged, digest, size, content_type)
+    
+    attachment = Attachment(
+        filename=file.filename or digest,
+        content_type=content_type,
+        size=size,
+        sha256=digest,
+        uploaded_by=x_user_name
+    )
+    task = await db.tasks.find_one_and_update(
+        {"id": task_id, "organization_id": org_id},
+        {"$push": {"attachments": attachment.model_dump()}, "$inc": {"version": 1}},
+        projection={"_id": 0, "title": 1}
+    )
+    if not task:
+        await release_blob(digest)
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    await bump_collection_version(org_id, "tasks")
+    await log_action(org_id, x_user_name or "System", "attached", "task", task_id, task['title'], {"attachment": attachment.filename, "sha256": digest})
+    return attachment
+
+# Filenames come from the uploader. The quoted filename= gets a plain ASCII
+# fallback with quotes, separators and control characters replaced; the real
+# name travels percent-encoded in filename* (RFC 6266 / RFC 5987).
+def content_disposition(filename: str) -> str:
+    name = filename.replace("\\", "/").rsplit("/", 1)[-1]
+    name = "".join(ch for ch in name if ch.isprintable()) or "download"
+    fallback = re.sub(r'[^A-Za-z0-9._ ()-]', "_", name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+async def find_attachment(task_id: str, attachment_id: str, org_id: str) -> dict:
+    task = await db.tasks.find_one(
+        {"id": task_id, "organization_id": org_id},
+        {"_id": 0, "title": 1, "attachments": {"$elemMatch": {"id": attachment_id}}}
+    )
+    if not task or not task.get('attachments'):
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return {**task['attachments'][0], "task_title": task['title']}
+
+@api_router.get("/tasks/{task_id}/attachments/{attachment_id}")
+async def download_attachment(task_id: str, attachment_id: str, org_id: str = Depends(get_organization_id), range_header: Optional[str] = Header(None, alias="Range")):
+    attachment = await find_attachment(task_id, attachment_id, org_id)
+    size = attachment['size']
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{attachment["sha256"]}"',
+        "Content-Disposition": content_disposition(attachment['filename'])
+    }
+    byte_range = parse_range(range_header, size) if size else None
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = 206
+    else:
+        start, end = 0, size - 1
+        status_code = 200
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob_store.stream(attachment['sha256'], start, end),
+        status_code=status_code,
+        media_type=attachment['content_type'],
+        headers=headers
+    )
+
+@api_router.delete("/tasks/{task_id}/attachments/{attachment_id}")
+async def delete_attachment(task_id: str, attachment_id: str, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
+    attachment = await find_attachment(task_id, attachment_id, org_id)
+    # Matching on the attachment keeps a repeated delete from bumping the version
+    result = await db.tasks.update_one(
+        {"id": task_id, "organization_id": org_id, "attachments.id": attachment_id},
+        {"$pull": {"attachments": {"id": attachment_id}}, "$inc": {"version": 1}}
+    )
+    if result.modified_count:
+        await release_blob(attachment['sha256'])
+        await bump_collection_version(org_id, "tasks")
+    await log_action(org_id, x_user_name or "System", "detached", "task", task_id, attachment['task_title'], {"attachment": attachment['filename']})
+    return {"message": "Attachment deleted successfully"}
+
 # Team Endpoints
 @api_router.post("/team", response_model=TeamMember)
 async def create_team_member(input: TeamMemberCreate, org_id: str = Depends(get_organization_id), x_user_name: Optional[str] = Header(None)):
@@ -738,26 +1977,21 @@ async def create_team_member(input: TeamMemberCreate, org_id: str = Depends(get_
     member_dict['organization_id'] = org_id
     member_obj = TeamMember(**member_dict)
     doc = member_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.team_members.insert_one(doc)
+    await bump_dashboard_counters(org_id, {"team_members": 1})
     await log_action(org_id, x_user_name or "System", "created", "team_member", member_obj.id, member_obj.name)
     return member_obj
 
 @api_router.get("/team", response_model=List[TeamMember])
-async def get_team_members(org_id: str = Depends(get_organization_id)):
-    members = await db.team_members.find({"organization_id": org_id}, {"_id": 0}).to_list(1000)
-    for member in members:
-        if isinstance(member['created_at'], str):
-            member['created_at'] = datetime.fromisoformat(member['created_at'])
-    return members
+async def get_team_members(response: Response, org_id: str = Depends(get_organization_id), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    members = await paginate(db.team_members, {"organization_id": org_id}, model_projection(TeamMember), limit, cursor, response)
+    return list_response(members, response, TeamMember)
 
 @api_router.get("/team/{member_id}", response_model=TeamMember)
 async def get_team_member(member_id: str, org_id: str = Depends(get_organization_id)):
     member = await db.team_members.find_one({"id": member_id, "organization_id": org_id}, {"_id": 0})
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
-    if isinstance(member['created_at'], str):
-        member['created_at'] = datetime.fromisoformat(member['created_at'])
     return member
 
 @api_router.patch("/team/{member_id}", response_model=TeamMember)
@@ -766,13 +2000,13 @@ async def update_team_member(member_id: str, input: TeamMemberUpdate, org_id: st
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.team_members.update_one({"id": member_id, "organization_id": org_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    member = await db.team_members.find_one_and_update(
+        {"id": member_id, "organization_id": org_id}, {"$set": update_data},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
     
-    member = await db.team_members.find_one({"id": member_id}, {"_id": 0})
-    if isinstance(member['created_at'], str):
-        member['created_at'] = datetime.fromisoformat(member['created_at'])
     await log_action(org_id, x_user_name or "System", "updated", "team_member", member_id, member['name'], update_data)
     return member
 
@@ -782,7 +2016,8 @@ async def delete_team_member(member_id: str, org_id: str = Depends(get_organizat
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
     
-    await db.team_members.delete_one({"id": member_id})
+    result = await db.team_members.delete_one({"id": member_id})
+    await bump_dashboard_counters(org_id, {"team_members": -result.deleted_count})
     await log_action(org_id, x_user_name or "System", "deleted", "team_member", member_id, member['name'])
     return {"message": "Team member deleted successfully"}
 
@@ -793,114 +2028,481 @@ async def create_department(input: DepartmentCreate, org_id: str = Depends(get_o
     dept_dict['organization_id'] = org_id
     dept_obj = Department(**dept_dict)
     doc = dept_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.departments.insert_one(doc)
     await log_action(org_id, x_user_name or "System", "created", "department", dept_obj.id, dept_obj.name)
     return dept_obj
 
 @api_router.get("/departments", response_model=List[Department])
-async def get_departments(org_id: str = Depends(get_organization_id)):
-    depts = await db.departments.find({"organization_id": org_id}, {"_id": 0}).to_list(1000)
-    for dept in depts:
-        if isinstance(dept['created_at'], str):
-            dept['created_at'] = datetime.fromisoformat(dept['created_at'])
-    return depts
+async def get_departments(response: Response, org_id: str = Depends(get_organization_id), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    depts = await paginate(db.departments, {"organization_id": org_id}, model_projection(Department), limit, cursor, response)
+    return list_response(depts, response, Department)
 
 # Action History Endpoints
+# History pages newest first, keyed on (timestamp, id)
 @api_router.get("/history")
-async def get_action_history(org_id: str = Depends(get_organization_id), entity_type: Optional[str] = None, entity_id: Optional[str] = None, limit: int = 100):
+async def get_action_history(response: Response, org_id: str = Depends(get_organization_id), entity_type: Optional[str] = None, entity_id: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     query = {"organization_id": org_id}
     if entity_type:
         query["entity_type"] = entity_type
     if entity_id:
         query["entity_id"] = entity_id
     
-    history = await db.action_history.find(query, {"_id": 0}).sort("timestamp", -1).to_list(limit)
-    for entry in history:
-        if isinstance(entry['timestamp'], str):
-            entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
-    return history
+    return await paginate(db.action_history, query, {"_id": 0}, limit, cursor, response, key="timestamp", descending=True)
+
+# Export Endpoints
+# Exports stream straight from a Motor cursor, so memory stays flat no matter
+# how many rows the organization has.
+EXPORT_COLLECTIONS = {
+    "tasks": ("tasks", Task, ["project_id", "story_id", "status", "assigned_to"]),
+    "stories": ("stories", Story, ["project_id"]),
+    "history": ("action_history", ActionHistory, ["entity_type", "entity_id"]),
+}
+
+def export_cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=json_default)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+async def stream_export(cursor, export_format: str, columns: List[str], batch_size: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        if export_format == "csv":
+            writer.writerow([export_cell(doc.get(column)) for column in columns])
+        else:
+            buffer.write(json.dumps(doc, default=json_default))
+            buffer.write("\n")
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@api_router.get("/export/{collection}")
+async def export_collection(
+    collection: str,
+    org_id: str = Depends(get_organization_id),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(500, ge=1, le=10000),
+    project_id: Optional[str] = None,
+    story_id: Optional[str] = None,
+    status: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None
+):
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    collection_name, model, filter_fields = EXPORT_COLLECTIONS[collection]
+    
+    filters = {
+        "project_id": project_id,
+        "story_id": story_id,
+        "status": status,
+        "assigned_to": assigned_to,
+        "entity_type": entity_type,
+        "entity_id": entity_id
+    }
+    query = {"organization_id": org_id}
+    query.update({field: filters[field] for field in filter_fields if filters[field]})
+    
+    cursor = db[collection_name].find(query, {"_id": 0}).batch_size(batch_size)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_export(cursor, format, list(model.model_fields), batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
+
+# Change Feed Endpoints
+# EventSource cannot send custom headers, so the organization may also be
+# passed as ?organization_id=.
+@api_router.get("/stream")
+async def stream_events(request: Request, organization_id: Optional[str] = None, org_id: str = Depends(get_organization_id)):
+    if org_id == "null":
+        org_id = organization_id or "null"
+    if org_id == "null":
+        raise HTTPException(status_code=400, detail="Organization required")
+    
+    subscription = broadcaster.subscribe(org_id)
+    
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=json_default)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Master Data Endpoints
+MASTER_DATA_COLLECTIONS = {
+    "roles": "level",
+    "statuses": "order",
+    "priorities": "level",
+    "task_types": "name",
+    "department_templates": "name",
+}
+
+@api_router.get("/master/{kind}")
+async def get_master_data(kind: str):
+    if kind not in MASTER_DATA_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown master data")
+    sort_field = MASTER_DATA_COLLECTIONS[kind]
+    return await master_data_cache.get_or_load(
+        kind,
+        lambda: db[kind].find({}, {"_id": 0}).sort(sort_field, 1).to_list(None)
+    )
+
+# Search Endpoints
+# Highlighting mirrors $text parsing loosely: quoted phrases and bare words are
+# matched as case-insensitive word prefixes, negated terms are ignored, and
+# common English suffixes are trimmed so stemmed matches still light up.
+def search_pattern(q: str) -> Optional[re.Pattern]:
+    phrases = re.findall(r'"([^"]+)"', q)
+    words = [w for w in re.sub(r'"[^"]*"', " ", q).split() if not w.startswith("-")]
+    terms = [p.strip() for p in phrases if p.strip()]
+    for word in words:
+        stem = re.sub(r"(ing|ed|es|s)$", "", word.lower())
+        terms.append(stem if len(stem) >= 3 else word)
+    if not terms:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+
+def highlight(field: str, text: str, pattern: Optional[re.Pattern]) -> Optional[dict]:
+    matches = [m.span() for m in pattern.finditer(text)] if pattern and text else []
+    if not matches:
+        return None
+    start = 0
+    if len(text) > SEARCH_SNIPPET_LENGTH:
+        start = max(min(matches[0][0] - SEARCH_SNIPPET_LENGTH // 4, len(text) - SEARCH_SNIPPET_LENGTH), 0)
+    end = start + SEARCH_SNIPPET_LENGTH
+    return {
+        "field": field,
+        "snippet": text[start:end],
+        "matches": [[s - start, min(e, end) - start] for s, e in matches if s < end and s >= start],
+        "truncated": start > 0 or end < len(text)
+    }
+
+SEARCH_FIELDS = {
+    "task": ("tasks", ["title", "description"], {"status": 1, "story_id": 1, "assigned_to": 1}),
+    "story": ("stories", ["title", "description", "brd", "prd"], {})
+}
+
+# textScore is computed per query and cannot be indexed, so unlike the list
+# endpoints there is no (score, id) keyset to seek past: each page re-ranks
+# the top offset + limit matches. The cursor carries the offset, which keeps
+# the option of a keyset later without changing clients.
+def encode_search_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> int:
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["offset"]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(offset, int) or not 0 < offset <= SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+@api_router.get("/search")
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    org_id: str = Depends(get_organization_id),
+    kind: Optional[str] = Query(None, alias="type", pattern="^(task|story)$"),
+    project_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None
+):
+    offset = decode_search_cursor(cursor) if cursor else 0
+    # Stories have no status, so a status filter limits the search to tasks
+    kinds = [k for k in SEARCH_FIELDS if kind in (None, k) and not (status and k == "story")]
+    window = offset + limit + 1
+    searches = []
+    for k in kinds:
+        collection, text_fields, extra = SEARCH_FIELDS[k]
+        query = {"organization_id": org_id, "$text": {"$search": q}}
+        if project_id:
+            query["project_id"] = project_id
+        if status:
+            query["status"] = status
+        projection = {"_id": 0, "id": 1, "project_id": 1, "priority": 1, **{f: 1 for f in text_fields}, **extra, "score": {"$meta": "textScore"}}
+        searches.append(db[collection].find(query, projection).sort([("score", {"$meta": "textScore"})]).limit(window).to_list(window))
+
+    rows = []
+    for k, docs in zip(kinds, await asyncio.gather(*searches)):
+        rows += [{"type": k, **doc} for doc in docs]
+    rows.sort(key=lambda row: row['score'], reverse=True)
+
+    pattern = search_pattern(q)
+    results = []
+    for row in rows[offset:offset + limit]:
+        highlights = []
+        for field in SEARCH_FIELDS[row['type']][1]:
+            text = row.get(field) if field == "title" else row.pop(field, None)
+            match = highlight(field, text or "", pattern)
+            if match:
+                highlights.append(match)
+        results.append({**row, "highlights": highlights})
+    if len(rows) > offset + limit and offset + limit <= SEARCH_MAX_OFFSET:
+        response.headers["X-Next-Cursor"] = encode_search_cursor(offset + limit)
+    return {"query": q, "results": results}
 
 # Dashboard Endpoints
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(org_id: str = Depends(get_organization_id)):
-    total_projects = await db.projects.count_documents({"organization_id": org_id})
-    total_tasks = await db.tasks.count_documents({"organization_id": org_id})
-    total_stories = await db.stories.count_documents({"organization_id": org_id})
-    total_members = await db.team_members.count_documents({"organization_id": org_id})
-    
-    todo_tasks = await db.tasks.count_documents({"organization_id": org_id, "status": "TODO"})
-    in_progress_tasks = await db.tasks.count_documents({"organization_id": org_id, "status": "IN_PROGRESS"})
-    in_review_tasks = await db.tasks.count_documents({"organization_id": org_id, "status": "IN_REVIEW"})
-    done_tasks = await db.tasks.count_documents({"organization_id": org_id, "status": "DONE"})
-    
-    high_priority = await db.tasks.count_documents({"organization_id": org_id, "priority": "High"})
-    critical_priority = await db.tasks.count_documents({"organization_id": org_id, "priority": "Critical"})
+    if DASHBOARD_COUNTERS_ENABLED:
+        counts = await db.dashboard_counters.find_one({"organization_id": org_id}, {"_id": 0})
+        if not counts or "reconciled_at" not in counts:
+            counts, _ = await reconcile_dashboard_counters(org_id)
+    else:
+        counts = await compute_dashboard_counts(org_id)
     
+    status = counts.get('status', {})
+    priority = counts.get('priority', {})
     return {
-        "total_projects": total_projects,
-        "total_tasks": total_tasks,
-        "total_stories": total_stories,
-        "total_members": total_members,
+        "total_projects": counts.get('projects', 0),
+        "total_tasks": counts.get('tasks', 0),
+        "total_stories": counts.get('stories', 0),
+        "total_members": counts.get('team_members', 0),
         "task_breakdown": {
-            "todo": todo_tasks,
-            "in_progress": in_progress_tasks,
-            "in_review": in_review_tasks,
-            "done": done_tasks
+            "todo": status.get('TODO', 0),
+            "in_progress": status.get('IN_PROGRESS', 0),
+            "in_review": status.get('IN_REVIEW', 0),
+            "done": status.get('DONE', 0)
         },
         "priority_breakdown": {
-            "high": high_priority,
-            "critical": critical_priority
+            "high": priority.get('High', 0),
+            "critical": priority.get('Critical', 0)
         }
     }
 
+# Weekly summary window: an ISO week ("2024-W05"), an explicit from/to date
+# range, or the current week. Tasks match when any of their planning dates
+# falls inside the window; the dates are YYYY-MM-DD strings, so string range
+# bounds work and each $or branch uses its own (organization_id, <date>) index.
+def weekly_window(week: Optional[str], date_from: Optional[str], date_to: Optional[str]) -> tuple:
+    try:
+        if week:
+            year, _, week_number = week.upper().partition("-W")
+            start = date.fromisocalendar(int(year), int(week_number), 1)
+            end = start + timedelta(days=6)
+        elif date_from or date_to:
+            start = date.fromisoformat(date_from) if date_from else date.fromisoformat(date_to) - timedelta(days=6)
+            end = date.fromisoformat(date_to) if date_to else start + timedelta(days=6)
+        else:
+            today = datetime.now(timezone.utc).date()
+            start = today - timedelta(days=today.weekday())
+            end = start + timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid week or date range")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    return start, end
+
+def weekly_query(org_id: str, start: date, end: date) -> dict:
+    bounds = {"$gte": start.isoformat(), "$lt": (end + timedelta(days=1)).isoformat()}
+    return {
+        "organization_id": org_id,
+        "$or": [{"start_date": bounds}, {"end_date": bounds}, {"target_date": bounds}]
+    }
+
+WEEKLY_TASK_FIELDS = {"_id": 0, "id": 1, "title": 1, "status": 1, "assigned_to": 1, "start_date": 1, "end_date": 1, "target_date": 1, "priority": 1, "created_at": 1}
+# Shown in place of a missing or null value, in the summary and its pages alike
+WEEKLY_TASK_DEFAULTS = {"assigned_to": "Unassigned", "priority": "Medium"}
+
+# Tasks without a team are summarised under "Development", so that team's
+# page has to match them too
+def weekly_team_filter(team: str):
+    return {"$in": [team, None]} if team == "Development" else team
+
+def weekly_task(task: dict) -> dict:
+    return {**task, **{field: default for field, default in WEEKLY_TASK_DEFAULTS.items() if task.get(field) is None}}
+
 @api_router.get("/dashboard/weekly")
-async def get_weekly_summary(org_id: str = Depends(get_organization_id)):
-    all_tasks = await db.tasks.find({"organization_id": org_id}, {"_id": 0}).to_list(1000)
-    team_summary = {}
-    for task in all_tasks:
-        team = task.get('team', 'Development')
-        if team not in team_summary:
-            team_summary[team] = {"team": team, "total": 0, "done": 0, "in_progress": 0, "tasks": []}
-        team_summary[team]['total'] += 1
-        if task['status'] == 'DONE':
-            team_summary[team]['done'] += 1
-        elif task['status'] == 'IN_PROGRESS':
-            team_summary[team]['in_progress'] += 1
-        team_summary[team]['tasks'].append({
-            "id": task['id'],
-            "title": task['title'],
-            "status": task['status'],
-            "assigned_to": task.get('assigned_to', 'Unassigned'),
-            "start_date": task.get('start_date'),
-            "end_date": task.get('end_date'),
-            "target_date": task.get('target_date'),
-            "priority": task.get('priority', 'Medium')
+async def get_weekly_summary(
+    org_id: str = Depends(get_organization_id),
+    week: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    tasks_limit: int = Query(50, ge=0, le=MAX_PAGE_SIZE)
+):
+    start, end = weekly_window(week, date_from, date_to)
+    task_item = {
+        field: {"$ifNull": [f"${field}", WEEKLY_TASK_DEFAULTS[field]]} if field in WEEKLY_TASK_DEFAULTS else f"${field}"
+        for field in WEEKLY_TASK_FIELDS if field != "_id"
+    }
+    # $firstN needs MongoDB 5.2 or later
+    pipeline = [
+        {"$match": weekly_query(org_id, start, end)},
+        {"$sort": {"created_at": 1, "id": 1}},
+        {"$group": {
+            "_id": {"$ifNull": ["$team", "Development"]},
+            "total": {"$sum": 1},
+            "done": {"$sum": {"$cond": [{"$eq": ["$status", "DONE"]}, 1, 0]}},
+            "in_progress": {"$sum": {"$cond": [{"$eq": ["$status", "IN_PROGRESS"]}, 1, 0]}},
+            "tasks": {"$firstN": {"input": task_item, "n": max(tasks_limit, 1)}}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    teams = []
+    async for row in db.tasks.aggregate(pipeline):
+        tasks = row['tasks'][:tasks_limit]
+        teams.append({
+            "team": row['_id'],
+            "total": row['total'],
+            "done": row['done'],
+            "in_progress": row['in_progress'],
+            "tasks": tasks,
+            "next_cursor": encode_cursor(tasks[-1]) if tasks and row['total'] > len(tasks) else None
+        })
+    return {"from": start.isoformat(), "to": end.isoformat(), "teams": teams}
+
+@api_router.get("/dashboard/weekly/tasks")
+async def get_weekly_team_tasks(
+    response: Response,
+    team: str,
+    org_id: str = Depends(get_organization_id),
+    week: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    start, end = weekly_window(week, date_from, date_to)
+    query = {**weekly_query(org_id, start, end), "team": weekly_team_filter(team)}
+    tasks = await paginate(db.tasks, query, WEEKLY_TASK_FIELDS, limit, cursor, response)
+    return list_response([weekly_task(task) for task in tasks], response, trimmed=True)
+
+def snapshot_window(date_from: Optional[str], date_to: Optional[str]) -> tuple:
+    try:
+        end = date.fromisoformat(date_to) if date_to else datetime.now(timezone.utc).date()
+        start = date.fromisoformat(date_from) if date_from else end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    return start, end
+
+async def snapshot_series(org_id: str, project_id: str, start: date, end: date) -> List[dict]:
+    return await db.analytics_snapshots.find(
+        {"organization_id": org_id, "project_id": project_id, "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+        {"_id": 0, "day": 1, "counts": 1, "points": 1, "total_tasks": 1, "total_points": 1}
+    ).sort("day", 1).to_list(None)
+
+@api_router.get("/analytics/projects/{project_id}/burndown")
+async def get_burndown(
+    project_id: str,
+    org_id: str = Depends(get_organization_id),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to")
+):
+    start, end = snapshot_window(date_from, date_to)
+    series = []
+    for snapshot in await snapshot_series(org_id, project_id, start, end):
+        done_tasks = snapshot['counts'].get('DONE', 0)
+        done_points = snapshot['points'].get('DONE', 0)
+        series.append({
+            "day": snapshot['day'],
+            "total_tasks": snapshot['total_tasks'],
+            "remaining_tasks": snapshot['total_tasks'] - done_tasks,
+            "total_points": snapshot['total_points'],
+            "remaining_points": snapshot['total_points'] - done_points,
+            "completed_points": done_points
         })
-    return {"teams": list(team_summary.values())}
+    return {"project_id": project_id, "from": start.isoformat(), "to": end.isoformat(), "series": series}
+
+@api_router.get("/analytics/projects/{project_id}/cumulative-flow")
+async def get_cumulative_flow(
+    project_id: str,
+    org_id: str = Depends(get_organization_id),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    metric: str = Query("counts", pattern="^(counts|points)$")
+):
+    start, end = snapshot_window(date_from, date_to)
+    snapshots = await snapshot_series(org_id, project_id, start, end)
+    statuses = ["TODO", "IN_PROGRESS", "IN_REVIEW", "DONE"]
+    for snapshot in snapshots:
+        statuses += [status for status in snapshot[metric] if status not in statuses]
+    series = [
+        {"day": snapshot['day'], **{status: snapshot[metric].get(status, 0) for status in statuses}}
+        for snapshot in snapshots
+    ]
+    return {"project_id": project_id, "metric": metric, "from": start.isoformat(), "to": end.isoformat(), "statuses": statuses, "series": series}
 
 @api_router.get("/dashboard/performance")
 async def get_team_performance(org_id: str = Depends(get_organization_id)):
-    members = await db.team_members.find({"organization_id": org_id}, {"_id": 0}).to_list(1000)
+    # Task stats are grouped by assignee, then merged with the team roster so
+    # members without tasks still show up and non-member assignees drop out.
+    pipeline = [
+        {"$match": {"organization_id": org_id, "assigned_to": {"$ne": None}}},
+        {"$group": {
+            "_id": "$assigned_to",
+            "total_tasks": {"$sum": 1},
+            "completed_tasks": {"$sum": {"$cond": [{"$eq": ["$status", "DONE"]}, 1, 0]}},
+            "in_progress_tasks": {"$sum": {"$cond": [{"$eq": ["$status", "IN_PROGRESS"]}, 1, 0]}},
+            "total_story_points": {"$sum": {"$ifNull": ["$story_points", 0]}}
+        }},
+        {"$unionWith": {
+            "coll": "team_members",
+            "pipeline": [
+                {"$match": {"organization_id": org_id}},
+                {"$project": {"_id": "$name", "member": {"email": "$email", "role": "$role", "created_at": "$created_at"}}}
+            ]
+        }},
+        {"$group": {
+            "_id": "$_id",
+            "members": {"$push": "$member"},
+            "total_tasks": {"$sum": "$total_tasks"},
+            "completed_tasks": {"$sum": "$completed_tasks"},
+            "in_progress_tasks": {"$sum": "$in_progress_tasks"},
+            "total_story_points": {"$sum": "$total_story_points"}
+        }},
+        {"$unwind": "$members"},
+        {"$sort": {"members.created_at": 1}}
+    ]
     performance = []
-    for member in members:
-        member_tasks = await db.tasks.find({"organization_id": org_id, "assigned_to": member['name']}, {"_id": 0}).to_list(1000)
-        total = len(member_tasks)
-        completed = sum(1 for t in member_tasks if t['status'] == 'DONE')
-        in_progress = sum(1 for t in member_tasks if t['status'] == 'IN_PROGRESS')
-        story_points = sum(t.get('story_points', 0) for t in member_tasks if t.get('story_points'))
+    async for row in db.tasks.aggregate(pipeline):
+        total = row['total_tasks']
+        completed = row['completed_tasks']
         performance.append({
-            "name": member['name'],
-            "email": member['email'],
-            "role": member['role'],
+            "name": row['_id'],
+            "email": row['members']['email'],
+            "role": row['members']['role'],
             "total_tasks": total,
             "completed_tasks": completed,
-            "in_progress_tasks": in_progress,
+            "in_progress_tasks": row['in_progress_tasks'],
             "completion_rate": round((completed / total * 100) if total > 0 else 0, 1),
-            "total_story_points": story_points
+            "total_story_points": row['total_story_points']
         })
     return {"performance": performance}
 
+@api_router.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.content_type)
+
 @api_router.get("/")
 async def root():
     return {"message": "TaskFlow Multi-Tenant API"}
@@ -916,9 +2518,17 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+app.add_middleware(CommandBudgetMiddleware, budget=command_budget)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if broadcaster.backend is not None:
+        await broadcaster.backend.stop()
+    await snapshot_scheduler.stop()
+    await audit_queue.drain()
+    password_executor.shutdown(wait=False)
     client.close()
\ No newline at end of file
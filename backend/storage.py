@@ -0,0 +1,1292 @@
+"""
+Embedded in-memory storage engine for the TaskFlow API
+
+Implements the subset of the Motor API that server.py uses (collection
+find/insert/update/delete, find_one_and_*, bulk_write, aggregate, indexes)
+over plain dicts, so single-node installs and tests can run without MongoDB.
+
+Each collection keeps its documents in insertion order keyed by _id. Queries
+that pin a prefix of a registered index with equality or $in are narrowed
+through posting lists built lazily per prefix; text indexes keep an inverted
+term index, and unique indexes are enforced on their full key. Stored
+documents are never mutated in place - writes replace them - so snapshots
+can be encoded off the event loop. Snapshots are BSON files, one per
+collection, written atomically under the snapshot directory.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+# Document helpers
+
+def clone(value):
+    if isinstance(value, dict):
+        return {k: clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone(v) for v in value]
+    return value
+
+
+# Values are stored as BSON would round-trip them: millisecond UTC datetimes
+# and lists for tuples, so ordering and equality match a MongoDB deployment
+def stored(value):
+    if isinstance(value, dict):
+        return {k: stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [stored(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return tuple((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def lookup(value, parts: list) -> list:
+    """All values at a dotted path, expanding arrays of subdocuments"""
+    if not parts:
+        return [value]
+    if isinstance(value, dict):
+        return lookup(value[parts[0]], parts[1:]) if parts[0] in value else [MISSING]
+    if isinstance(value, list):
+        if parts[0].isdigit():
+            index = int(parts[0])
+            return lookup(value[index], parts[1:]) if index < len(value) else [MISSING]
+        found = []
+        for item in value:
+            if isinstance(item, dict):
+                found += lookup(item, parts)
+        return found or [MISSING]
+    return [MISSING]
+
+
+def get_path(doc: dict, path: str):
+    return lookup(doc, path.split("."))[0]
+
+
+def set_path(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def unset_path(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+# Values of different BSON types order by type first, as in MongoDB
+def type_rank(value) -> int:
+    if value is MISSING or value is None:
+        return 0
+    if isinstance(value, bool):
+        return 6
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 5
+    if isinstance(value, datetime):
+        return 7
+    return 8
+
+
+def sort_value(value):
+    rank = type_rank(value)
+    if rank == 0:
+        return (0, 0)
+    if rank == 7:
+        return (7, value.timestamp())
+    if rank in (3, 4):
+        return (rank, repr(value))
+    if rank == 5:
+        return (5, str(value))
+    return (rank, value)
+
+
+def compare(a, b) -> Optional[int]:
+    """-1/0/1 for values of the same type, None when they don't compare"""
+    if type_rank(a) != type_rank(b):
+        return None
+    left, right = sort_value(a), sort_value(b)
+    return (left > right) - (left < right)
+
+
+def values_equal(a, b) -> bool:
+    if a is MISSING:
+        a = None
+    if b is MISSING:
+        b = None
+    if isinstance(a, datetime) and isinstance(b, datetime):
+        return a.timestamp() == b.timestamp()
+    return type_rank(a) == type_rank(b) and a == b
+
+
+# Query matching
+
+BSON_TYPES = {
+    "string": str, "object": dict, "array": list, "bool": bool, "date": datetime,
+    "objectId": ObjectId, "int": int, "double": float, "number": (int, float),
+}
+
+
+def expanded(candidates: list) -> list:
+    values = list(candidates)
+    for value in candidates:
+        if isinstance(value, list):
+            values += value
+    return values
+
+
+def match_operator(op: str, arg, candidates: list, doc: dict) -> bool:
+    values = expanded(candidates)
+    if op == "$eq":
+        return any(values_equal(v, arg) for v in values)
+    if op == "$ne":
+        return not any(values_equal(v, arg) for v in values)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        for value in values:
+            result = compare(value, arg)
+            if result is None:
+                continue
+            if (op == "$gt" and result > 0) or (op == "$gte" and result >= 0) \
+                    or (op == "$lt" and result < 0) or (op == "$lte" and result <= 0):
+                return True
+        return False
+    if op == "$in":
+        return any(values_equal(v, a) for v in values for a in arg)
+    if op == "$nin":
+        return not any(values_equal(v, a) for v in values for a in arg)
+    if op == "$exists":
+        return any(v is not MISSING for v in candidates) == bool(arg)
+    if op == "$type":
+        expected = BSON_TYPES.get(arg)
+        if arg == "null":
+            return any(v is None for v in candidates)
+        return expected is not None and any(
+            isinstance(v, expected) and not (isinstance(v, bool) and expected in (int, (int, float)))
+            for v in candidates
+        )
+    if op == "$regex":
+        return False  # handled with $options in match_condition
+    if op == "$not":
+        return not match_condition(candidates, arg, doc)
+    if op == "$elemMatch":
+        for value in candidates:
+            if isinstance(value, list):
+                for item in value:
+                    if is_operator_dict(arg):
+                        if match_condition([item], arg, doc):
+                            return True
+                    elif isinstance(item, dict) and matches(item, arg):
+                        return True
+        return False
+    if op == "$size":
+        return any(isinstance(v, list) and len(v) == arg for v in candidates)
+    raise OperationFailure(f"Unsupported query operator {op} in memory storage")
+
+
+def is_operator_dict(value) -> bool:
+    return isinstance(value, dict) and bool(value) and all(k.startswith("$") for k in value)
+
+
+def match_condition(candidates: list, condition, doc: dict) -> bool:
+    if isinstance(condition, re.Pattern):
+        return any(isinstance(v, str) and condition.search(v) for v in expanded(candidates))
+    if not is_operator_dict(condition):
+        return match_operator("$eq", condition, candidates, doc)
+    for op, arg in condition.items():
+        if op == "$options":
+            continue
+        if op == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            pattern = re.compile(arg, flags) if isinstance(arg, str) else arg
+            if not match_condition(candidates, pattern, doc):
+                return False
+        elif not match_operator(op, arg, candidates, doc):
+            return False
+    return True
+
+
+def conjuncts(query: dict):
+    """(field, condition) pairs every match must satisfy, including $and clauses"""
+    for field, condition in query.items():
+        if field == "$and":
+            for clause in condition:
+                yield from conjuncts(clause)
+        elif not field.startswith("$"):
+            yield field, condition
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$text":
+            continue  # scored by the collection before matching
+        else:
+            # Fast path for the common top-level string equality
+            if type(condition) is str and "." not in key:
+                value = doc.get(key)
+                if type(value) is str:
+                    if value != condition:
+                        return False
+                    continue
+            if not match_condition(lookup(doc, key.split(".")), condition, doc):
+                return False
+    return True
+
+
+# Updates
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> dict:
+    if not any(k.startswith("$") for k in update):
+        return {"_id": doc.get("_id"), **clone(update)} if "_id" in doc else clone(update)
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                set_path(doc, path, clone(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(doc, path, clone(value))
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                current = get_path(doc, path)
+                set_path(doc, path, (0 if current in (MISSING, None) else current) + value)
+            elif op == "$push":
+                current = get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                items += clone(value["$each"]) if is_operator_dict(value) and "$each" in value else [clone(value)]
+                set_path(doc, path, items)
+            elif op == "$addToSet":
+                current = get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                for item in (value["$each"] if is_operator_dict(value) and "$each" in value else [value]):
+                    if not any(values_equal(item, existing) for existing in items):
+                        items.append(clone(item))
+                set_path(doc, path, items)
+            elif op == "$pull":
+                current = get_path(doc, path)
+                if isinstance(current, list):
+                    set_path(doc, path, [item for item in current if not pull_matches(item, value, doc)])
+            else:
+                raise OperationFailure(f"Unsupported update operator {op} in memory storage")
+    return doc
+
+
+def pull_matches(item, condition, doc: dict) -> bool:
+    if isinstance(condition, dict) and not is_operator_dict(condition):
+        return isinstance(item, dict) and matches(item, condition)
+    return match_condition([item], condition, doc)
+
+
+def upsert_seed(query: dict) -> dict:
+    doc = {}
+    for key, value in query.items():
+        if not key.startswith("$") and not is_operator_dict(value):
+            set_path(doc, key, clone(value))
+    return doc
+
+
+# Projection
+
+def project(doc: dict, projection: Optional[dict], score: Optional[float] = None) -> dict:
+    if not projection:
+        return clone(doc)
+    include = [k for k, v in projection.items() if k != "_id" and (isinstance(v, dict) or v)]
+    if include:
+        # Included fields keep the stored document's field order, as in MongoDB
+        result = {}
+        wanted = set(include)
+        for field, value in doc.items():
+            if field == "_id":
+                if projection.get("_id", 1):
+                    result["_id"] = value
+            elif field in wanted and not isinstance(projection[field], dict):
+                result[field] = clone(value)
+        for field in include:
+            spec = projection[field]
+            if isinstance(spec, dict) and spec.get("$meta") == "textScore":
+                result[field] = score or 0.0
+            elif isinstance(spec, dict) and "$elemMatch" in spec:
+                value = doc.get(field)
+                if isinstance(value, list):
+                    hit = next((item for item in value if isinstance(item, dict) and matches(item, spec["$elemMatch"])), MISSING)
+                    if hit is not MISSING:
+                        result[field] = [clone(hit)]
+            elif "." in field:
+                value = get_path(doc, field)
+                if value is not MISSING:
+                    set_path(result, field, clone(value))
+        return result
+    result = clone(doc)
+    for field, flag in projection.items():
+        if not flag:
+            unset_path(result, field)
+    return result
+
+
+def sort_spec(key, direction=None) -> list:
+    if isinstance(key, str):
+        return [(key, 1 if direction is None else direction)]
+    return list(key)
+
+
+def sorted_docs(docs: list, spec: list, scores: Optional[dict] = None, limit: Optional[int] = None) -> list:
+    directions = {1 if isinstance(direction, dict) else direction for _, direction in spec}
+    if len(directions) == 1 and not any(isinstance(direction, dict) for _, direction in spec):
+        # Single-direction sorts compare plain tuples, the common case
+        paths = [field.split(".") for field, _ in spec]
+        reverse = directions == {-1}
+
+        def plain_key(doc):
+            return tuple(sort_value(lookup(doc, path)[0]) for path in paths)
+
+        if limit is not None and limit < len(docs):
+            return (heapq.nlargest if reverse else heapq.nsmallest)(limit, docs, key=plain_key)
+        return sorted(docs, key=plain_key, reverse=reverse)
+
+    def key(doc):
+        parts = []
+        for field, direction in spec:
+            if isinstance(direction, dict):
+                value = scores.get(doc.get("_id"), 0.0) if scores else 0.0
+                parts.append(Descending((1, value)))
+                continue
+            value = sort_value(get_path(doc, field))
+            parts.append(value if direction == 1 else Descending(value))
+        return parts
+
+    if limit is not None and limit < len(docs):
+        return heapq.nsmallest(limit, docs, key=key)
+    return sorted(docs, key=key)
+
+
+class Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+# Text indexes keep an inverted index of stemmed terms. Matching mirrors the
+# $text behaviour the search endpoint relies on: quoted phrases must appear,
+# -terms exclude, and other words match by crude stem.
+
+@functools.lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    trimmed = re.sub(r"(ing|ed|es|s)$", "", word)
+    return trimmed if len(trimmed) >= 3 else word
+
+
+def parse_search(search: str) -> tuple:
+    """(phrases, terms, excluded terms) of a $search string"""
+    phrases = [p.lower() for p in re.findall(r'"([^"]+)"', search)]
+    words = re.sub(r'"[^"]*"', " ", search).lower().split()
+    excluded = {stem(w[1:]) for w in words if w.startswith("-") and len(w) > 1}
+    terms = {stem(w) for w in words if not w.startswith("-")}
+    terms |= {stem(w) for phrase in phrases for w in re.findall(r"\w+", phrase)}
+    return phrases, terms, excluded
+
+
+def text_terms(doc: dict, weights: dict) -> dict:
+    """Score contribution of each stemmed term in doc's text fields"""
+    contributions = {}
+    for field, weight in weights.items():
+        tokens = re.findall(r"\w+", str(doc.get(field) or "").lower())
+        for token in tokens:
+            term = stem(token)
+            contributions[term] = contributions.get(term, 0.0) + weight * 2 / len(tokens)
+    return contributions
+
+
+# Aggregation
+
+def evaluate(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        if expr == "$$ROOT":
+            return doc
+        value = get_path(doc, expr[1:])
+        return None if value is MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(item, doc) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1 and next(iter(expr)).startswith("$"):
+        op, arg = next(iter(expr.items()))
+        return evaluate_operator(op, arg, doc)
+    return {k: evaluate(v, doc) for k, v in expr.items()}
+
+
+def evaluate_operator(op: str, arg, doc):
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return evaluate(arg[1], doc) if truthy(evaluate(arg[0], doc)) else evaluate(arg[2], doc)
+    if op == "$ifNull":
+        for item in arg:
+            value = evaluate(item, doc)
+            if value is not None:
+                return value
+        return None
+    values = [evaluate(item, doc) for item in arg] if isinstance(arg, list) else [evaluate(arg, doc)]
+    if op == "$eq":
+        return values_equal(values[0], values[1])
+    if op == "$ne":
+        return not values_equal(values[0], values[1])
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        result = sort_value(values[0]) > sort_value(values[1]), sort_value(values[0]) == sort_value(values[1])
+        return {"$gt": result[0], "$gte": result[0] or result[1], "$lt": not (result[0] or result[1]), "$lte": not result[0]}[op]
+    if op == "$and":
+        return all(truthy(v) for v in values)
+    if op == "$or":
+        return any(truthy(v) for v in values)
+    if op == "$not":
+        return not truthy(values[0])
+    if op == "$in":
+        return any(values_equal(values[0], item) for item in (values[1] or []))
+    if op == "$size":
+        return len(values[0] or [])
+    if op == "$add":
+        return sum(v for v in values if isinstance(v, (int, float)))
+    if op == "$subtract":
+        return values[0] - values[1]
+    if op == "$multiply":
+        product = 1
+        for v in values:
+            product *= v
+        return product
+    if op == "$divide":
+        return values[0] / values[1]
+    if op == "$concat":
+        return None if any(v is None for v in values) else "".join(values)
+    raise OperationFailure(f"Unsupported aggregation operator {op} in memory storage")
+
+
+def truthy(value) -> bool:
+    return value not in (None, False, 0, MISSING)
+
+
+def accumulate(op: str, arg, docs: list):
+    if op == "$sum":
+        total = 0
+        for doc in docs:
+            value = evaluate(arg, doc)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total += value
+        return total
+    if op == "$avg":
+        values = [v for v in (evaluate(arg, d) for d in docs) if isinstance(v, (int, float))]
+        return sum(values) / len(values) if values else None
+    if op == "$push":
+        # Like MongoDB, documents missing the pushed field contribute nothing
+        if isinstance(arg, str) and arg.startswith("$") and arg != "$$ROOT":
+            return [v for v in (get_path(doc, arg[1:]) for doc in docs) if v is not MISSING]
+        return [evaluate(arg, doc) for doc in docs]
+    if op == "$addToSet":
+        items = []
+        for doc in docs:
+            value = evaluate(arg, doc)
+            if not any(values_equal(value, existing) for existing in items):
+                items.append(value)
+        return items
+    if op == "$first":
+        return evaluate(arg, docs[0]) if docs else None
+    if op == "$last":
+        return evaluate(arg, docs[-1]) if docs else None
+    if op == "$firstN":
+        return [evaluate(arg["input"], doc) for doc in docs[:evaluate(arg["n"], {})]]
+    if op in ("$max", "$min"):
+        values = [v for v in (evaluate(arg, d) for d in docs) if v is not None]
+        if not values:
+            return None
+        pick = max if op == "$max" else min
+        return pick(values, key=sort_value)
+    raise OperationFailure(f"Unsupported accumulator {op} in memory storage")
+
+
+def project_stage(doc: dict, spec: dict) -> dict:
+    fields = {k: v for k, v in spec.items() if k != "_id"}
+    if fields and all(v in (0, False) for v in fields.values()):
+        return project(doc, spec)
+    result = {}
+    id_spec = spec.get("_id", 1)
+    if id_spec in (1, True):
+        if "_id" in doc:
+            result["_id"] = doc["_id"]
+    elif id_spec not in (0, False):
+        result["_id"] = evaluate(id_spec, doc)
+    for field, value in fields.items():
+        if value in (1, True):
+            found = get_path(doc, field)
+            if found is not MISSING:
+                set_path(result, field, clone(found))
+        else:
+            set_path(result, field, evaluate(value, doc))
+    return result
+
+
+class MemoryAggregation:
+    def __init__(self, database: "MemoryDatabase", collection: "MemoryCollection", pipeline: list):
+        self._database = database
+        self._collection = collection
+        self._pipeline = pipeline
+        self._results = None
+
+    def _run(self) -> list:
+        if self._results is None:
+            with self._collection._command("aggregate"):
+                self._results = [clone(doc) for doc in run_source(self._collection, self._pipeline)]
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        results = self._run()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._run():
+            yield doc
+
+
+def run_source(collection: "MemoryCollection", pipeline: list) -> list:
+    """Run pipeline over a collection, using its indexes for a leading $match"""
+    if pipeline and "$match" in pipeline[0]:
+        docs, _ = collection._matching(pipeline[0]["$match"])
+        return run_pipeline(collection.database, docs, pipeline[1:])
+    return run_pipeline(collection.database, collection.all_docs(), pipeline)
+
+
+# Stages build new documents rather than editing their input, which may be
+# the stored documents themselves; the caller clones the final output.
+def run_pipeline(database: "MemoryDatabase", docs: list, pipeline: list) -> list:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif name == "$project":
+            docs = [project_stage(doc, spec) for doc in docs]
+        elif name in ("$addFields", "$set"):
+            extended = []
+            for doc in docs:
+                copy = clone(doc)
+                for field, expr in spec.items():
+                    set_path(copy, field, evaluate(expr, doc))
+                extended.append(copy)
+            docs = extended
+        elif name == "$group":
+            groups = {}
+            for doc in docs:
+                key = evaluate(spec["_id"], doc)
+                groups.setdefault(freeze(key), (key, []))[1].append(doc)
+            docs = []
+            for key, members in groups.values():
+                row = {"_id": key}
+                for field, accumulator in spec.items():
+                    if field != "_id":
+                        (op, arg), = accumulator.items()
+                        row[field] = accumulate(op, arg, members)
+                docs.append(row)
+        elif name == "$sort":
+            docs = sorted_docs(docs, list(spec.items()))
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$unwind":
+            path = (spec if isinstance(spec, str) else spec["path"])[1:]
+            keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+            unwound = []
+            for doc in docs:
+                value = get_path(doc, path)
+                if isinstance(value, list) and value:
+                    for item in value:
+                        copy = clone(doc)
+                        set_path(copy, path, item)
+                        unwound.append(copy)
+                elif isinstance(value, list) or value in (MISSING, None):
+                    if keep_empty:
+                        unwound.append(doc)
+                else:
+                    unwound.append(doc)
+            docs = unwound
+        elif name == "$unionWith":
+            coll, sub_pipeline = (spec, []) if isinstance(spec, str) else (spec["coll"], spec.get("pipeline", []))
+            docs = docs + run_source(database[coll], sub_pipeline)
+        elif name == "$facet":
+            docs = [{field: run_pipeline(database, docs, sub_pipeline) for field, sub_pipeline in spec.items()}]
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage {name} in memory storage")
+    return docs
+
+
+# Collections
+
+BULK_COMMANDS = {
+    InsertOne: "insert", UpdateOne: "update", UpdateMany: "update", ReplaceOne: "update",
+    DeleteOne: "delete", DeleteMany: "delete",
+}
+
+
+class CommandEvent(NamedTuple):
+    """What MemoryClient listeners receive for each command, as a driver would send it"""
+    database_name: str
+    collection: str
+    command_name: str
+    duration: float
+    succeeded: bool
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: dict, projection: Optional[dict]):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = None
+        self._limit = None
+        self._skip = 0
+
+    def sort(self, key, direction=None) -> "MemoryCursor":
+        self._sort = sort_spec(key, direction)
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit or None
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def batch_size(self, size: int) -> "MemoryCursor":
+        return self
+
+    def _results(self, length: Optional[int] = None) -> list:
+        limit = self._limit if length is None else min(self._limit or length, length)
+        with self._collection._command("find"):
+            return self._collection.query(self._query, self._projection, self._sort, self._skip, limit)
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        return self._results(length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class Postings:
+    """Hash lookup from the values of an index key prefix to _ids. Ids sit in
+    insertion-ordered dicts so lookups keep natural order."""
+
+    def __init__(self, fields: tuple):
+        self.fields = fields
+        self.paths = [field.split(".") for field in fields]
+        self.postings = {}
+
+    def keys(self, doc: dict) -> set:
+        per_field = []
+        for path in self.paths:
+            keys = {
+                freeze(None if value is MISSING else value)
+                for value in expanded(lookup(doc, path)) if not isinstance(value, list)
+            }
+            per_field.append(keys or {None})
+        return set(itertools.product(*per_field))
+
+    def add(self, doc: dict, keys: Optional[set] = None):
+        for key in self.keys(doc) if keys is None else keys:
+            self.postings.setdefault(key, {})[doc["_id"]] = None
+
+    def remove(self, doc: dict, keys: Optional[set] = None):
+        for key in self.keys(doc) if keys is None else keys:
+            ids = self.postings.get(key)
+            if ids:
+                ids.pop(doc["_id"], None)
+                if not ids:
+                    del self.postings[key]
+
+    def replace(self, previous: dict, doc: dict):
+        old_keys, new_keys = self.keys(previous), self.keys(doc)
+        if old_keys != new_keys:
+            self.remove(previous, old_keys - new_keys)
+            self.add(doc, new_keys - old_keys)
+
+    def lookup(self, values: list) -> dict:
+        """Ids whose prefix equals one combination of the given per-field values"""
+        keys = list(itertools.product(*values))
+        if len(keys) == 1:
+            return self.postings.get(keys[0], {})
+        ids = {}
+        for key in keys:
+            ids.update(self.postings.get(key, {}))
+        return ids
+
+
+class MemoryIndex:
+    """Index definition plus the state only unique and text indexes need"""
+
+    def __init__(self, document: dict):
+        self.name = document["name"]
+        self.keys = list(document["key"].items())
+        self.fields = [field for field, kind in self.keys if kind != "text"]
+        self.unique = document.get("unique", False)
+        self.text_weights = None
+        if any(kind == "text" for _, kind in self.keys):
+            text_fields = [field for field, kind in self.keys if kind == "text"]
+            weights = document.get("weights", {})
+            self.text_weights = {field: weights.get(field, 1) for field in text_fields}
+        self.unique_keys = {}
+        self.terms = {}
+
+    def unique_key(self, doc: dict):
+        return tuple(freeze(None if (v := get_path(doc, field)) is MISSING else v) for field in self.fields)
+
+    def add(self, doc: dict):
+        if self.unique:
+            self.unique_keys[self.unique_key(doc)] = doc["_id"]
+        if self.text_weights:
+            for term, score in text_terms(doc, self.text_weights).items():
+                self.terms.setdefault(term, {})[doc["_id"]] = score
+
+    def remove(self, doc: dict):
+        if self.unique and self.unique_keys.get(self.unique_key(doc)) == doc["_id"]:
+            del self.unique_keys[self.unique_key(doc)]
+        if self.text_weights:
+            for term in text_terms(doc, self.text_weights):
+                ids = self.terms.get(term)
+                if ids:
+                    ids.pop(doc["_id"], None)
+                    if not ids:
+                        del self.terms[term]
+
+    def replace(self, previous: dict, doc: dict):
+        if (self.unique and self.unique_key(previous) != self.unique_key(doc)) or \
+                (self.text_weights and any(previous.get(f) != doc.get(f) for f in self.text_weights)):
+            self.remove(previous)
+            self.add(doc)
+
+    def text_search(self, search: str, docs: dict) -> dict:
+        """Scores by _id of the documents matching a $text search"""
+        phrases, terms, excluded = parse_search(search)
+        scores = {}
+        for term in terms:
+            for _id, score in self.terms.get(term, {}).items():
+                scores[_id] = scores.get(_id, 0.0) + score
+        for term in excluded:
+            for _id in self.terms.get(term, {}):
+                scores.pop(_id, None)
+        if phrases:
+            scores = {
+                _id: score for _id, score in scores.items()
+                if all(any(p in str(docs[_id].get(f) or "").lower() for f in self.text_weights) for p in phrases)
+            }
+        return scores
+
+    def conflict(self, doc: dict) -> bool:
+        if not self.unique:
+            return False
+        owner = self.unique_keys.get(self.unique_key(doc))
+        return owner is not None and owner != doc["_id"]
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str, docs: Optional[list] = None):
+        self.database = database
+        self.name = name
+        self._docs = {}
+        self._indexes = {}
+        self._postings = {}
+        self.version = 0
+        for doc in docs or []:
+            self._docs[doc["_id"]] = doc
+
+    # Reads
+
+    def all_docs(self) -> list:
+        return list(self._docs.values())
+
+    # Every index prefix the query pins with equality or $in gets postings,
+    # built on first use and maintained by writes from then on; the smallest
+    # matching id set seeds the scan.
+    def _candidates(self, query: dict) -> list:
+        equal = {}
+        for field, condition in conjuncts(query):
+            values = condition["$in"] if is_operator_dict(condition) and set(condition) == {"$in"} else \
+                None if is_operator_dict(condition) else [condition]
+            if values is not None and not any(isinstance(v, (dict, list, re.Pattern)) for v in values):
+                equal[field] = [freeze(stored(v)) for v in values]
+        best = None
+        for index in self._indexes.values():
+            prefix = tuple(itertools.takewhile(equal.__contains__, index.fields))
+            if not prefix:
+                continue
+            if prefix not in self._postings:
+                postings = Postings(prefix)
+                for doc in self._docs.values():
+                    postings.add(doc)
+                self._postings[prefix] = postings
+            ids = self._postings[prefix].lookup([equal[field] for field in prefix])
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return self.all_docs()
+        return [self._docs[_id] for _id in best]
+
+    def _text_index(self) -> MemoryIndex:
+        for index in self._indexes.values():
+            if index.text_weights:
+                return index
+        raise OperationFailure("text index required for $text query", code=27)
+
+    def _matching(self, query: dict, sort: Optional[list] = None, skip: int = 0,
+                  limit: Optional[int] = None) -> tuple:
+        """Stored documents matching query, plus text scores for $text queries"""
+        docs = self._candidates(query)
+        scores = None
+        if "$text" in query:
+            scores = self._text_index().text_search(query["$text"]["$search"], self._docs)
+            if len(scores) < len(docs):
+                docs = [self._docs[_id] for _id in scores]
+            else:
+                docs = [doc for doc in docs if doc["_id"] in scores]
+        if not sort and limit is not None:
+            # Unsorted reads stop at the first skip + limit matches
+            found = []
+            for doc in docs:
+                if matches(doc, query):
+                    found.append(doc)
+                    if len(found) >= skip + limit:
+                        break
+            return found[skip:], scores
+        docs = [doc for doc in docs if matches(doc, query)]
+        if sort:
+            docs = sorted_docs(docs, sort, scores, None if limit is None else skip + limit)
+        docs = docs[skip:skip + limit] if limit is not None else docs[skip:]
+        return docs, scores
+
+    def query(self, query: dict, projection: Optional[dict] = None, sort: Optional[list] = None,
+              skip: int = 0, limit: Optional[int] = None) -> list:
+        docs, scores = self._matching(query, sort, skip, limit)
+        return [project(doc, projection, scores.get(doc["_id"]) if scores else None) for doc in docs]
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None, limit: int = 0) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if sort:
+            cursor.sort(sort)
+        if limit:
+            cursor.limit(limit)
+        return cursor
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None):
+        with self._command("find"):
+            docs = self.query(filter or {}, projection, sort_spec(sort) if sort else None, 0, 1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: dict) -> int:
+        with self._command("aggregate"):
+            return len(self._matching(filter)[0])
+
+    async def estimated_document_count(self) -> int:
+        return len(self._docs)
+
+    def aggregate(self, pipeline: list) -> MemoryAggregation:
+        return MemoryAggregation(self.database, self, pipeline)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("Change streams are not supported by the memory storage backend")
+
+    def _emit(self, name: str, duration: float, succeeded: bool):
+        event = CommandEvent(self.database.name, self.name, name, duration, succeeded)
+        for listener in self.database.client.listeners:
+            listener(event)
+
+    @contextmanager
+    def _command(self, name: str):
+        if not self.database.client.listeners:
+            yield
+            return
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            self._emit(name, time.perf_counter() - started, succeeded)
+
+    # Writes
+
+    def _check_unique(self, doc: dict):
+        for index in self._indexes.values():
+            if index.conflict(doc):
+                key = dict(zip(index.fields, index.unique_key(doc)))
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name} dup key: {key}",
+                    11000, {"keyValue": key}
+                )
+
+    def _store(self, doc: dict, previous: Optional[dict] = None):
+        doc = stored(doc)
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        for structure in (*self._postings.values(), *self._indexes.values()):
+            if previous is None:
+                structure.add(doc)
+            else:
+                structure.replace(previous, doc)
+        self.version += 1
+
+    def _insert(self, document: dict):
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+        self._store(document)
+        return document["_id"]
+
+    def _update(self, filter: dict, update: dict, upsert: bool = False, multi: bool = False, sort=None) -> tuple:
+        """Returns (matched, modified, upserted_id, [(before, after)])"""
+        targets, _ = self._matching(filter, sort_spec(sort) if sort else None, 0, None if multi else 1)
+        changes = []
+        for previous in targets:
+            updated = stored(apply_update(clone(previous), update))
+            updated["_id"] = previous["_id"]
+            if updated != previous:
+                self._store(updated, previous)
+            changes.append((previous, updated))
+        if targets or not upsert:
+            return len(targets), sum(1 for before, after in changes if before != after), None, changes
+        seed = apply_update(upsert_seed(filter), update, inserting=True)
+        upserted_id = self._insert(seed)
+        return 0, 0, upserted_id, [(None, self._docs[upserted_id])]
+
+    def _delete(self, filter: dict, multi: bool = False) -> list:
+        targets, _ = self._matching(filter, None, 0, None if multi else 1)
+        removed = []
+        for target in targets:
+            doc = self._docs.pop(target["_id"])
+            for structure in (*self._postings.values(), *self._indexes.values()):
+                structure.remove(doc)
+            removed.append(doc)
+        if removed:
+            self.version += 1
+        return removed
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        with self._command("insert"):
+            return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: list, ordered: bool = True) -> InsertManyResult:
+        result = await self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult([doc["_id"] for doc in documents if "_id" in doc], result.acknowledged)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        with self._command("update"):
+            return self._update_result(*self._update(filter, update, upsert))
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        with self._command("update"):
+            return self._update_result(*self._update(filter, update, upsert, multi=True))
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False) -> UpdateResult:
+        with self._command("update"):
+            return self._update_result(*self._update(filter, replacement, upsert))
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id, changes) -> UpdateResult:
+        raw = {"n": matched + (1 if upserted_id is not None else 0), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        with self._command("delete"):
+            return DeleteResult({"n": len(self._delete(filter))}, True)
+
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        with self._command("delete"):
+            return DeleteResult({"n": len(self._delete(filter, multi=True))}, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None, sort=None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE):
+        with self._command("findAndModify"):
+            _, _, _, changes = self._update(filter, update, upsert, sort=sort)
+        if not changes:
+            return None
+        before, after = changes[0]
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return project(doc, projection) if doc is not None else None
+
+    async def find_one_and_replace(self, filter: dict, replacement: dict, projection: Optional[dict] = None,
+                                   sort=None, upsert: bool = False, return_document: bool = ReturnDocument.BEFORE):
+        return await self.find_one_and_update(filter, replacement, projection, sort, upsert, return_document)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None):
+        with self._command("findAndModify"):
+            targets, _ = self._matching(filter, sort_spec(sort) if sort else None, 0, 1)
+            removed = self._delete({"_id": targets[0]["_id"]}) if targets else []
+        if not targets:
+            return None
+        return project(removed[0], projection) if removed else None
+
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        # One command per run of same-kind operations, as the driver batches them
+        kinds = [BULK_COMMANDS.get(type(request), "unknown") for request in requests]
+        if not ordered:
+            kinds = sorted(set(kinds), key=kinds.index)
+        runs = [kind for i, kind in enumerate(kinds) if i == 0 or kinds[i - 1] != kind]
+        for name in runs[1:]:
+            self._emit(name, 0.0, True)
+        with self._command(runs[0] if runs else "insert"):
+            return self._bulk_write(requests, ordered)
+
+    def _bulk_write(self, requests: list, ordered: bool) -> BulkWriteResult:
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [], "writeErrors": []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    counts["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    matched, modified, upserted_id, _ = self._update(
+                        request._filter, request._doc, request._upsert, multi=isinstance(request, UpdateMany)
+                    )
+                    counts["nMatched"] += matched
+                    counts["nModified"] += modified
+                    if upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    counts["nRemoved"] += len(self._delete(request._filter, multi=isinstance(request, DeleteMany)))
+                else:
+                    raise OperationFailure(f"Unsupported bulk operation {type(request).__name__}")
+            except DuplicateKeyError as e:
+                counts["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+        del counts["writeErrors"]
+        return BulkWriteResult(counts, True)
+
+    # Indexes
+
+    async def create_indexes(self, models: list) -> list:
+        with self._command("createIndexes"):
+            return [self._create_index(dict(model.document)) for model in models]
+
+    async def create_index(self, keys, **kwargs) -> str:
+        with self._command("createIndexes"):
+            return self._create_index(dict(IndexModel(keys, **kwargs).document))
+
+    def _create_index(self, document: dict) -> str:
+        existing = self._indexes.get(document["name"])
+        if existing is not None:
+            return existing.name
+        index = MemoryIndex(document)
+        for doc in self._docs.values():
+            if index.conflict(doc):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {index.name}", 11000)
+            index.add(doc)
+        self._indexes[index.name] = index
+        return index.name
+
+    async def index_information(self) -> dict:
+        return {name: {"key": index.keys, "unique": index.unique} for name, index in self._indexes.items()}
+
+    async def drop(self):
+        self._emit("drop", 0.0, True)
+        self._docs.clear()
+        for postings in self._postings.values():
+            postings.postings.clear()
+        for index in self._indexes.values():
+            index.unique_keys.clear()
+            index.terms.clear()
+        self.version += 1
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._snapshot_versions = {}
+        if client.snapshot_dir:
+            self._load(client.snapshot_dir / name)
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> list:
+        return [name for name, collection in self._collections.items() if collection._docs]
+
+    async def command(self, command, *args, **kwargs) -> dict:
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {command} in memory storage")
+
+    def _load(self, directory: Path):
+        if not directory.is_dir():
+            return
+        for path in sorted(directory.glob("*.bson")):
+            docs = bson.decode_all(path.read_bytes(), CODEC_OPTIONS)
+            collection = MemoryCollection(self, path.stem, docs)
+            self._collections[path.stem] = collection
+            self._snapshot_versions[path.stem] = collection.version
+        logger.info("Loaded %d collections from %s", len(self._collections), directory)
+
+    def dirty_collections(self) -> list:
+        return [
+            (name, collection.version, collection.all_docs())
+            for name, collection in self._collections.items()
+            if self._snapshot_versions.get(name) != collection.version
+        ]
+
+
+def write_snapshot(directory: Path, name: str, docs: list):
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{name}.bson"
+    temporary = directory / f".{name}.bson.tmp"
+    with open(temporary, "wb") as f:
+        for doc in docs:
+            f.write(bson.encode(doc))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, target)
+
+
+class MemoryClient:
+    """Drop-in for AsyncIOMotorClient backed by MemoryDatabase instances
+
+    Callables appended to listeners receive a CommandEvent per command, the
+    counterpart of a pymongo CommandListener for the Mongo backend.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None, snapshot_interval: float = 30.0):
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = 0
+        self.last_snapshot = None
+        self.listeners = []
+        self._databases = {}
+        self._snapshotter = None
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        return self[name]
+
+    def start(self):
+        if self.snapshot_dir and self.snapshot_interval > 0 and self._snapshotter is None:
+            self._snapshotter = asyncio.create_task(self._run())
+
+    async def snapshot(self) -> int:
+        """Write every collection changed since the last snapshot; returns how many"""
+        if not self.snapshot_dir:
+            return 0
+        loop = asyncio.get_running_loop()
+        written = 0
+        for database in list(self._databases.values()):
+            for name, version, docs in database.dirty_collections():
+                await loop.run_in_executor(None, write_snapshot, self.snapshot_dir / database.name, name, docs)
+                database._snapshot_versions[name] = version
+                written += 1
+        self.snapshots += 1
+        self.last_snapshot = time.time()
+        return written
+
+    def snapshot_sync(self) -> int:
+        if not self.snapshot_dir:
+            return 0
+        written = 0
+        for database in self._databases.values():
+            for name, version, docs in database.dirty_collections():
+                write_snapshot(self.snapshot_dir / database.name, name, docs)
+                database._snapshot_versions[name] = version
+                written += 1
+        return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception:
+                logger.exception("Memory storage snapshot failed")
+
+    def close(self):
+        if self._snapshotter is not None:
+            self._snapshotter.cancel()
+            self._snapshotter = None
+        self.snapshot_sync()
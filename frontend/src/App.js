@@ -37,6 +37,18 @@ axios.interceptors.request.use((config) => {
   return config;
 });
 
+// List endpoints return one page at a time; follow X-Next-Cursor to the end
+const getAllPages = async (url) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, { params: { limit: 1000, ...(cursor ? { cursor } : {}) } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { data: items };
+};
+
 const Sidebar = () => {
   const { currentUser, currentOrganization, logout, canAccessTab } = useUser();
 
@@ -267,7 +279,7 @@ const Projects = () => {
 
   const fetchProjects = async () => {
     try {
-      const response = await axios.get(`${API}/projects`);
+      const response = await getAllPages(`${API}/projects`);
       setProjects(response.data);
       if (response.data.length > 0 && !selectedProject) {
         setSelectedProject(response.data[0]);
@@ -279,7 +291,7 @@ const Projects = () => {
 
   const fetchStories = async (projectId) => {
     try {
-      const response = await axios.get(`${API}/stories?project_id=${projectId}`);
+      const response = await getAllPages(`${API}/stories?project_id=${projectId}`);
       setStories(response.data);
     } catch (e) {
       console.error("Error fetching stories:", e);
@@ -288,7 +300,7 @@ const Projects = () => {
 
   const fetchTasks = async (projectId) => {
     try {
-      const response = await axios.get(`${API}/tasks?project_id=${projectId}`);
+      const response = await getAllPages(`${API}/tasks?project_id=${projectId}`);
       setTasks(response.data);
     } catch (e) {
       console.error("Error fetching tasks:", e);
@@ -297,7 +309,7 @@ const Projects = () => {
 
   const fetchTeamMembers = async () => {
     try {
-      const response = await axios.get(`${API}/team`);
+      const response = await getAllPages(`${API}/team`);
       setTeamMembers(response.data);
     } catch (e) {
       console.error("Error fetching team members:", e);
@@ -741,7 +753,7 @@ const StoryDetail = () => {
 
   const fetchTasks = async () => {
     try {
-      const response = await axios.get(`${API}/tasks?story_id=${storyId}`);
+      const response = await getAllPages(`${API}/tasks?story_id=${storyId}`);
       setTasks(response.data);
     } catch (e) {
       console.error("Error fetching tasks:", e);
@@ -750,7 +762,7 @@ const StoryDetail = () => {
 
   const fetchTeamMembers = async () => {
     try {
-      const response = await axios.get(`${API}/team`);
+      const response = await getAllPages(`${API}/team`);
       setTeamMembers(response.data);
     } catch (e) {
       console.error("Error fetching team members:", e);
@@ -1089,7 +1101,7 @@ const KanbanBoard = () => {
 
   const fetchProjects = async () => {
     try {
-      const response = await axios.get(`${API}/projects`);
+      const response = await getAllPages(`${API}/projects`);
       setProjects(response.data);
       if (response.data.length > 0) {
         setSelectedProject(response.data[0].id);
@@ -1101,7 +1113,7 @@ const KanbanBoard = () => {
 
   const fetchTasks = async () => {
     try {
-      const response = await axios.get(`${API}/tasks?project_id=${selectedProject}`);
+      const response = await getAllPages(`${API}/tasks?project_id=${selectedProject}`);
       setTasks(response.data);
     } catch (e) {
       console.error("Error fetching tasks:", e);
@@ -1110,7 +1122,7 @@ const KanbanBoard = () => {
 
   const fetchTeamMembers = async () => {
     try {
-      const response = await axios.get(`${API}/team`);
+      const response = await getAllPages(`${API}/team`);
       setTeamMembers(response.data);
     } catch (e) {
       console.error("Error fetching team members:", e);
@@ -1119,7 +1131,7 @@ const KanbanBoard = () => {
 
   const fetchStories = async () => {
     try {
-      const response = await axios.get(`${API}/stories?project_id=${selectedProject}`);
+      const response = await getAllPages(`${API}/stories?project_id=${selectedProject}`);
       setStories(response.data);
     } catch (e) {
       console.error("Error fetching stories:", e);
@@ -1410,7 +1422,7 @@ const TodoList = () => {
 
   const fetchTodoTasks = async () => {
     try {
-      const response = await axios.get(`${API}/tasks?status=TODO`);
+      const response = await getAllPages(`${API}/tasks?status=TODO`);
       setTasks(response.data);
     } catch (e) {
       console.error("Error fetching todo tasks:", e);
@@ -1419,7 +1431,7 @@ const TodoList = () => {
 
   const fetchProjects = async () => {
     try {
-      const response = await axios.get(`${API}/projects`);
+      const response = await getAllPages(`${API}/projects`);
       setProjects(response.data);
     } catch (e) {
       console.error("Error fetching projects:", e);
@@ -1428,7 +1440,7 @@ const TodoList = () => {
 
   const fetchTeamMembers = async () => {
     try {
-      const response = await axios.get(`${API}/team`);
+      const response = await getAllPages(`${API}/team`);
       setTeamMembers(response.data);
     } catch (e) {
       console.error("Error fetching team members:", e);
@@ -1758,7 +1770,7 @@ const Team = () => {
 
   const fetchMembers = async () => {
     try {
-      const response = await axios.get(`${API}/team`);
+      const response = await getAllPages(`${API}/team`);
       setMembers(response.data);
     } catch (e) {
       console.error("Error fetching team members:", e);
@@ -1767,7 +1779,7 @@ const Team = () => {
 
   const fetchDepartments = async () => {
     try {
-      const response = await axios.get(`${API}/departments`);
+      const response = await getAllPages(`${API}/departments`);
       setDepartments(response.data);
     } catch (e) {
       console.error("Error fetching departments:", e);
@@ -2033,7 +2045,7 @@ const Organizations = () => {
 
   const fetchOrganizations = async () => {
     try {
-      const response = await axios.get(`${API}/organizations`);
+      const response = await getAllPages(`${API}/organizations`);
       setOrganizations(response.data);
     } catch (e) {
       console.error("Error fetching organizations:", e);
@@ -2500,7 +2512,7 @@ const Departments = () => {
 
   const fetchDepartments = async () => {
     try {
-      const response = await axios.get(`${API}/departments`);
+      const response = await getAllPages(`${API}/departments`);
       setDepartments(response.data);
     } catch (e) {
       console.error("Error fetching departments:", e);
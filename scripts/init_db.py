@@ -11,7 +11,6 @@ import sys
 from pathlib import Path
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
-import hashlib
 import uuid
 
 # Add backend to path
@@ -23,14 +22,13 @@ from dotenv import load_dotenv
 ROOT_DIR = Path(__file__).parent.parent / 'backend'
 load_dotenv(ROOT_DIR / '.env')
 
+from indexes import INDEXES, ensure_indexes
+from passwords import hash_password_sync
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 db_name = os.environ['DB_NAME']
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 async def init_database():
     """Initialize database with master data"""
     print("=" * 60)
@@ -58,12 +56,12 @@ async def init_database():
                 "id": str(uuid.uuid4()),
                 "name": "Super Admin",
                 "email": "admin@gmail.com",
-                "password": hash_password("12345"),
+                "password": hash_password_sync("12345"),
                 "role": "SuperAdmin",
                 "organization_id": None,
                 "avatar": "",
                 "temp_password": "12345",
-                "created_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc),
                 "is_active": True
             }
             await db.users.insert_one(super_admin)
@@ -305,39 +303,14 @@ async def init_database():
         # 7. Create Indexes for Performance
         print("🔍 Creating Database Indexes...")
         
-        # Users indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("organization_id")
-        await db.users.create_index([("role", 1), ("organization_id", 1)])
-        print("✓ Users indexes created")
-        
-        # Organizations indexes
-        await db.organizations.create_index("subdomain", unique=True)
-        print("✓ Organizations indexes created")
-        
-        # Projects indexes
-        await db.projects.create_index("organization_id")
-        await db.projects.create_index([("organization_id", 1), ("created_at", -1)])
-        print("✓ Projects indexes created")
-        
-        # Tasks indexes
-        await db.tasks.create_index("organization_id")
-        await db.tasks.create_index([("organization_id", 1), ("status", 1)])
-        await db.tasks.create_index([("organization_id", 1), ("assigned_to", 1)])
-        await db.tasks.create_index([("organization_id", 1), ("project_id", 1)])
-        await db.tasks.create_index([("organization_id", 1), ("story_id", 1)])
-        print("✓ Tasks indexes created")
-        
-        # Action history indexes
-        await db.action_history.create_index("organization_id")
-        await db.action_history.create_index([("organization_id", 1), ("timestamp", -1)])
-        await db.action_history.create_index([("entity_type", 1), ("entity_id", 1)])
-        print("✓ Action history indexes created")
-        
-        # Team members indexes
-        await db.team_members.create_index("organization_id")
-        await db.team_members.create_index([("organization_id", 1), ("email", 1)])
-        print("✓ Team members indexes created")
+        failed = await ensure_indexes(db)
+        for collection in INDEXES:
+            if any(name.startswith(f"{collection}.") for name in failed):
+                print(f"⚠️  {collection} indexes incomplete")
+            else:
+                print(f"✓ {collection} indexes created")
+        for name, error in failed.items():
+            print(f"   - {name}: {error}")
         
         print()
         
@@ -354,6 +327,7 @@ async def init_database():
             "projects": await db.projects.count_documents({}),
             "stories": await db.stories.count_documents({}),
             "tasks": await db.tasks.count_documents({}),
+            "comments": await db.comments.count_documents({}),
             "team_members": await db.team_members.count_documents({}),
         }
         
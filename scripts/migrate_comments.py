@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Comment Migration Script for TaskFlow
+Moves comments embedded in task documents into the comments collection
+and records the count on each task as comment_count
+Safe to interrupt and re-run: comments are upserted by id and a task is
+only stripped of its embedded array once its comments have been copied
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent.parent / 'backend'
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+def parse_timestamp(value):
+    """Parse ISO-8601 strings written by older releases; pass datetimes through"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return datetime.now(timezone.utc)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def comment_documents(task):
+    """Build comments-collection documents for one task's embedded comments"""
+    documents = []
+    for comment in task.get("comments") or []:
+        if not isinstance(comment, dict):
+            continue
+        documents.append({
+            "id": comment.get("id") or str(uuid.uuid4()),
+            "organization_id": task["organization_id"],
+            "task_id": task["id"],
+            "user": comment.get("user", ""),
+            "text": comment.get("text", ""),
+            "created_at": parse_timestamp(comment.get("created_at")),
+        })
+    return documents
+
+async def migrate(batch_size):
+    """Lift embedded comments out of every task that still has them"""
+    print("=" * 60)
+    print("TaskFlow Comment Migration")
+    print("=" * 60)
+    print()
+
+    print("🔌 Connecting to MongoDB...")
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    print("✓ Connected successfully")
+    print()
+
+    try:
+        await db.comments.create_index([("task_id", 1), ("created_at", 1), ("id", 1)])
+
+        print(f"💬 Moving embedded comments (batch size {batch_size})...")
+        tasks_migrated = 0
+        comments_moved = 0
+        last_id = None
+        while True:
+            query = {"comments": {"$exists": True}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await db.tasks.find(
+                query, {"_id": 1, "id": 1, "organization_id": 1, "comments": 1}
+            ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+
+            comment_ops = []
+            task_ops = []
+            for task in batch:
+                documents = comment_documents(task)
+                # task_id leads the comments index, so each upsert probes only that task's comments
+                comment_ops += [
+                    UpdateOne({"task_id": doc["task_id"], "id": doc["id"]}, {"$setOnInsert": doc}, upsert=True)
+                    for doc in documents
+                ]
+                # Matching on the array's presence keeps the $inc from being applied twice
+                task_ops.append(UpdateOne(
+                    {"_id": task["_id"], "comments": {"$exists": True}},
+                    {"$unset": {"comments": ""}, "$inc": {"comment_count": len(documents)}}
+                ))
+                comments_moved += len(documents)
+
+            if comment_ops:
+                await db.comments.bulk_write(comment_ops, ordered=False)
+            await db.tasks.bulk_write(task_ops, ordered=False)
+
+            tasks_migrated += len(batch)
+            last_id = batch[-1]["_id"]
+            print(f"   … {tasks_migrated} tasks, {comments_moved} comments moved so far")
+
+        print()
+        print(f"✅ Migration complete: {comments_moved} comments moved from {tasks_migrated} tasks")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        print("   Re-run the script to continue; already-moved comments are skipped")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        client.close()
+
+    return True
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TaskFlow Comment Migration')
+    parser.add_argument('--batch-size', type=int, default=500, help='Tasks per batch (default: 500)')
+
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size))
+
+if __name__ == "__main__":
+    main()
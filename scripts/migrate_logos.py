@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Logo Migration Script for TaskFlow
+Moves base64 organization logos out of organization documents into the blob store
+so organization payloads only carry the logo URL and hash
+Safe to re-run: organizations whose logo is already a URL are skipped
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+import server
+
+async def migrate():
+    """Store every inline logo as a blob and rewrite the organization document"""
+    print("=" * 60)
+    print("TaskFlow Logo Migration")
+    print("=" * 60)
+    print()
+    
+    try:
+        print("🖼️  Moving inline logos to the blob store...")
+        migrated = 0
+        failed = 0
+        query = {"logo": {"$nin": ["", None], "$not": {"$regex": "^/api/organizations/"}}}
+        async for org in server.db.organizations.find(query, {"_id": 0, "id": 1, "name": 1, "logo": 1}):
+            try:
+                logo_fields = await server.store_logo(org['id'], org['logo'])
+            except server.HTTPException as e:
+                failed += 1
+                print(f"   ⚠️  {org['name']}: {e.detail}, left unchanged")
+                continue
+            result = await server.db.organizations.update_one(
+                {"id": org['id'], "logo": org['logo']},
+                {"$set": logo_fields}
+            )
+            if result.matched_count == 0:
+                # Logo changed or organization deleted since it was read
+                await server.release_blob(logo_fields['logo_hash'])
+                failed += 1
+                print(f"   ⚠️  {org['name']}: changed during migration, left unchanged")
+                continue
+            migrated += 1
+            print(f"   ✓ {org['name']}: {logo_fields['logo']}")
+        print()
+        print(f"✅ Migration complete: {migrated} logos moved, {failed} skipped")
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        server.client.close()
+    
+    return True
+
+def main():
+    """Main entry point"""
+    asyncio.run(migrate())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Timestamp Migration Script for TaskFlow
+Converts ISO-8601 string timestamps written by older releases into native BSON dates
+Safe to interrupt and re-run: progress is checkpointed per collection and only
+documents that still hold string timestamps are rewritten
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent.parent / 'backend'
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+MIGRATION_NAME = "timestamps_to_bson_dates"
+
+# Top-level timestamp fields per collection
+TIMESTAMP_FIELDS = {
+    "organizations": ["created_at"],
+    "users": ["created_at"],
+    "projects": ["created_at"],
+    "stories": ["created_at"],
+    "tasks": ["created_at", "updated_at"],
+    "team_members": ["created_at"],
+    "departments": ["created_at"],
+    "action_history": ["timestamp"],
+    "dashboard_counters": ["reconciled_at"],
+}
+
+# Arrays of embedded documents whose items carry their own timestamp
+EMBEDDED_TIMESTAMP_FIELDS = {
+    "tasks": {"comments": "created_at"},
+}
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 string into an aware UTC datetime, leaving other values untouched"""
+    if not isinstance(value, str):
+        return value
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def build_update(doc, fields, embedded):
+    """Return the $set document needed to convert one document, or None"""
+    changes = {}
+    for field in fields:
+        if isinstance(doc.get(field), str):
+            changes[field] = parse_timestamp(doc[field])
+    for array_field, item_field in embedded.items():
+        items = doc.get(array_field) or []
+        if any(isinstance(item, dict) and isinstance(item.get(item_field), str) for item in items):
+            changes[array_field] = [
+                {**item, item_field: parse_timestamp(item.get(item_field))} if isinstance(item, dict) else item
+                for item in items
+            ]
+    return changes or None
+
+async def migrate_collection(db, name, batch_size):
+    """Convert one collection in _id order, checkpointing after every batch"""
+    fields = TIMESTAMP_FIELDS.get(name, [])
+    embedded = EMBEDDED_TIMESTAMP_FIELDS.get(name, {})
+
+    conditions = [{field: {"$type": "string"}} for field in fields]
+    conditions += [{f"{array_field}.{item_field}": {"$type": "string"}} for array_field, item_field in embedded.items()]
+
+    state = await db.migrations.find_one({"name": MIGRATION_NAME, "collection": name}) or {}
+    if state.get("completed"):
+        print(f"   ✓ {name}: already migrated")
+        return 0
+
+    last_id = state.get("last_id")
+    converted = 0
+    while True:
+        query = {"$or": conditions}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[name].find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            changes = build_update(doc, fields, embedded)
+            if changes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if operations:
+            await db[name].bulk_write(operations, ordered=False)
+
+        converted += len(operations)
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"name": MIGRATION_NAME, "collection": name},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)}, "$inc": {"converted": len(operations)}},
+            upsert=True
+        )
+        print(f"   … {name}: {converted} documents converted so far")
+
+    await db.migrations.update_one(
+        {"name": MIGRATION_NAME, "collection": name},
+        {"$set": {"completed": True, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    print(f"   ✓ {name}: {converted} documents converted")
+    return converted
+
+async def migrate(collections, batch_size, restart=False):
+    """Run the migration over the requested collections"""
+    print("=" * 60)
+    print("TaskFlow Timestamp Migration")
+    print("=" * 60)
+    print()
+
+    print("🔌 Connecting to MongoDB...")
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    print("✓ Connected successfully")
+    print()
+
+    try:
+        if restart:
+            await db.migrations.delete_many({"name": MIGRATION_NAME})
+            print("🔁 Checkpoints cleared")
+            print()
+
+        print(f"🕒 Converting string timestamps (batch size {batch_size})...")
+        total = 0
+        for name in collections:
+            total += await migrate_collection(db, name, batch_size)
+        print()
+        print(f"✅ Migration complete: {total} documents converted")
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        print("   Re-run the script to resume from the last checkpoint")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        client.close()
+
+    return True
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TaskFlow Timestamp Migration')
+    parser.add_argument('--collection', action='append', choices=sorted(TIMESTAMP_FIELDS),
+                        help='Collection to migrate (repeatable, default: all)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Documents per batch (default: 1000)')
+    parser.add_argument('--restart', action='store_true', help='Ignore saved checkpoints and scan from the beginning')
+
+    args = parser.parse_args()
+    asyncio.run(migrate(args.collection or list(TIMESTAMP_FIELDS), args.batch_size, args.restart))
+
+if __name__ == "__main__":
+    main()
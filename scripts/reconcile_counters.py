@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Dashboard Counter Reconciliation Script for TaskFlow
+Rebuilds the per-organization dashboard_counters documents from the source collections
+Run this whenever the counters drift (e.g. after manual data fixes or a partial outage)
+Safe to run while the backend serves writes: each rebuild only replaces the counter
+revision it started from, and is recounted when a write lands in between
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+import server
+
+def nonzero(value):
+    """Drop zeroed-out status/priority buckets so they don't count as drift"""
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if v}
+    return value
+
+async def reconcile(org_ids=None):
+    """Reconcile counters for the given organizations, or all of them"""
+    print("=" * 60)
+    print("TaskFlow Dashboard Counter Reconciliation")
+    print("=" * 60)
+    print()
+    
+    try:
+        if not org_ids:
+            org_ids = [org['id'] async for org in server.db.organizations.find({}, {"_id": 0, "id": 1})]
+        
+        print(f"🔄 Reconciling {len(org_ids)} organization(s)...")
+        for org_id in org_ids:
+            before = await server.db.dashboard_counters.find_one({"organization_id": org_id}, {"_id": 0})
+            counts, stored = await server.reconcile_dashboard_counters(org_id)
+            drifted = before is not None and any(nonzero(before.get(k)) != nonzero(v) for k, v in counts.items())
+            if not stored:
+                marker = "⚠️  busy, not stored (re-run)"
+            else:
+                marker = "⚠️  drift fixed" if drifted else "✓"
+            print(f"   {marker} {org_id}: {counts['tasks']} tasks, {counts['projects']} projects, "
+                  f"{counts['stories']} stories, {counts['team_members']} members")
+        print()
+        print("✅ Reconciliation complete")
+        
+    except Exception as e:
+        print(f"❌ Error during reconciliation: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        server.client.close()
+    
+    return True
+
+def main():
+    """Main entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='TaskFlow Dashboard Counter Reconciliation')
+    parser.add_argument('org_ids', nargs='*', help='Organization ids to reconcile (default: all)')
+    
+    args = parser.parse_args()
+    asyncio.run(reconcile(args.org_ids))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Endpoint benchmark suite
+
+Drives every api_router route in process through httpx ASGITransport against
+seeded tenants of 1k, 10k and 100k tasks, using the in-memory storage backend
+so no MongoDB is needed and runs are repeatable. For each tenant size and
+route it reports p50/p95/p99 latency, throughput and the number of database
+commands one request issues, then compares against a stored baseline:
+
+- a route whose command count grows is a regression (an added round trip
+  costs nothing in memory but a network hop in production)
+- a route whose p95 grows by more than --tolerance (and --min-delta ms) is a
+  regression
+- a route answering any request with a 4xx/5xx is a regression, and no
+  baseline is saved from such a run
+
+The process exits non-zero when any regression is found. bcrypt runs at
+BCRYPT_ROUNDS=4 here; bench_password_hashing covers hashing cost. Run from the
+repo root:
+
+    python -m tests.benchmarks.bench_endpoints [--sizes 1000 10000 100000] [--requests 30]
+    python -m tests.benchmarks.bench_endpoints --save-baseline
+"""
+
+import argparse
+import asyncio
+import base64
+import contextvars
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ['STORAGE_SNAPSHOT_DIR'] = ''
+os.environ.setdefault('DB_NAME', 'benchmark')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('ANALYTICS_SNAPSHOT_INTERVAL', '0')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_bench_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'endpoints.json'
+SUPER_ADMIN = {"X-User-Role": "SuperAdmin"}
+STATUSES = ["TODO", "IN_PROGRESS", "IN_REVIEW", "DONE"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+TEAMS = ["Development", "QA", "Design"]
+WORDS = ["login", "billing", "report", "search", "export", "invoice", "dashboard", "profile", "upload", "sync"]
+PROJECTS_PER_TENANT = 10
+MEMBERS_PER_TENANT = 25
+# An 8 KiB logo, so the logo route serves a real file from the blob store
+LOGO = base64.b64encode(bytes(range(256)) * 32).decode()
+
+# (method, route, options) for every api_router route. Placeholders are filled
+# from the tenant's seeded ids plus {n}, a counter unique to each request.
+# "prepare" names a per-request setup call whose result feeds the placeholders;
+# "requests" caps the request count for routes that return a whole tenant.
+ROUTES = [
+    ("GET", "/", {}),
+    ("POST", "/auth/login", {"json": {"email": "{user_email}", "password": "bench-password"}}),
+    ("POST", "/auth/register", {"json": {"name": "Reg {n}", "email": "reg-{n}@bench.test", "password": "secret"}}),
+    ("POST", "/organizations", {"json": {"name": "Org {n}", "subdomain": "bench-new-{n}", "admin_name": "Ada", "admin_email": "ada-{n}@bench.test"}, "headers": SUPER_ADMIN}),
+    ("GET", "/organizations", {"headers": SUPER_ADMIN}),
+    ("GET", "/organizations/{org_id}", {}),
+    ("PATCH", "/organizations/{org_id}", {"json": {"name": "Tenant {n}"}, "headers": SUPER_ADMIN}),
+    ("GET", "/organizations/{org_id}/logo", {}),
+    ("GET", "/organizations/{org_id}/admin", {"headers": SUPER_ADMIN}),
+    ("POST", "/organizations/{org_id}/reset-password", {"headers": SUPER_ADMIN}),
+    ("POST", "/users", {"json": {"name": "Dev {n}", "email": "dev-{n}@{subdomain}.test", "password": "secret"}}),
+    ("GET", "/users", {}),
+    ("GET", "/users/{user_id}", {}),
+    ("PATCH", "/users/{user_id}", {"json": {"name": "Developer {n}"}}),
+    ("POST", "/projects", {"json": {"name": "Project {n}", "description": "Benchmark project"}}),
+    ("GET", "/projects", {}),
+    ("GET", "/projects/{project_id}", {}),
+    ("POST", "/stories", {"json": {"project_id": "{project_id}", "title": "Story {n}", "description": "Benchmark story"}}),
+    ("GET", "/stories", {"params": {"project_id": "{project_id}"}}),
+    ("GET", "/stories/{story_id}", {}),
+    ("PATCH", "/stories/{story_id}", {"json": {"title": "Story {n}"}}),
+    ("POST", "/tasks", {"json": {"project_id": "{project_id}", "story_id": "{story_id}", "title": "Task {n}", "description": "Benchmark task", "story_points": 3}}),
+    ("POST", "/tasks/bulk", {"json": {"tasks": [{"project_id": "{project_id}", "title": "Bulk {n}", "description": "Benchmark task"}] * 10}}),
+    ("PATCH", "/tasks/bulk", {"json": {"tasks": [{"id": "{task_id}", "priority": "High"}, {"id": "{other_task_id}", "priority": "Low"}]}}),
+    ("GET", "/tasks", {"params": {"project_id": "{project_id}", "status": "TODO"}}),
+    ("GET", "/tasks/{task_id}", {}),
+    ("PATCH", "/tasks/{task_id}", {"json": {"title": "Task {n}"}}),
+    ("POST", "/tasks/{task_id}/comments", {"json": {"task_id": "{task_id}", "user": "Bench", "text": "Comment {n}"}}),
+    ("GET", "/tasks/{task_id}/comments", {}),
+    ("POST", "/tasks/{task_id}/attachments", {"files": {"file": ("notes.txt", b"benchmark notes", "text/plain")}}),
+    ("GET", "/tasks/{task_id}/attachments/{attachment_id}", {"prepare": "attachment"}),
+    ("DELETE", "/tasks/{task_id}/attachments/{attachment_id}", {"prepare": "attachment"}),
+    ("POST", "/team", {"json": {"name": "Member {n}", "email": "member-{n}@{subdomain}.test", "role": "Developer"}}),
+    ("GET", "/team", {}),
+    ("GET", "/team/{member_id}", {}),
+    ("PATCH", "/team/{member_id}", {"json": {"role": "Lead"}}),
+    ("DELETE", "/team/{member_id}", {"prepare": "member"}),
+    ("POST", "/departments", {"json": {"name": "Department {n}", "description": "Benchmark department"}}),
+    ("GET", "/departments", {}),
+    ("GET", "/history", {}),
+    ("GET", "/export/{collection}", {"path": {"collection": "tasks"}, "params": {"project_id": "{project_id}"}, "requests": 3}),
+    ("GET", "/master/{kind}", {"path": {"kind": "statuses"}}),
+    ("GET", "/search", {"params": {"q": "login report"}}),
+    ("GET", "/dashboard/stats", {}),
+    ("GET", "/dashboard/weekly", {}),
+    ("GET", "/dashboard/weekly/tasks", {"params": {"team": "Development"}}),
+    ("GET", "/analytics/projects/{project_id}/burndown", {}),
+    ("GET", "/analytics/projects/{project_id}/cumulative-flow", {}),
+    ("GET", "/dashboard/performance", {}),
+    ("GET", "/metrics", {}),
+]
+
+# Routes that cannot be timed request-by-request. Any other route that fails a
+# request fails the run, so errors are never recorded as a baseline.
+SKIPPED_ROUTES = {
+    "/api/stream": "server-sent events never complete",
+}
+
+current_route = contextvars.ContextVar("current_route", default=None)
+request_counter = itertools.count()
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def fill(value, ids: dict):
+    if isinstance(value, str):
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, ids) for v in value]
+    return value
+
+
+def route_names() -> dict:
+    return {
+        (method, route.path): route.endpoint.__name__
+        for route in server.api_router.routes
+        for method in route.methods
+    }
+
+
+async def seed_tenant(size: int) -> dict:
+    """Insert one organization holding `size` tasks straight into storage"""
+    db = server.db
+    label = f"{size // 1000}k" if size >= 1000 else str(size)
+    org = server.Organization(name=f"Bench {label}", subdomain=f"bench-{label}")
+    await db.organizations.insert_one({**org.model_dump(), **await server.store_logo(org.id, LOGO)})
+    password = server.hash_password_sync("bench-password")
+    user = server.User(name="Bench Admin", email=f"admin@bench-{label}.test", password=password, role="Admin", organization_id=org.id)
+    await db.users.insert_one(user.model_dump())
+
+    now = datetime.now(timezone.utc)
+    members = [
+        server.TeamMember(organization_id=org.id, name=f"Member {i}", email=f"member{i}@bench-{label}.test", role="Developer", department=TEAMS[i % len(TEAMS)])
+        for i in range(MEMBERS_PER_TENANT)
+    ]
+    await db.team_members.insert_many([m.model_dump() for m in members])
+    projects = [
+        server.Project(organization_id=org.id, name=f"Project {i}", description="Seeded project", created_by="bench")
+        for i in range(PROJECTS_PER_TENANT)
+    ]
+    await db.projects.insert_many([p.model_dump() for p in projects])
+    stories = [
+        server.Story(organization_id=org.id, project_id=projects[i % len(projects)].id, title=f"Story {i} {WORDS[i % len(WORDS)]}", description="Seeded story")
+        for i in range(max(size // 20, 1))
+    ]
+    await db.stories.insert_many([s.model_dump() for s in stories])
+
+    today = date.today()
+    tasks = []
+    for i in range(size):
+        start = today - timedelta(days=i % 60)
+        tasks.append(server.Task(
+            organization_id=org.id,
+            project_id=projects[i % len(projects)].id,
+            story_id=stories[i % len(stories)].id,
+            title=f"{WORDS[i % len(WORDS)].title()} task {i}",
+            description=f"Seeded task touching {WORDS[(i * 7) % len(WORDS)]} and {WORDS[(i * 3) % len(WORDS)]}",
+            assigned_to=members[i % len(members)].name if i % 5 else None,
+            start_date=start.isoformat(),
+            target_date=(start + timedelta(days=14)).isoformat(),
+            story_points=i % 8 or None,
+            priority=PRIORITIES[i % len(PRIORITIES)],
+            status=STATUSES[i % len(STATUSES)],
+            team=TEAMS[i % len(TEAMS)],
+            created_by="bench",
+            created_at=now - timedelta(minutes=i),
+        ).model_dump())
+    for start in range(0, len(tasks), 10000):
+        await db.tasks.insert_many(tasks[start:start + 10000])
+    comments = [
+        server.Comment(organization_id=org.id, task_id=tasks[i]["id"], user="Bench", text=f"Seeded comment {i}").model_dump()
+        for i in range(size // 5)
+    ]
+    if comments:
+        await db.comments.insert_many(comments)
+    history = [
+        server.ActionHistory(
+            organization_id=org.id, user="bench", action="updated", entity_type="task",
+            entity_id=tasks[i]["id"], entity_name=tasks[i]["title"], timestamp=now - timedelta(minutes=i)
+        ).model_dump()
+        for i in range(size)
+    ]
+    await db.action_history.insert_many(history)
+    await server.build_snapshots(org.id, today)
+
+    return {
+        "org_id": org.id,
+        "subdomain": org.subdomain,
+        "user_id": user.id,
+        "user_email": user.email,
+        "member_id": members[0].id,
+        "project_id": projects[0].id,
+        "story_id": stories[0].id,
+        "task_id": tasks[0]["id"],
+        "other_task_id": tasks[1]["id"],
+    }
+
+
+async def prepare(http: httpx.AsyncClient, kind: str, ids: dict, headers: dict) -> dict:
+    n = next(request_counter)
+    if kind == "attachment":
+        response = await http.post(
+            f"/tasks/{ids['task_id']}/attachments", headers=headers,
+            files={"file": (f"prepared-{n}.txt", f"prepared {n}".encode(), "text/plain")}
+        )
+        response.raise_for_status()
+        return {"attachment_id": response.json()["id"]}
+    if kind == "member":
+        response = await http.post("/team", headers=headers, json={"name": f"Leaver {n}", "email": f"leaver-{n}@bench.test", "role": "Developer"})
+        response.raise_for_status()
+        return {"member_id": response.json()["id"]}
+    raise ValueError(f"Unknown prepare step {kind}")
+
+
+async def bench_route(http: httpx.AsyncClient, method: str, route: str, options: dict, ids: dict,
+                      requests: int, concurrency: int, commands: dict, name: str) -> dict:
+    headers = {"X-Organization-Id": ids["org_id"], "X-User-Name": "Bench", **options.get("headers", {})}
+    total = min(requests, options.get("requests", requests))
+    plans = []
+    for _ in range(total + 1):
+        request_ids = {**ids, "n": next(request_counter)}
+        if "prepare" in options:
+            request_ids.update(await prepare(http, options["prepare"], ids, headers))
+        plans.append(request_ids)
+
+    async def call(request_ids: dict):
+        path = route.format(**{**request_ids, **options.get("path", {})})
+        return await http.request(
+            method, path,
+            json=fill(options.get("json"), request_ids),
+            params=fill(options.get("params"), request_ids),
+            files=options.get("files"),
+            headers=headers
+        )
+
+    # One untimed warm-up request fills caches the way steady traffic would
+    await call(plans.pop())
+    latencies = []
+    failures = 0
+    token = current_route.set(name)
+    commands[name] = 0
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal failures
+        while plans:
+            request_ids = plans.pop()
+            began = time.perf_counter()
+            response = await call(request_ids)
+            latencies.append((time.perf_counter() - began) * 1000)
+            failures += response.status_code >= 400
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    current_route.reset(token)
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rps": len(latencies) / elapsed if elapsed else float("nan"),
+        "commands": commands[name] / len(latencies),
+        "failed": failures,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    problems = []
+    if result["failed"]:
+        problems.append(f"{result['failed']} failed requests")
+    if baseline is None:
+        return problems
+    if result["commands"] > baseline["commands"] + 0.01:
+        problems.append(f"commands {baseline['commands']:.1f} -> {result['commands']:.1f}")
+    if result["p95"] > baseline["p95"] * (1 + tolerance) and result["p95"] - baseline["p95"] > min_delta:
+        problems.append(f"p95 {baseline['p95']:.2f} -> {result['p95']:.2f} ms")
+    return problems
+
+
+async def run(args) -> int:
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() and not args.save_baseline else {}
+    names = route_names()
+    covered = {f"/api{route}" for _, route, _ in ROUTES}
+    missing = {path for _, path in names} - covered - set(SKIPPED_ROUTES)
+    if missing:
+        print(f"Routes without a benchmark: {', '.join(sorted(missing))}")
+
+    commands = {}
+
+    def count_command(event):
+        name = current_route.get()
+        if name is not None:
+            commands[name] += 1
+
+    server.client.listeners.append(count_command)
+    await server.app.router.startup()
+    results = {}
+    regressions = []
+    failures = []
+    try:
+        # Handler errors come back as 500s and are counted in the fail column
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench/api") as http:
+            for size in args.sizes:
+                started = time.perf_counter()
+                ids = await seed_tenant(size)
+                print(f"\n{size} tasks (seeded in {time.perf_counter() - started:.1f}s), "
+                      f"{args.requests} requests per route, concurrency {args.concurrency}")
+                print(f"{'route':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'cmds':>5} {'fail':>4}  vs baseline")
+                results[str(size)] = {}
+                for method, route, options in ROUTES:
+                    name = names[(method, f"/api{route}")]
+                    if args.routes and not any(r in name for r in args.routes):
+                        continue
+                    result = await bench_route(http, method, route, options, ids, args.requests, args.concurrency, commands, name)
+                    results[str(size)][name] = result
+                    problems = compare(result, baseline.get(str(size), {}).get(name), args.tolerance, args.min_delta)
+                    regressions += [f"{size} {name}: {p}" for p in problems]
+                    if result["failed"]:
+                        failures.append(f"{size} {name}: {result['failed']} failed requests")
+                    print(f"{name:<32} {result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f} "
+                          f"{result['rps']:>8.1f} {result['commands']:>5.1f} {result['failed']:>4}  {'; '.join(problems) or 'ok'}")
+    finally:
+        await server.app.router.shutdown()
+
+    if args.save_baseline and failures:
+        print(f"\nBaseline not written, {len(failures)} route(s) failed requests:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("server").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark every API route against seeded tenants")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Tasks per seeded tenant")
+    parser.add_argument("--requests", type=int, default=30, help="Timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--routes", nargs="*", help="Only run handlers whose name contains one of these")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95 growth")
+    parser.add_argument("--min-delta", type=float, default=1.0, help="Ignore p95 growth below this many ms")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Password hashing benchmark
+
+Measures how a burst of bcrypt password checks affects the latency of other
+endpoints. While logins arrive at a fixed rate, a probe calls GET /api/ through
+httpx ASGITransport on its own fixed schedule; latency is measured from when
+each probe was due, so event loop stalls show up in it. Three modes run:
+
+- idle: no logins, the baseline probe latency
+- inline: bcrypt.checkpw called directly on the event loop
+- pool: server.verify_password, which runs on the bounded hashing thread pool
+  and answers 503 only to checks that wait longer than PASSWORD_HASH_TIMEOUT
+  for a worker (the "rejected/s" column)
+
+Only the hash check is exercised (login's user lookup needs a database), so
+no MongoDB is required. Run from the repo root:
+
+    python -m tests.benchmarks.bench_password_hashing [--rate 200] [--probe-rate 100] [--rounds 12]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+import bcrypt  # noqa: E402
+import httpx  # noqa: E402
+
+import passwords  # noqa: E402
+import server  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def check_inline(hashed: str) -> bool:
+    return bcrypt.checkpw(PASSWORD.encode(), hashed.encode())
+
+
+async def check_pool(hashed: str) -> bool:
+    return await server.verify_password(PASSWORD, hashed)
+
+
+async def at_rate(rate: float, stop: asyncio.Event, make_call):
+    """Start make_call(due) every 1/rate seconds until stopped, open loop"""
+    pending = set()
+    interval = 1 / rate
+    due = time.perf_counter()
+    while not stop.is_set():
+        task = asyncio.create_task(make_call(due))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        due += interval
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+    # Calls still queued (e.g. behind the hashing pool) are cancelled so the
+    # next mode starts clean
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_mode(check, hashed: str, rate: float, probe_rate: float, seconds: float) -> dict:
+    stop = asyncio.Event()
+    latencies = []
+    completed = []
+    rejected = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def probe(due: float):
+            response = await http.get("/api/")
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - due) * 1000)
+
+        async def login(due: float):
+            try:
+                await check(hashed)
+            except server.HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                rejected.append(time.perf_counter())
+                return
+            completed.append(time.perf_counter())
+
+        workers = [asyncio.create_task(at_rate(probe_rate, stop, probe))]
+        if check is not None:
+            workers.append(asyncio.create_task(at_rate(rate, stop, login)))
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*workers)
+    return {
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "probe_rps": len(latencies) / seconds,
+        "logins_rps": len(completed) / seconds,
+        "rejected_rps": len(rejected) / seconds,
+    }
+
+
+async def run(rate: float, probe_rate: float, rounds: int, seconds: float):
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+    print(f"bcrypt rounds={rounds}, login rate={rate:.0f}/s, pool workers={server.PASSWORD_HASH_WORKERS}, "
+          f"wait timeout={server.PASSWORD_HASH_TIMEOUT:.0f}s, {seconds:.0f}s per mode")
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'probe req/s':>12} {'logins/s':>9} {'rejected/s':>11}")
+    for mode, check in (("idle", None), ("inline", check_inline), ("pool", check_pool)):
+        result = await run_mode(check, hashed, rate, probe_rate, seconds)
+        print(f"{mode:>8} {result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f} "
+              f"{result['probe_rps']:>12.1f} {result['logins_rps']:>9.1f} {result['rejected_rps']:>11.1f}")
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark endpoint latency during a login burst")
+    parser.add_argument("--rate", type=float, default=200, help="Login attempts per second")
+    parser.add_argument("--probe-rate", type=float, default=100, help="Probe requests per second")
+    parser.add_argument("--rounds", type=int, default=passwords.BCRYPT_ROUNDS, help="bcrypt work factor")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each mode")
+    args = parser.parse_args()
+    asyncio.run(run(args.rate, args.probe_rate, args.rounds, args.seconds))
+    server.password_executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
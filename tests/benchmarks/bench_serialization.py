@@ -0,0 +1,111 @@
+"""
+List serialization benchmark
+
+Compares the two ways /api/tasks can turn stored documents into a response body:
+
+- validated: FastAPI's response_model path (validate every row against
+  List[Task], serialize, then encode with the stdlib JSON encoder)
+- fast: the FAST_LIST_RESPONSES path (encode stored documents with orjson)
+
+Only serialization is measured, so no database is needed. Run from the repo root:
+
+    python -m tests.benchmarks.bench_serialization [--sizes 100 1000 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+import server  # noqa: E402
+
+
+def make_tasks(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "organization_id": "bench-org",
+            "project_id": "bench-project",
+            "story_id": None,
+            "title": f"Task {i}",
+            "description": "Benchmark task description " * 4,
+            "attachments": [],
+            "comment_count": i % 4,
+            "assigned_to": f"member-{i % 25}",
+            "start_date": "2024-01-01",
+            "end_date": None,
+            "target_date": "2024-02-01",
+            "story_points": i % 8,
+            "priority": "Medium",
+            "type": "Task",
+            "status": "TODO",
+            "team": "Development",
+            "linked_tasks": [],
+            "created_by": "bench",
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def tasks_route():
+    for route in server.app.routes:
+        if getattr(route, "path", None) == "/api/tasks" and "GET" in route.methods:
+            return route
+    raise RuntimeError("GET /api/tasks route not found")
+
+
+async def validated(field, docs: list) -> bytes:
+    content = await serialize_response(field=field, response_content=docs, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast(field, docs: list) -> bytes:
+    return ORJSONResponse(docs).body
+
+
+async def measure(render, field, docs: list, min_seconds: float) -> float:
+    iterations = 0
+    started = time.perf_counter()
+    while True:
+        await render(field, docs)
+        iterations += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return iterations / elapsed
+
+
+async def run(sizes: list, min_seconds: float):
+    field = tasks_route().secure_cloned_response_field
+    print(f"{'tasks':>8} {'validated req/s':>16} {'fast req/s':>12} {'speedup':>8}")
+    for size in sizes:
+        docs = make_tasks(size)
+        slow_rps = await measure(validated, field, docs, min_seconds)
+        fast_rps = await measure(fast, field, docs, min_seconds)
+        print(f"{size:>8} {slow_rps:>16.1f} {fast_rps:>12.1f} {fast_rps / slow_rps:>7.1f}x")
+
+
+def main():
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Minimum time per measurement")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
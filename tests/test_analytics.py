@@ -0,0 +1,91 @@
+"""
+Analytics snapshot tests
+
+Builds burndown snapshots on the embedded memory backend and checks the
+scheduler's analytics_snapshot_* metrics. No MongoDB server is needed.
+
+    python -m pytest tests/test_analytics.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_analytics')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import server  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG_ID = "org-analytics"
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_analytics"])
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def task(n: int, **fields) -> dict:
+    return server.Task(id=f"task-{n}", organization_id=ORG_ID, project_id="project", title=f"Task {n}", description="", **fields).model_dump()
+
+
+def test_scheduler_run_exports_metrics(memory_db):
+    registry = MetricsRegistry()
+    scheduler = server.SnapshotScheduler(3600, registry)
+
+    async def scenario():
+        await server.db.organizations.insert_one({"id": ORG_ID})
+        await server.db.tasks.insert_many([task(1), task(2, status="DONE")])
+        return await scheduler.run_once()
+
+    assert asyncio.run(scenario()) == 1
+    metrics = samples(registry.render())
+    assert metrics["analytics_snapshot_runs_total"] == "1"
+    assert metrics["analytics_snapshots_written_total"] == "1"
+    assert float(metrics["analytics_snapshot_last_run_timestamp_seconds"]) > 0
+    assert metrics["analytics_snapshot_failures_total"] == "0"
+
+
+async def first_snapshot_for_a_past_day() -> dict:
+    now = datetime.now(timezone.utc)
+    day = (now - timedelta(days=3)).date()
+    created = now - timedelta(days=4)
+    await server.db.tasks.insert_many([
+        task(1, status="DONE", story_points=2, created_at=created),
+        task(2, status="IN_PROGRESS", story_points=5, created_at=created),
+        task(3, status="TODO", story_points=1, created_at=created),
+        # Created after the day, so absent from it
+        task(4, status="TODO", story_points=8, created_at=now - timedelta(days=1)),
+    ])
+    history = [
+        ("task-1", "status_changed", {"status": "IN_PROGRESS", "old_status": "TODO"}, 2),
+        ("task-1", "status_changed", {"status": "DONE", "old_status": "IN_PROGRESS"}, 1),
+        ("task-2", "updated", {"story_points": 5, "old_story_points": 3}, 2),
+    ]
+    for entity_id, action, details, days_ago in history:
+        entry = server.action_entry(ORG_ID, "Tester", action, "task", entity_id, entity_id, details)
+        await server.db.action_history.insert_one({**entry, "timestamp": now - timedelta(days=days_ago)})
+
+    assert await server.build_snapshots(ORG_ID, day) == 1
+    return await server.db.analytics_snapshots.find_one({"day": day.isoformat()}, {"_id": 0, "counts": 1, "points": 1})
+
+
+def test_first_snapshot_of_a_past_day_uses_that_days_statuses(memory_db):
+    assert asyncio.run(first_snapshot_for_a_past_day()) == {
+        "counts": {"TODO": 2, "IN_PROGRESS": 1},
+        "points": {"TODO": 3, "IN_PROGRESS": 3},
+    }
@@ -0,0 +1,126 @@
+"""
+Attachment tests
+
+Uploads and downloads attachments through the API on the embedded memory
+backend and checks the download headers. No MongoDB server is needed.
+
+    python -m pytest tests/test_attachments.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_attachments')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+HEADERS = {"X-Organization-Id": "org-attachments", "X-User-Name": "Tester"}
+
+
+@pytest.fixture
+def memory_db():
+    original = server.client, server.db
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_attachments"]
+    asyncio.run(server.ensure_indexes())
+    yield
+    server.client, server.db = original
+
+
+async def download_name(filename: str) -> str:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created = await http.post("/tasks", json={"project_id": "project", "title": "Files", "description": ""}, headers=HEADERS)
+        task_id = created.json()["id"]
+        uploaded = await http.post(f"/tasks/{task_id}/attachments", files={"file": (filename, b"contents", "text/plain")}, headers=HEADERS)
+        assert uploaded.status_code == 200, uploaded.text
+        downloaded = await http.get(f"/tasks/{task_id}/attachments/{uploaded.json()['id']}", headers=HEADERS)
+    assert downloaded.content == b"contents"
+    return downloaded.headers["Content-Disposition"]
+
+
+@pytest.mark.parametrize("filename, header", [
+    ("report.pdf", "attachment; filename=\"report.pdf\"; filename*=UTF-8''report.pdf"),
+    ("Q1; final.txt", "attachment; filename=\"Q1_ final.txt\"; filename*=UTF-8''Q1%3B%20final.txt"),
+    ("résumé.txt", "attachment; filename=\"r_sum_.txt\"; filename*=UTF-8''r%C3%A9sum%C3%A9.txt"),
+    ("../../etc/passwd", "attachment; filename=\"passwd\"; filename*=UTF-8''passwd"),
+])
+def test_download_names_are_sanitised_and_encoded(memory_db, filename, header):
+    assert asyncio.run(download_name(filename)) == header
+
+
+def test_header_breaking_characters_never_reach_the_header():
+    # httpx escapes these in multipart names, so call the helper directly
+    assert server.content_disposition('Q1 "final"\r\n.txt') == (
+        "attachment; filename=\"Q1 _final_.txt\"; filename*=UTF-8''Q1%20%22final%22.txt"
+    )
+
+
+@pytest.fixture
+def blobs(memory_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "blob_store", server.BlobStore(tmp_path))
+    return server.blob_store
+
+
+async def retain(data: bytes) -> str:
+    staged, digest = await server.blob_store.stage_bytes(data)
+    await server.retain_blob(staged, digest, len(data), "text/plain")
+    return digest
+
+
+async def shared_blob_lifecycle() -> list:
+    digest = await retain(b"shared")
+    await retain(b"shared")
+    states = []
+    for _ in range(2):
+        await server.release_blob(digest)
+        states.append((server.blob_store.path_for(digest).exists(), await server.db.blobs.count_documents({})))
+    return states
+
+
+def test_blob_is_removed_with_its_last_reference(blobs):
+    assert asyncio.run(shared_blob_lifecycle()) == [(True, 1), (False, 0)]
+    assert list((blobs.root / "tmp").iterdir()) == []
+
+
+async def retain_during_release(monkeypatch) -> tuple:
+    digest = await retain(b"contested")
+    delete = server.db.blobs.find_one_and_delete
+
+    # An upload of the same bytes lands after the release moved the file aside
+    async def retain_first(*args, **kwargs):
+        await retain(b"contested")
+        return await delete(*args, **kwargs)
+
+    monkeypatch.setattr(server.db.blobs, "find_one_and_delete", retain_first)
+    await server.release_blob(digest)
+    blob = await server.db.blobs.find_one({"sha256": digest})
+    return server.blob_store.path_for(digest).read_bytes(), blob["ref_count"]
+
+
+def test_retain_racing_a_release_keeps_the_file(blobs, monkeypatch):
+    assert asyncio.run(retain_during_release(monkeypatch)) == (b"contested", 1)
+    assert list((blobs.root / "tmp").iterdir()) == []
+
+
+async def retain_after_file_loss() -> bytes:
+    digest = await retain(b"restored")
+    # A release elsewhere removed the file while this record still counts
+    server.blob_store.path_for(digest).unlink()
+    await retain(b"restored")
+    return server.blob_store.path_for(digest).read_bytes()
+
+
+def test_retain_rewrites_a_missing_file(blobs):
+    assert asyncio.run(retain_after_file_loss()) == b"restored"
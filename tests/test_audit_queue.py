@@ -0,0 +1,88 @@
+"""
+Audit queue tests
+
+Checks that audit entries are written synchronously unless batching is
+opted in, and that the batched queue reports its depth, outcomes and flush
+latency through the metrics registry. Runs on the embedded memory backend,
+so no MongoDB server is needed.
+
+    python -m pytest tests/test_audit_queue.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_audit')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import server  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_audit"])
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def entry(n: int) -> dict:
+    return server.action_entry("org-audit", "Tester", "created", "task", f"task-{n}", f"Task {n}")
+
+
+def test_strict_is_the_default_and_writes_before_returning(memory_db):
+    async def scenario():
+        await server.log_action("org-audit", "Tester", "created", "task", "task-1", "Task 1")
+        return await server.db.action_history.count_documents({})
+
+    assert server.AUDIT_MODE == "strict"
+    assert asyncio.run(scenario()) == 1
+
+
+def test_batched_queue_exports_outcomes_and_flush_latency(memory_db):
+    registry = MetricsRegistry()
+    queue = server.AuditQueue(10, 0.01, 100, 1.0, registry)
+
+    async def scenario():
+        queue.start()
+        for n in range(3):
+            await queue.put(entry(n))
+        await queue.drain()
+        return await server.db.action_history.count_documents({})
+
+    assert asyncio.run(scenario()) == 3
+    metrics = samples(registry.render())
+    assert metrics['audit_entries_total{outcome="enqueued"}'] == "3"
+    assert metrics['audit_entries_total{outcome="written"}'] == "3"
+    assert metrics["audit_queue_depth"] == "0"
+    assert metrics["audit_queue_capacity"] == "100"
+    assert int(metrics["audit_flush_duration_seconds_count"]) >= 1
+
+
+def test_full_queue_drops_and_reports_its_depth(memory_db):
+    registry = MetricsRegistry()
+    queue = server.AuditQueue(10, 0.01, 1, 0.01, registry)
+
+    async def scenario():
+        # No worker draining it, so the second entry finds the queue full
+        queue._queue = asyncio.Queue(maxsize=1)
+        await queue.put(entry(1))
+        await queue.put(entry(2))
+
+    asyncio.run(scenario())
+    metrics = samples(registry.render())
+    assert metrics['audit_entries_total{outcome="enqueued"}'] == "1"
+    assert metrics['audit_entries_total{outcome="dropped"}'] == "1"
+    assert metrics["audit_queue_depth"] == "1"
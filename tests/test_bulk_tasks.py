@@ -0,0 +1,135 @@
+"""
+Bulk task endpoint tests
+
+POST and PATCH /tasks/bulk validate a batch, apply it with one bulk_write
+and audit it with one insert. These check the per-item results, that a
+bulk edit records the same audit entry as the equivalent PATCH /tasks/{id},
+and that the command count does not grow with the batch. Runs on the
+embedded memory backend, so no MongoDB server is needed.
+
+    python -m pytest tests/test_bulk_tasks.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_bulk')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-bulk"
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester"}
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_bulk"])
+
+
+def new_task(n: int) -> dict:
+    return {"project_id": "p1", "title": f"Task {n}", "description": ""}
+
+
+async def commands_for(http: httpx.AsyncClient, method: str, path: str, body: dict) -> tuple:
+    events = []
+    server.client.listeners.append(events.append)
+    response = await http.request(method, path, json=body, headers=HEADERS)
+    server.client.listeners.remove(events.append)
+    assert response.status_code == 200, response.text
+    return response.json(), sorted((event.collection, event.command_name) for event in events)
+
+
+async def batch_commands(size: int) -> tuple:
+    audited = await server.db.action_history.count_documents({})
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created, create_commands = await commands_for(http, "POST", "/tasks/bulk", {"tasks": [new_task(n) for n in range(size)]})
+        ids = [result["id"] for result in created["results"]]
+        updated, update_commands = await commands_for(http, "PATCH", "/tasks/bulk", {"tasks": [{"id": task_id, "status": "DONE"} for task_id in ids]})
+    assert created["created"] == updated["updated"] == size
+    assert await server.db.action_history.count_documents({}) == audited + 2 * size
+    return create_commands, update_commands
+
+
+def test_command_count_does_not_grow_with_the_batch(memory_db):
+    assert asyncio.run(batch_commands(2)) == asyncio.run(batch_commands(50))
+
+
+async def mixed_update() -> dict:
+    foreign = server.Task(organization_id="other-org", project_id="p1", title="Foreign", description="").model_dump()
+    await server.db.tasks.insert_one(foreign)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created = (await http.post("/tasks/bulk", json={"tasks": [new_task(0), new_task(1)]}, headers=HEADERS)).json()
+        first, second = (result["id"] for result in created["results"])
+        response = await http.patch("/tasks/bulk", json={"tasks": [
+            {"id": first, "status": "IN_PROGRESS"},
+            {"id": second, "assigned_to": "Ada"},
+            {"id": first, "priority": "High"},
+            {"id": second},
+            {"id": foreign["id"], "status": "DONE"},
+            {"id": "missing", "status": "DONE"},
+        ]}, headers=HEADERS)
+    return response.json()
+
+
+def test_update_reports_each_item(memory_db):
+    body = asyncio.run(mixed_update())
+    assert (body["updated"], body["failed"]) == (2, 4)
+    assert [(r["status"], r.get("action") or r.get("error")) for r in body["results"]] == [
+        ("updated", "status_changed"),
+        ("updated", "assigned"),
+        ("error", "Duplicate task in batch"),
+        ("error", "Duplicate task in batch"),
+        ("error", "Task not found"),
+        ("error", "Task not found"),
+    ]
+
+
+async def single_and_bulk_edits() -> tuple:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created = (await http.post("/tasks/bulk", json={"tasks": [{**new_task(0), "story_points": 3}, {**new_task(1), "story_points": 3}]}, headers=HEADERS)).json()
+        single, bulk = (result["id"] for result in created["results"])
+        edit = {"status": "DONE", "story_points": 5}
+        await http.patch(f"/tasks/{single}", json=edit, headers=HEADERS)
+        await http.patch("/tasks/bulk", json={"tasks": [{"id": bulk, **edit}]}, headers=HEADERS)
+        stored = {task["id"]: task for task in await server.db.tasks.find({}, {"_id": 0}).to_list(None)}
+    entries = {}
+    for entry in await server.db.action_history.find({"action": {"$ne": "created"}}, {"_id": 0}).to_list(None):
+        details = {k: v for k, v in entry["details"].items() if k != "updated_at"}
+        entries[entry["entity_id"]] = (entry["action"], details)
+    return entries[single], entries[bulk], stored[single], stored[bulk]
+
+
+def test_bulk_edit_matches_a_single_edit(memory_db):
+    single_entry, bulk_entry, single_task, bulk_task = asyncio.run(single_and_bulk_edits())
+    assert single_entry == bulk_entry == (
+        "status_changed", {"status": "DONE", "story_points": 5, "old_status": "TODO", "old_story_points": 3}
+    )
+    for field in ("status", "story_points", "version"):
+        assert single_task[field] == bulk_task[field]
+
+
+async def oversized_batch() -> int:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        response = await http.post("/tasks/bulk", json={"tasks": [new_task(n) for n in range(server.BULK_MAX_ITEMS + 1)]}, headers=HEADERS)
+    return response.status_code
+
+
+def test_batches_over_the_limit_are_rejected(memory_db):
+    assert asyncio.run(oversized_batch()) == 422
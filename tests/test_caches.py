@@ -0,0 +1,49 @@
+"""
+In-process cache tests
+
+Checks TTLCache expiry and eviction and the cache_* series it exports
+through the metrics registry. No MongoDB server is needed.
+
+    python -m pytest tests/test_caches.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_caches')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import server  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_cache_exports_lookups_evictions_and_size():
+    registry = MetricsRegistry()
+    cache = server.TTLCache("orgs", 2, 60, registry)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" is now least recently used, so "c" evicts it
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    cache.set("d", 4, ttl=-1)
+
+    metrics = samples(registry.render())
+    assert metrics['cache_lookups_total{cache="orgs",result="hit"}'] == "1"
+    assert metrics['cache_lookups_total{cache="orgs",result="miss"}'] == "2"
+    assert metrics['cache_evictions_total{cache="orgs"}'] == "2"
+    assert metrics['cache_entries{cache="orgs"}'] == "2"
+    assert metrics['cache_max_entries{cache="orgs"}'] == "2"
+
+    # An expired entry is a miss and leaves the cache
+    assert cache.get("d") is None
+    assert samples(registry.render())['cache_entries{cache="orgs"}'] == "1"
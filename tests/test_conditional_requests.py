@@ -0,0 +1,112 @@
+"""
+Conditional request tests
+
+Checks that the ETag served for a task round-trips as If-None-Match on GET
+and as If-Match on PATCH, what a revalidation costs, and that detail ETags
+follow their own document, on the embedded memory backend. No MongoDB server
+is needed.
+
+    python -m pytest tests/test_conditional_requests.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_conditional')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+HEADERS = {"X-Organization-Id": "org-conditional", "X-User-Name": "Tester"}
+
+
+@pytest.fixture
+def memory_db():
+    original = server.client, server.db
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_conditional"]
+    asyncio.run(server.ensure_indexes())
+    yield
+    server.client, server.db = original
+
+
+async def etag_round_trip() -> dict:
+    statuses = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created = await http.post("/tasks", json={"project_id": "project", "title": "Board", "description": ""}, headers=HEADERS)
+        task_id = created.json()["id"]
+        etag = (await http.get(f"/tasks/{task_id}", headers=HEADERS)).headers["ETag"]
+        statuses["unchanged"] = (await http.get(f"/tasks/{task_id}", headers={**HEADERS, "If-None-Match": etag})).status_code
+
+        edited = await http.patch(f"/tasks/{task_id}", json={"status": "IN_PROGRESS"}, headers={**HEADERS, "If-Match": etag})
+        statuses["edit"] = edited.status_code
+        statuses["stale_edit"] = (await http.patch(f"/tasks/{task_id}", json={"status": "DONE"}, headers={**HEADERS, "If-Match": etag})).status_code
+
+        await http.post(f"/tasks/{task_id}/comments", json={"task_id": task_id, "user": "Tester", "text": "Hi"}, headers=HEADERS)
+        statuses["after_comment"] = (await http.get(f"/tasks/{task_id}", headers={**HEADERS, "If-None-Match": edited.headers["ETag"]})).status_code
+    return statuses
+
+
+def test_task_etag_round_trips_through_if_match(memory_db):
+    assert asyncio.run(etag_round_trip()) == {
+        "unchanged": 304,
+        "edit": 200,
+        "stale_edit": 412,
+        "after_comment": 200,
+    }
+
+
+async def task_revalidation_commands() -> tuple:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        created = await http.post("/tasks", json={"project_id": "project", "title": "Board", "description": ""}, headers=HEADERS)
+        task_id = created.json()["id"]
+        etag = (await http.get(f"/tasks/{task_id}", headers=HEADERS)).headers["ETag"]
+        events = []
+        server.client.listeners.append(events.append)
+        response = await http.get(f"/tasks/{task_id}", headers={**HEADERS, "If-None-Match": etag})
+    return response.status_code, [(event.collection, event.command_name) for event in events]
+
+
+def test_task_revalidation_costs_one_command(memory_db):
+    assert asyncio.run(task_revalidation_commands()) == (304, [("tasks", "find")])
+
+
+async def story_etags() -> dict:
+    statuses = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        story_ids = []
+        for title in ("First", "Second"):
+            created = await http.post("/stories", json={"project_id": "project", "title": title, "description": ""}, headers=HEADERS)
+            story_ids.append(created.json()["id"])
+        first, second = story_ids
+        etag = (await http.get(f"/stories/{first}", headers=HEADERS)).headers["ETag"]
+        statuses["versions_written_by_reads"] = await server.db.collection_versions.count_documents({}) + \
+            await server.db.document_versions.count_documents({})
+
+        await http.patch(f"/stories/{second}", json={"title": "Second, edited"}, headers=HEADERS)
+        statuses["after_other_edit"] = (await http.get(f"/stories/{first}", headers={**HEADERS, "If-None-Match": etag})).status_code
+        await http.patch(f"/stories/{first}", json={"title": "First, edited"}, headers=HEADERS)
+        statuses["after_own_edit"] = (await http.get(f"/stories/{first}", headers={**HEADERS, "If-None-Match": etag})).status_code
+    return statuses
+
+
+def test_story_etag_only_changes_with_the_story(memory_db):
+    assert asyncio.run(story_etags()) == {
+        # Only create_story's collection stamp exists; reads add none
+        "versions_written_by_reads": 1,
+        "after_other_edit": 304,
+        "after_own_edit": 200,
+    }
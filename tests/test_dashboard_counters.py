@@ -0,0 +1,118 @@
+"""
+Dashboard counter tests
+
+With DASHBOARD_COUNTERS on, every create, update and delete handler adjusts
+the organization's counters document; these check the counters agree with a
+recount after each kind of write, and that reconciling never loses a bump
+that lands while it counts. Runs on the embedded memory backend, so no
+MongoDB server is needed.
+
+    python -m pytest tests/test_dashboard_counters.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_counters')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-counters"
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester"}
+COUNTED = ("projects", "stories", "tasks", "team_members", "status", "priority")
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_counters"])
+    monkeypatch.setattr(server, "DASHBOARD_COUNTERS_ENABLED", True)
+
+
+async def stored_counts() -> dict:
+    doc = await server.db.dashboard_counters.find_one({"organization_id": ORG}, {"_id": 0})
+    return {key: {k: v for k, v in doc[key].items() if v} if isinstance(doc[key], dict) else doc[key] for key in COUNTED}
+
+
+async def recount() -> dict:
+    return {key: value for key, value in (await server.compute_dashboard_counts(ORG)).items() if key in COUNTED}
+
+
+async def counters_after_each_write() -> list:
+    checks = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+
+        async def check(step: str, response: httpx.Response):
+            assert response.status_code == 200, f"{step}: {response.text}"
+            checks.append((step, await stored_counts(), await recount()))
+            return response.json()
+
+        # Seeds the counters document
+        await check("stats", await http.get("/dashboard/stats", headers=HEADERS))
+        project = await check("create_project", await http.post("/projects", json={"name": "Board", "description": ""}, headers=HEADERS))
+        story = await check("create_story", await http.post("/stories", json={"project_id": project["id"], "title": "Login", "description": ""}, headers=HEADERS))
+        task = await check("create_task", await http.post("/tasks", json={"project_id": project["id"], "story_id": story["id"], "title": "Form", "description": ""}, headers=HEADERS))
+        await check("bulk_create_tasks", await http.post("/tasks/bulk", json={"tasks": [
+            {"project_id": project["id"], "title": "Bulk", "description": "", "priority": "High"},
+            {"project_id": project["id"], "title": "Bulk", "description": "", "status": "DONE"},
+        ]}, headers=HEADERS))
+        await check("update_task", await http.patch(f"/tasks/{task['id']}", json={"status": "IN_PROGRESS"}, headers=HEADERS))
+        await check("bulk_update_tasks", await http.patch("/tasks/bulk", json={"tasks": [{"id": task["id"], "priority": "Critical", "status": "DONE"}]}, headers=HEADERS))
+        member = await check("create_team_member", await http.post("/team", json={"name": "Ada", "email": "ada@example.test", "role": "Developer"}, headers=HEADERS))
+        await check("delete_team_member", await http.delete(f"/team/{member['id']}", headers=HEADERS))
+    return checks
+
+
+def test_counters_match_a_recount_after_every_write(memory_db):
+    for step, stored, counted in asyncio.run(counters_after_each_write()):
+        assert stored == counted, step
+
+
+async def reconcile_with_writes(writes: int) -> tuple:
+    await server.db.dashboard_counters.insert_one({"organization_id": ORG, "tasks": 99, "reconciled_at": None})
+    compute = server.compute_dashboard_counts
+    landed = []
+
+    # A task is created (and its bump applied) after each count is taken
+    async def count_then_write(org_id):
+        counts = await compute(org_id)
+        if len(landed) < writes:
+            task = server.Task(organization_id=ORG, project_id="p1", title="Late", description="").model_dump()
+            await server.db.tasks.insert_one(task)
+            await server.bump_dashboard_counters(ORG, {"tasks": 1, "status.TODO": 1, "priority.Medium": 1})
+            landed.append(task["id"])
+        return counts
+
+    server.compute_dashboard_counts = count_then_write
+    try:
+        _, stored = await server.reconcile_dashboard_counters(ORG)
+    finally:
+        server.compute_dashboard_counts = compute
+    return stored, await server.db.dashboard_counters.find_one({"organization_id": ORG}, {"_id": 0})
+
+
+def test_reconcile_recounts_when_a_write_lands_mid_count(memory_db):
+    stored, doc = asyncio.run(reconcile_with_writes(1))
+    assert stored
+    assert {key: doc[key] for key in COUNTED} == asyncio.run(recount())
+    assert doc["tasks"] == 1
+
+
+def test_reconcile_reports_a_busy_organization_without_overwriting(memory_db):
+    stored, doc = asyncio.run(reconcile_with_writes(server.DASHBOARD_RECONCILE_ATTEMPTS))
+    assert not stored
+    # Every bump still landed on the document it found
+    assert doc["tasks"] == 99 + server.DASHBOARD_RECONCILE_ATTEMPTS
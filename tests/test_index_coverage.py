@@ -0,0 +1,135 @@
+"""
+Index coverage tests
+
+Runs the query plan scenario against the embedded memory backend, records
+the filter and sort of every read and write each handler issues, and checks
+each one against the index registry in backend/indexes.py. A query counts as
+served when some index's leading key is constrained by the filter or leads
+its sort, the shape MongoDB's planner needs to avoid a COLLSCAN; $or needs
+every branch served and $text needs a text index whose prefix the filter
+pins. This catches a handler that outgrows the registry without a MongoDB
+server; tests/test_query_plans.py confirms the plans against a real one.
+
+    python -m pytest tests/test_index_coverage.py
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from pymongo import TEXT
+
+from tests.test_query_plans import SCENARIO, fill
+
+import server  # noqa: E402
+from indexes import INDEXES  # noqa: E402
+import storage  # noqa: E402
+from storage import MemoryClient, MemoryCollection  # noqa: E402
+
+def conjuncts(query: dict):
+    for field, condition in query.items():
+        if field == "$and":
+            for clause in condition:
+                yield from conjuncts(clause)
+        else:
+            yield field, condition
+
+
+def served_by(keys: list, query: dict, sort: list) -> bool:
+    fields = dict(conjuncts(query))
+    if "$text" in fields:
+        if not any(direction == TEXT for _, direction in keys):
+            return False
+        prefix = [field for field, direction in keys if direction != TEXT][:1]
+        return all(field in fields for field in prefix)
+    if any(direction == TEXT for _, direction in keys):
+        return False
+    leading = keys[0][0]
+    return leading in fields or bool(sort) and sort[0][0] == leading
+
+
+def is_served(collection: str, query: dict, sort: list) -> bool:
+    key_lists = [[("_id", 1)]] + [list(index.document["key"].items()) for index in INDEXES.get(collection, [])]
+    if any(served_by(keys, query, sort) for keys in key_lists):
+        return True
+    branches = dict(conjuncts(query)).get("$or")
+    return bool(branches) and all(is_served(collection, branch, []) for branch in branches)
+
+
+class QueryLog:
+    def __init__(self):
+        self.current = None
+        self.queries = {}
+
+    def record(self, collection: str, query: dict, sort):
+        if self.current:
+            self.queries.setdefault(self.current, []).append((collection, query, list(sort or [])))
+
+
+async def run_scenario(log: QueryLog):
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_index_coverage"]
+    await server.ensure_indexes()
+
+    ids = {}
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        for name, method, route, options in SCENARIO:
+            headers = {"X-Organization-Id": ids.get("org_id", "null"), "X-User-Name": "Index Tester", **options.get("headers", {})}
+            path = route.format(**{**ids, **options.get("path", {})})
+            log.current = name
+            response = await http.request(
+                method, path,
+                json=fill(options.get("json"), ids),
+                params=fill(options.get("params"), ids),
+                files=options.get("files"),
+                headers=headers
+            )
+            log.current = None
+            if "save" in options:
+                assert response.status_code == 200, f"{name}: {response.status_code} {response.text}"
+                ids[options["save"]] = response.json()["id"]
+
+
+@pytest.fixture(scope="module")
+def recorded_queries():
+    log = QueryLog()
+    matching = MemoryCollection._matching
+
+    def recording(self, query, sort=None, *args, **kwargs):
+        log.record(self.name, query, sort)
+        return matching(self, query, sort, *args, **kwargs)
+
+    run_source = storage.run_source
+
+    # Pipelines led by $match go through _matching; any other pipeline reads
+    # the whole collection, ordered only by a leading $sort
+    def recording_source(collection, pipeline):
+        if not pipeline or "$match" not in pipeline[0]:
+            sort = list(pipeline[0]["$sort"].items()) if pipeline and "$sort" in pipeline[0] else []
+            log.record(collection.name, {}, sort)
+        return run_source(collection, pipeline)
+
+    original = server.client, server.db
+    MemoryCollection._matching, storage.run_source = recording, recording_source
+    try:
+        asyncio.run(run_scenario(log))
+    finally:
+        MemoryCollection._matching, storage.run_source = matching, run_source
+        server.client, server.db = original
+    return log.queries
+
+
+def test_registry_indexes_are_well_formed():
+    for collection, indexes in INDEXES.items():
+        names = [index.document["name"] for index in indexes]
+        assert len(names) == len(set(names)), f"{collection} declares an index twice"
+
+
+@pytest.mark.parametrize("name", [step[0] for step in SCENARIO])
+def test_handler_queries_are_served_by_the_registry(recorded_queries, name):
+    unserved = [
+        (collection, query, sort) for collection, query, sort in recorded_queries.get(name, [])
+        if not is_served(collection, query, sort)
+    ]
+    assert not unserved, f"{name} issues queries no index in indexes.py serves: {unserved}"
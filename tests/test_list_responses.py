@@ -0,0 +1,86 @@
+"""
+List response tests
+
+List endpoints skip response_model validation on the fast path. These check
+that a row from a list endpoint is byte-for-byte what the matching detail
+route returns, including for documents written before a field existed or
+still carrying fields the API no longer exposes. Runs on the embedded
+memory backend, so no MongoDB server is needed.
+
+    python -m pytest tests/test_list_responses.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_list_responses')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-lists"
+CREATED = datetime(2024, 1, 8, 9, 30, 15, 250000, tzinfo=timezone.utc)
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester", "X-User-Role": "SuperAdmin"}
+
+# Stored documents as an older release wrote them: fields since added are
+# missing, and fields since dropped from the API are still there. Fields
+# with a default_factory (ids, timestamps) were always written at creation.
+LEGACY_DOCS = {
+    "organizations": {"id": ORG, "name": "Acme", "subdomain": "acme", "logo_content_type": "image/png"},
+    "users": {"id": "u1", "organization_id": ORG, "name": "Ada", "email": "ada@example.test", "password": "hash", "temp_password": "secret"},
+    "projects": {"id": "p1", "organization_id": ORG, "name": "Web", "description": "", "legacy_owner": "Ada"},
+    "stories": {"id": "s1", "organization_id": ORG, "project_id": "p1", "title": "Login", "description": ""},
+    "tasks": {"id": "t1", "organization_id": ORG, "project_id": "p1", "title": "Form", "description": "", "updated_at": CREATED, "comments": [{"text": "embedded"}]},
+    "team_members": {"id": "m1", "organization_id": ORG, "name": "Ada", "email": "ada@example.test", "role": "Developer", "slack": "@ada"},
+}
+
+ROUTES = [
+    ("organizations", "/organizations", "/organizations/{id}"),
+    ("users", "/users", "/users/{id}"),
+    ("projects", "/projects", "/projects/{id}"),
+    ("stories", "/stories", "/stories/{id}"),
+    ("tasks", "/tasks", "/tasks/{id}"),
+    ("team_members", "/team", "/team/{id}"),
+]
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_list_responses"])
+    server.org_cache.invalidate()
+
+
+async def list_and_detail(collection: str, list_path: str, detail_path: str) -> tuple:
+    doc = LEGACY_DOCS[collection]
+    await server.db[collection].insert_one({**doc, "created_at": CREATED})
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        listed = await http.get(list_path, headers=HEADERS)
+        detail = await http.get(detail_path.format(id=doc["id"]), headers=HEADERS)
+    assert listed.status_code == detail.status_code == 200, (listed.text, detail.text)
+    return listed.json(), detail.json()
+
+
+@pytest.mark.parametrize("collection, list_path, detail_path", ROUTES)
+def test_list_rows_match_detail_payloads(memory_db, collection, list_path, detail_path):
+    rows, detail = asyncio.run(list_and_detail(collection, list_path, detail_path))
+    assert rows == [detail]
+    assert detail["created_at"] == "2024-01-08T09:30:15.250000Z"
+
+
+def test_users_never_expose_passwords(memory_db):
+    rows, detail = asyncio.run(list_and_detail("users", "/users", "/users/{id}"))
+    assert not {"password", "temp_password"} & (set(rows[0]) | set(detail))
@@ -0,0 +1,146 @@
+"""
+Metrics tests
+
+Checks the /api/metrics output against the Prometheus text exposition
+format, the cumulative histogram buckets, and what the HTTP middleware and
+the database command listener record. Runs on the embedded memory backend,
+so no MongoDB server is needed.
+
+    python -m pytest tests/test_metrics.py
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_metrics')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from metrics import CommandMetrics, MetricsRegistry  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+HEADERS = {"X-Organization-Id": "org-metrics", "X-User-Name": "Tester"}
+
+NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\["\\n])*"'
+VALUE = r"(?:[+-]?Inf|NaN|-?[0-9]+(?:\.[0-9]+)?(?:e[+-]?[0-9]+)?)"
+SAMPLE = re.compile(rf"^({NAME})(?:\{{{LABEL}(?:,{LABEL})*\}})? {VALUE}$")
+HELP = re.compile(rf"^# HELP ({NAME}) .*$")
+TYPE = re.compile(rf"^# TYPE ({NAME}) (counter|gauge|histogram|untyped)$")
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def assert_exposition_format(text: str):
+    assert text.endswith("\n")
+    declared = {}
+    for line in text.splitlines():
+        if HELP.match(line):
+            continue
+        if match := TYPE.match(line):
+            assert match.group(1) not in declared, f"{match.group(1)} declared twice"
+            declared[match.group(1)] = match.group(2)
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"not a valid sample line: {line!r}"
+        name = match.group(1)
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in declared else name
+        assert family in declared, f"{name} has no TYPE line before it"
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("job_seconds", "Job time", ("job",), buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.5, 2.0):
+        histogram.observe(("sync",), value)
+    text = registry.render()
+    assert_exposition_format(text)
+    assert [line for line in text.splitlines() if line.startswith("job_seconds")] == [
+        'job_seconds_bucket{job="sync",le="0.1"} 2',
+        'job_seconds_bucket{job="sync",le="0.5"} 4',
+        'job_seconds_bucket{job="sync",le="1.0"} 4',
+        'job_seconds_bucket{job="sync",le="+Inf"} 5',
+        'job_seconds_sum{job="sync"} 2.95',
+        'job_seconds_count{job="sync"} 5',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("odd_total", 'Labels with "quotes"', ("value",)).inc(('a "b"\\c\nd',))
+    text = registry.render()
+    assert_exposition_format(text)
+    assert 'odd_total{value="a \\"b\\"\\\\c\\nd"} 1' in text.splitlines()
+
+
+def test_a_name_keeps_its_type():
+    registry = MetricsRegistry()
+    assert registry.counter("jobs_total", "Jobs") is registry.counter("jobs_total", "Jobs")
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Jobs")
+
+
+def test_command_listener_labels_by_collection():
+    registry = MetricsRegistry()
+    listener = CommandMetrics(registry)
+    find = SimpleNamespace(connection_id=1, request_id=7, command_name="find", command={"find": "tasks"})
+    listener.started(find)
+    listener.succeeded(SimpleNamespace(connection_id=1, request_id=7, command_name="find", duration_micros=1500))
+    more = SimpleNamespace(connection_id=1, request_id=8, command_name="getMore", command={"getMore": 1, "collection": "tasks"})
+    listener.started(more)
+    listener.failed(SimpleNamespace(connection_id=1, request_id=8, command_name="getMore", duration_micros=200))
+    metrics = samples(registry.render())
+    assert metrics['mongodb_command_duration_seconds_bucket{collection="tasks",command="find",le="0.0025"}'] == "1"
+    assert metrics['mongodb_command_duration_seconds_bucket{collection="tasks",command="find",le="0.001"}'] == "0"
+    assert metrics['mongodb_command_failures_total{collection="tasks",command="getMore"}'] == "1"
+    assert 'mongodb_command_failures_total{collection="tasks",command="find"}' not in metrics
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    client.listeners.append(server.command_metrics.observe_event)
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_metrics"])
+
+
+async def scrape_after_requests() -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        await http.get("/tasks", headers=HEADERS)
+        await http.get("/no/such/route", headers=HEADERS)
+        return await http.get("/metrics")
+
+
+def metric(text: str, name: str) -> float:
+    return float(samples(text).get(name, 0))
+
+
+def test_metrics_endpoint_reports_routes_and_commands(memory_db):
+    before = server.metrics.render()
+    response = asyncio.run(scrape_after_requests())
+    assert response.headers["content-type"] == server.metrics.content_type
+    assert_exposition_format(response.text)
+    counted = [
+        'http_request_duration_seconds_count{method="GET",route="/api/tasks"}',
+        'http_requests_total{method="GET",route="/api/tasks",status="200"}',
+        'http_requests_total{method="GET",route="unmatched",status="404"}',
+        'mongodb_command_duration_seconds_count{collection="tasks",command="find"}',
+    ]
+    for name in counted:
+        assert metric(response.text, name) > metric(before, name), name
+    # The scrape itself is the only request in flight
+    assert samples(response.text)["http_requests_in_flight"] == "1"
@@ -0,0 +1,62 @@
+"""
+Logo migration tests
+
+Runs scripts/migrate_logos.py against the embedded memory backend and checks
+that a logo is only left in the blob store when an organization points at
+it. No MongoDB server is needed.
+
+    python -m pytest tests/test_migrate_logos.py
+"""
+
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_migrate_logos')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import migrate_logos  # noqa: E402
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+LOGO = base64.b64encode(b"\x89PNG logo").decode()
+
+
+@pytest.fixture
+def memory_db(monkeypatch, tmp_path):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_migrate_logos"])
+    monkeypatch.setattr(server, "blob_store", server.BlobStore(tmp_path))
+
+
+async def migrated(edit_during_migration: bool, monkeypatch) -> tuple:
+    await server.db.organizations.insert_one({"id": "org-1", "name": "Acme", "logo": LOGO})
+    if edit_during_migration:
+        update = server.db.organizations.update_one
+
+        # Someone uploads a new logo between the script's read and its write
+        async def edited_first(*args, **kwargs):
+            await update({"id": "org-1"}, {"$set": {"logo": "/api/organizations/org-1/logo?v=new"}})
+            return await update(*args, **kwargs)
+
+        monkeypatch.setattr(server.db.organizations, "update_one", edited_first)
+    await migrate_logos.migrate()
+    org = await server.db.organizations.find_one({"id": "org-1"})
+    return org["logo"].startswith("/api/"), await server.db.blobs.count_documents({})
+
+
+def test_inline_logo_moves_to_the_blob_store(memory_db, monkeypatch):
+    assert asyncio.run(migrated(False, monkeypatch)) == (True, 1)
+
+
+def test_logo_changed_mid_migration_releases_its_blob(memory_db, monkeypatch):
+    assert asyncio.run(migrated(True, monkeypatch)) == (True, 0)
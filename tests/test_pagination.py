@@ -0,0 +1,242 @@
+"""
+Cursor pagination tests
+
+Pages through list endpoints on the embedded memory backend, following
+X-Next-Cursor until it runs out, and checks every page still honours the
+endpoint's own filter, including the weekly summary's per-team cursors. No
+MongoDB server is needed.
+
+    python -m pytest tests/test_pagination.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_pagination')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG_ID = "org-pagination"
+
+
+async def collect_pages(path: str, params: dict, tasks: list) -> tuple:
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_pagination"]
+    await server.ensure_indexes()
+    await server.db.tasks.insert_many(tasks)
+
+    pages = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        cursor = None
+        while True:
+            response = await http.get(path, params={**params, **({"cursor": cursor} if cursor else {})},
+                                      headers={"X-Organization-Id": ORG_ID})
+            assert response.status_code == 200, response.text
+            pages.append([task["id"] for task in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+
+@pytest.fixture
+def memory_db():
+    original = server.client, server.db
+    yield
+    server.client, server.db = original
+
+
+def test_weekly_tasks_cursor_pages_keep_the_week_window(memory_db):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tasks = []
+    # Every other task falls outside 2024-W02 (Jan 8-14)
+    for n in range(9):
+        in_week = n % 2 == 0
+        tasks.append(server.Task(
+            id=f"task-{n}",
+            organization_id=ORG_ID,
+            project_id="project",
+            title=f"Task {n}",
+            description="",
+            start_date="2024-01-10" if in_week else "2024-02-10",
+            created_at=created + timedelta(minutes=n)
+        ).model_dump())
+    expected = [task["id"] for task in tasks if task["start_date"] == "2024-01-10"]
+
+    pages = asyncio.run(collect_pages("/dashboard/weekly/tasks", {"week": "2024-W02", "team": "Development", "limit": 2}, tasks))
+
+    assert len(pages) > 1
+    assert [task_id for page in pages for task_id in page] == expected
+
+
+async def follow_weekly_summary(tasks: list) -> dict:
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_pagination"]
+    await server.ensure_indexes()
+    await server.db.tasks.insert_many(tasks)
+
+    teams = {}
+    headers = {"X-Organization-Id": ORG_ID}
+    window = {"week": "2024-W02"}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        summary = await http.get("/dashboard/weekly", params={**window, "tasks_limit": 2}, headers=headers)
+        assert summary.status_code == 200, summary.text
+        for team in summary.json()["teams"]:
+            pages = [team["tasks"]]
+            cursor = team["next_cursor"]
+            while cursor:
+                response = await http.get("/dashboard/weekly/tasks", params={**window, "team": team["team"], "limit": 2, "cursor": cursor}, headers=headers)
+                assert response.status_code == 200, response.text
+                pages.append(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+            teams[team["team"]] = (team["total"], [task for page in pages for task in page])
+    return teams
+
+
+def test_weekly_summary_groups_page_to_their_totals(memory_db):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tasks = []
+    for n in range(7):
+        task = server.Task(
+            id=f"task-{n}",
+            organization_id=ORG_ID,
+            project_id="project",
+            title=f"Task {n}",
+            description="",
+            team="Design" if n % 3 == 0 else "Development",
+            assigned_to="Ada" if n % 2 else None,
+            start_date="2024-01-10",
+            created_at=created + timedelta(minutes=n)
+        ).model_dump()
+        if n in (4, 5):
+            # Written before tasks had a team; summarised under Development
+            del task["team"]
+        tasks.append(task)
+
+    teams = asyncio.run(follow_weekly_summary(tasks))
+
+    assert sorted(teams) == ["Design", "Development"]
+    for name, (total, paged) in teams.items():
+        expected = [task["id"] for task in tasks if task.get("team", "Development") == name]
+        assert [task["id"] for task in paged] == expected
+        assert total == len(expected)
+        assert {task["assigned_to"] for task in paged} == {"Ada", "Unassigned"}
+
+
+def keyed_docs(make, count: int = 11, key: str = "created_at") -> list:
+    # Ids are inserted out of order and three rows share each sort key value,
+    # so the id tie-break decides the order within a group
+    created = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    docs = []
+    for n in range(count):
+        doc = make(n, f"row-{(n * 7) % count:02d}")
+        doc[key] = created + timedelta(minutes=n // 3)
+        docs.append(doc)
+    return docs
+
+
+def other_org(n: int) -> str:
+    # Every fourth row belongs to another tenant and must never show up
+    return "org-other" if n % 4 == 3 else ORG_ID
+
+
+KEYSET_CASES = {
+    "users": ("/users", "users", {}, lambda n, i: server.User(
+        id=i, organization_id=other_org(n), name=f"User {n}", email=f"user-{n}@example.test", password="x").model_dump()),
+    "projects": ("/projects", "projects", {}, lambda n, i: server.Project(
+        id=i, organization_id=other_org(n), name=f"Project {n}", description="").model_dump()),
+    "stories": ("/stories", "stories", {"project_id": "p1"}, lambda n, i: server.Story(
+        id=i, organization_id=other_org(n), project_id=f"p{n % 2}", title=f"Story {n}", description="").model_dump()),
+    "tasks": ("/tasks", "tasks", {"status": "DONE"}, lambda n, i: server.Task(
+        id=i, organization_id=other_org(n), project_id="project", title=f"Task {n}", description="",
+        status="DONE" if n % 3 else "TODO").model_dump()),
+    "team": ("/team", "team_members", {}, lambda n, i: server.TeamMember(
+        id=i, organization_id=other_org(n), name=f"Member {n}", email=f"member-{n}@example.test", role="Developer").model_dump()),
+    "comments": ("/tasks/task-1/comments", "comments", {}, lambda n, i: server.Comment(
+        id=i, organization_id=ORG_ID, task_id="task-1" if n % 4 != 3 else "task-2", user="Ada", text=f"Comment {n}").model_dump()),
+}
+
+
+def expected_ids(docs: list, params: dict, key: str = "created_at", descending: bool = False) -> list:
+    kept = [
+        doc for doc in docs
+        if doc["organization_id"] == ORG_ID and doc.get("task_id", "task-1") == "task-1"
+        and all(doc[field] == value for field, value in params.items())
+    ]
+    kept.sort(key=lambda doc: (doc[key], doc["id"]), reverse=descending)
+    return [doc["id"] for doc in kept]
+
+
+async def page_collection(path: str, collection: str, params: dict, docs: list, limit: int) -> list:
+    client = MemoryClient()
+    server.client, server.db = client, client["taskflow_pagination"]
+    await server.ensure_indexes()
+    await server.db[collection].insert_many(docs)
+
+    pages = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        cursor = None
+        while True:
+            response = await http.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})},
+                                      headers={"X-Organization-Id": ORG_ID})
+            assert response.status_code == 200, response.text
+            pages.append([row["id"] for row in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+
+@pytest.mark.parametrize("name", sorted(KEYSET_CASES))
+def test_keyset_pages_cover_the_filtered_list_once(memory_db, name):
+    path, collection, params, make = KEYSET_CASES[name]
+    docs = keyed_docs(make)
+    expected = expected_ids(docs, params)
+
+    pages = asyncio.run(page_collection(path, collection, params, docs, 2))
+
+    assert all(len(page) == 2 for page in pages[:-1])
+    assert [row_id for page in pages for row_id in page] == expected
+
+
+def test_history_pages_newest_first(memory_db):
+    docs = keyed_docs(lambda n, i: server.ActionHistory(
+        id=i, organization_id=other_org(n), user="Ada", action="updated",
+        entity_type="task" if n % 2 else "story", entity_id=f"entity-{n}", entity_name=f"Entity {n}"
+    ).model_dump(), key="timestamp")
+    params = {"entity_type": "task"}
+
+    pages = asyncio.run(page_collection("/history", "action_history", params, docs, 2))
+
+    assert len(pages) > 1
+    assert [row_id for page in pages for row_id in page] == expected_ids(docs, params, key="timestamp", descending=True)
+
+
+def test_default_page_is_bounded(memory_db):
+    docs = keyed_docs(lambda n, i: server.Project(id=i, organization_id=ORG_ID, name=f"Project {n}", description="").model_dump(),
+                      count=server.DEFAULT_PAGE_SIZE + 1)
+
+    async def first_page():
+        client = MemoryClient()
+        server.client, server.db = client, client["taskflow_pagination"]
+        await server.db.projects.insert_many(docs)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+            return await http.get("/projects", headers={"X-Organization-Id": ORG_ID})
+
+    response = asyncio.run(first_page())
+    assert len(response.json()) == server.DEFAULT_PAGE_SIZE < server.MAX_PAGE_SIZE
+    assert response.headers["X-Next-Cursor"]
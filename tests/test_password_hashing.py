@@ -0,0 +1,133 @@
+"""
+Password hashing pool tests
+
+Logins queue for a hashing worker instead of being turned away; only a wait
+longer than PASSWORD_HASH_TIMEOUT answers 503. Runs on the embedded memory
+backend, so no MongoDB server is needed.
+
+    python -m pytest tests/test_password_hashing.py
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import bcrypt
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_hashing')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+import passwords  # noqa: E402
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_hashing"])
+    # Stored hashes match the configured cost, so logins do not rehash
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 4)
+
+
+async def login_burst(count: int) -> list:
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    await server.db.users.insert_one(server.User(name="Burst", email="burst@example.test", password=hashed).model_dump())
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        responses = await asyncio.gather(*[
+            http.post("/auth/login", json={"email": "burst@example.test", "password": PASSWORD})
+            for _ in range(count)
+        ])
+    return [response.status_code for response in responses]
+
+
+def test_login_burst_larger_than_the_pool_succeeds(memory_db, monkeypatch):
+    monkeypatch.setattr(server, "PASSWORD_HASH_WORKERS", 2)
+    assert asyncio.run(login_burst(20)) == [200] * 20
+
+
+async def blocked_check() -> tuple:
+    # One slot, held by a slow job, so the check has to wait for it
+    slow = asyncio.create_task(server.run_password_job(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+    try:
+        await server.verify_password(PASSWORD, "not-a-hash")
+    except HTTPException as e:
+        rejected = e
+    await slow
+    return rejected.status_code, rejected.headers
+
+
+def test_wait_past_the_timeout_answers_503(monkeypatch):
+    monkeypatch.setattr(server, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(server, "PASSWORD_HASH_TIMEOUT", 0.1)
+    status, headers = asyncio.run(blocked_check())
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+
+
+
+LEGACY_HASH = hashlib.sha256(PASSWORD.encode()).hexdigest()
+
+
+async def legacy_login(is_active: bool) -> tuple:
+    user = server.User(name="Legacy", email="legacy@example.test", password=LEGACY_HASH, is_active=is_active).model_dump()
+    await server.db.users.insert_one(user)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        response = await http.post("/auth/login", json={"email": "legacy@example.test", "password": PASSWORD})
+    stored = await server.db.users.find_one({"id": user["id"]})
+    return response.status_code, stored["password"]
+
+
+def test_login_upgrades_a_legacy_hash(memory_db):
+    status, stored = asyncio.run(legacy_login(is_active=True))
+    assert status == 200
+    assert stored.startswith("$2")
+
+
+def test_inactive_login_is_refused_before_any_upgrade(memory_db):
+    assert asyncio.run(legacy_login(is_active=False)) == (403, LEGACY_HASH)
+
+
+async def upgrade_with_busy_pool() -> str:
+    user = server.User(name="Legacy", email="legacy@example.test", password=LEGACY_HASH).model_dump()
+    await server.db.users.insert_one(user)
+    # Every worker taken, so the upgrade is skipped instead of queued
+    server.password_slots[asyncio.get_running_loop()] = asyncio.Semaphore(0)
+    await server.upgrade_password_hash(user, PASSWORD)
+    return (await server.db.users.find_one({"id": user["id"]}))["password"]
+
+
+def test_upgrade_is_skipped_while_the_pool_is_busy(memory_db):
+    assert asyncio.run(upgrade_with_busy_pool()) == LEGACY_HASH
+
+
+async def register() -> tuple:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        response = await http.post("/auth/register", json={"name": "New", "email": "new@example.test", "password": PASSWORD})
+    stored = await server.db.users.find_one({"email": "new@example.test"})
+    return response, stored
+
+
+def test_register_stores_a_bcrypt_hash_and_returns_no_password(memory_db):
+    response, stored = asyncio.run(register())
+    assert response.status_code == 200, response.text
+    assert "password" not in response.json()
+    assert response.json()["id"] == stored["id"]
+    assert stored["password"].startswith("$2")
@@ -0,0 +1,127 @@
+"""
+Query count regression tests
+
+Drives the query plan scenario against the embedded memory backend with
+DEBUG headers on and reads each response's X-DB-Commands count. A handler
+issuing more database commands than its budget below fails its test, so an
+added round trip (or an N+1 loop) is caught before it ships. When a change
+needs the extra command on purpose, raise that handler's budget in the same
+change. No MongoDB server is needed.
+
+    python -m pytest tests/test_query_budget.py
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from tests.test_query_plans import SCENARIO, fill
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+# Database commands each scenario step may issue. Streaming responses only
+# count the commands run before their body starts.
+COMMAND_BUDGETS = {
+    "create_organization": 5,
+    "get_organizations": 1,
+    "get_organization": 1,
+    "update_organization": 1,
+    "get_organization_logo": 0,
+    "get_org_admin_credentials": 1,
+    "reset_org_admin_password": 2,
+    "register": 2,
+    "login": 1,
+    "create_user": 3,
+    "get_users": 1,
+    "get_user": 1,
+    "update_user": 2,
+    "create_project": 3,
+    "get_projects": 2,
+    "get_project": 2,
+    "create_story": 3,
+    "get_stories": 2,
+    "get_story": 2,
+    "update_story": 4,
+    "create_task": 3,
+    "bulk_create_tasks": 3,
+    "bulk_update_tasks": 4,
+    "get_tasks": 2,
+    "get_task": 1,
+    "update_task": 3,
+    "add_comment": 4,
+    "get_comments": 1,
+    "upload_attachment": 4,
+    "download_attachment": 1,
+    "delete_attachment": 6,
+    "create_team_member": 2,
+    "get_team_members": 1,
+    "get_team_member": 1,
+    "update_team_member": 2,
+    "create_department": 2,
+    "get_departments": 1,
+    "get_action_history": 1,
+    "export_collection": 0,
+    "get_master_data": 1,
+    "search": 2,
+    "get_dashboard_stats": 1,
+    "get_weekly_summary": 1,
+    "get_weekly_team_tasks": 1,
+    "get_burndown": 1,
+    "get_cumulative_flow": 1,
+    "get_team_performance": 1,
+    "delete_team_member": 3,
+}
+
+
+async def run_scenario() -> dict:
+    client = MemoryClient()
+    client.listeners.append(server.command_budget.observe_event)
+    server.client, server.db = client, client["taskflow_budget"]
+    await server.ensure_indexes()
+
+    ids = {}
+    counts = {}
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        for name, method, route, options in SCENARIO:
+            headers = {"X-Organization-Id": ids.get("org_id", "null"), "X-User-Name": "Budget Tester", **options.get("headers", {})}
+            path = route.format(**{**ids, **options.get("path", {})})
+            response = await http.request(
+                method, path,
+                json=fill(options.get("json"), ids),
+                params=fill(options.get("params"), ids),
+                files=options.get("files"),
+                headers=headers
+            )
+            count = response.headers.get("X-DB-Commands")
+            counts[name] = (int(count) if count is not None else None, response.status_code)
+            if "save" in options:
+                assert response.status_code == 200, f"{name}: {response.status_code} {response.text}"
+                ids[options["save"]] = response.json()["id"]
+    return counts
+
+
+@pytest.fixture(scope="module")
+def command_counts():
+    """X-DB-Commands per scenario step, with the status it came back with"""
+    original = server.client, server.db, server.command_budget.header
+    server.command_budget.header = True
+    try:
+        yield asyncio.run(run_scenario())
+    finally:
+        server.client, server.db, server.command_budget.header = original
+
+
+def test_every_step_has_a_budget():
+    assert {step[0] for step in SCENARIO} - set(COMMAND_BUDGETS) == set()
+
+
+@pytest.mark.parametrize("name", [step[0] for step in SCENARIO])
+def test_handler_stays_within_command_budget(command_counts, name):
+    count, status = command_counts[name]
+    assert status < 400, f"{name} failed with {status}"
+    assert count <= COMMAND_BUDGETS[name], (
+        f"{name} issues {count} database commands, budget {COMMAND_BUDGETS[name]}"
+    )
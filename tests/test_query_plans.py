@@ -0,0 +1,214 @@
+"""
+Query plan regression tests
+
+Drives every api_router handler against a scratch database that has the
+backend's index registry applied, records each query the handler sends, and
+runs it through explain(). Any COLLSCAN in a winning plan fails the handler's
+test. The plan tests need a MongoDB server at TEST_MONGO_URL (default
+mongodb://localhost:27017) and are skipped when none is reachable.
+
+    python -m pytest tests/test_query_plans.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+TEST_MONGO_URL = os.environ.get('TEST_MONGO_URL', 'mongodb://localhost:27017')
+TEST_DB_NAME = f"taskflow_plans_{uuid.uuid4().hex[:8]}"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', TEST_MONGO_URL)
+os.environ.setdefault('DB_NAME', TEST_DB_NAME)
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+
+def mongo_available():
+    try:
+        MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500).admin.command('ping')
+        return True
+    except PyMongoError:
+        return False
+
+
+requires_mongo = pytest.mark.skipif(not mongo_available(), reason="MongoDB server not reachable")
+
+import httpx  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import server  # noqa: E402
+
+SUPER_ADMIN = {"X-User-Role": "SuperAdmin"}
+LOGO = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUg=="
+
+# (name, method, route, body) in execution order. Route placeholders are filled
+# from ids saved by earlier steps; a "save" key names the id a step returns.
+SCENARIO = [
+    ("create_organization", "POST", "/organizations", {"json": {"name": "Plans", "subdomain": "plans", "admin_name": "Ada", "admin_email": "ada@plans.test", "logo": LOGO}, "headers": SUPER_ADMIN, "save": "org_id"}),
+    ("get_organizations", "GET", "/organizations", {"headers": SUPER_ADMIN}),
+    ("get_organization", "GET", "/organizations/{org_id}", {}),
+    ("update_organization", "PATCH", "/organizations/{org_id}", {"json": {"name": "Plans Inc"}, "headers": SUPER_ADMIN}),
+    ("get_organization_logo", "GET", "/organizations/{org_id}/logo", {}),
+    ("get_org_admin_credentials", "GET", "/organizations/{org_id}/admin", {"headers": SUPER_ADMIN}),
+    ("reset_org_admin_password", "POST", "/organizations/{org_id}/reset-password", {"headers": SUPER_ADMIN}),
+    ("register", "POST", "/auth/register", {"json": {"name": "Reg", "email": "reg@plans.test", "password": "secret"}}),
+    ("login", "POST", "/auth/login", {"json": {"email": "reg@plans.test", "password": "secret"}}),
+    ("create_user", "POST", "/users", {"json": {"name": "Dev", "email": "dev@plans.test", "password": "secret"}, "save": "user_id"}),
+    ("get_users", "GET", "/users", {}),
+    ("get_user", "GET", "/users/{user_id}", {}),
+    ("update_user", "PATCH", "/users/{user_id}", {"json": {"name": "Developer"}}),
+    ("create_project", "POST", "/projects", {"json": {"name": "Board", "description": "Main board"}, "save": "project_id"}),
+    ("get_projects", "GET", "/projects", {}),
+    ("get_project", "GET", "/projects/{project_id}", {}),
+    ("create_story", "POST", "/stories", {"json": {"project_id": "{project_id}", "title": "Login story", "description": "Users can log in"}, "save": "story_id"}),
+    ("get_stories", "GET", "/stories", {"params": {"project_id": "{project_id}"}}),
+    ("get_story", "GET", "/stories/{story_id}", {}),
+    ("update_story", "PATCH", "/stories/{story_id}", {"json": {"title": "Login and logout"}}),
+    ("create_task", "POST", "/tasks", {"json": {"project_id": "{project_id}", "story_id": "{story_id}", "title": "Build login", "description": "Login form", "story_points": 3, "start_date": "2024-01-02"}, "save": "task_id"}),
+    ("bulk_create_tasks", "POST", "/tasks/bulk", {"json": {"tasks": [{"project_id": "{project_id}", "title": "Bulk task", "description": "From bulk"}]}}),
+    ("bulk_update_tasks", "PATCH", "/tasks/bulk", {"json": {"tasks": [{"id": "{task_id}", "priority": "High"}]}}),
+    ("get_tasks", "GET", "/tasks", {"params": {"project_id": "{project_id}", "status": "TODO"}}),
+    ("get_task", "GET", "/tasks/{task_id}", {}),
+    ("update_task", "PATCH", "/tasks/{task_id}", {"json": {"status": "IN_PROGRESS"}}),
+    ("add_comment", "POST", "/tasks/{task_id}/comments", {"json": {"task_id": "{task_id}", "user": "Dev", "text": "On it"}}),
+    ("get_comments", "GET", "/tasks/{task_id}/comments", {}),
+    ("upload_attachment", "POST", "/tasks/{task_id}/attachments", {"files": {"file": ("notes.txt", b"plan notes", "text/plain")}, "save": "attachment_id"}),
+    ("download_attachment", "GET", "/tasks/{task_id}/attachments/{attachment_id}", {}),
+    ("delete_attachment", "DELETE", "/tasks/{task_id}/attachments/{attachment_id}", {}),
+    ("create_team_member", "POST", "/team", {"json": {"name": "Dev", "email": "dev@plans.test", "role": "Developer"}, "save": "member_id"}),
+    ("get_team_members", "GET", "/team", {}),
+    ("get_team_member", "GET", "/team/{member_id}", {}),
+    ("update_team_member", "PATCH", "/team/{member_id}", {"json": {"role": "Lead"}}),
+    ("create_department", "POST", "/departments", {"json": {"name": "Engineering", "description": "Builds things"}}),
+    ("get_departments", "GET", "/departments", {}),
+    ("get_action_history", "GET", "/history", {"params": {"entity_type": "task", "entity_id": "{task_id}"}}),
+    ("export_collection", "GET", "/export/{collection}", {"path": {"collection": "tasks"}, "params": {"project_id": "{project_id}"}}),
+    ("get_master_data", "GET", "/master/{kind}", {"path": {"kind": "statuses"}}),
+    ("search", "GET", "/search", {"params": {"q": "login", "project_id": "{project_id}"}}),
+    ("get_dashboard_stats", "GET", "/dashboard/stats", {}),
+    ("get_weekly_summary", "GET", "/dashboard/weekly", {"params": {"week": "2024-W01"}}),
+    ("get_weekly_team_tasks", "GET", "/dashboard/weekly/tasks", {"params": {"week": "2024-W01", "team": "Development"}}),
+    ("get_burndown", "GET", "/analytics/projects/{project_id}/burndown", {}),
+    ("get_cumulative_flow", "GET", "/analytics/projects/{project_id}/cumulative-flow", {}),
+    ("get_team_performance", "GET", "/dashboard/performance", {}),
+    ("delete_team_member", "DELETE", "/team/{member_id}", {}),
+]
+
+# Routes that issue no database queries of their own
+QUERYLESS_ROUTES = {
+    "/api/",
+    "/api/stream",
+    "/api/metrics",
+}
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+SESSION_FIELDS = {"$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "apiVersion"}
+
+
+class QueryRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.current = None
+        self.commands = {}
+
+    def started(self, event):
+        if self.current and event.command_name in EXPLAINABLE_COMMANDS:
+            command = {k: v for k, v in event.command.items() if k not in SESSION_FIELDS}
+            self.commands.setdefault(self.current, []).append(command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, ids) for v in value]
+    return value
+
+
+async def run_scenario(recorder):
+    client = AsyncIOMotorClient(TEST_MONGO_URL, tz_aware=True, event_listeners=[recorder])
+    server.client, server.db = client, client[TEST_DB_NAME]
+    await server.ensure_indexes()
+
+    ids = {}
+    # Handler errors come back as 500s; their queries are still worth checking
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        for name, method, route, options in SCENARIO:
+            headers = {"X-Organization-Id": ids.get("org_id", "null"), "X-User-Name": "Plan Tester", **options.get("headers", {})}
+            path = route.format(**{**ids, **options.get("path", {})})
+            recorder.current = name
+            response = await http.request(
+                method, path,
+                json=fill(options.get("json"), ids),
+                params=fill(options.get("params"), ids),
+                files=options.get("files"),
+                headers=headers
+            )
+            recorder.current = None
+            if "save" in options:
+                assert response.status_code == 200, f"{name}: {response.status_code} {response.text}"
+                ids[options["save"]] = response.json()["id"]
+
+
+def collscans(plan):
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            yield plan.get("filter", {})
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                yield from collscans(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from collscans(item)
+
+
+def explain_commands(command):
+    # explain takes one write statement at a time
+    if "updates" in command:
+        return [{**command, "updates": [statement]} for statement in command["updates"]]
+    if "deletes" in command:
+        return [{**command, "deletes": [statement]} for statement in command["deletes"]]
+    return [command]
+
+
+@pytest.fixture(scope="module")
+def recorded_queries():
+    recorder = QueryRecorder()
+    asyncio.run(run_scenario(recorder))
+    sync_client = MongoClient(TEST_MONGO_URL)
+    yield sync_client[TEST_DB_NAME], recorder.commands
+    sync_client.drop_database(TEST_DB_NAME)
+    sync_client.close()
+
+
+def test_scenario_covers_every_route():
+    routes = {route.path for route in server.api_router.routes}
+    covered = {f"/api{route}" for _, _, route, _ in SCENARIO}
+    assert routes - covered - QUERYLESS_ROUTES == set()
+
+
+@requires_mongo
+@pytest.mark.parametrize("name", [step[0] for step in SCENARIO])
+def test_handler_queries_use_indexes(recorded_queries, name):
+    database, commands = recorded_queries
+    scans = []
+    for command in commands.get(name, []):
+        for explainable in explain_commands(command):
+            plan = database.command({"explain": explainable, "verbosity": "queryPlanner"})
+            scans += [(explainable, scan_filter) for scan_filter in collscans(plan)]
+    assert not scans, f"{name} runs collection scans: {scans}"
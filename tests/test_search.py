@@ -0,0 +1,95 @@
+"""
+Search tests
+
+Runs /search against the text indexes on the embedded memory backend:
+ranking across tasks and stories, filters, highlighting, and paging through
+the X-Next-Cursor offset cursor up to SEARCH_MAX_OFFSET. No MongoDB server
+is needed.
+
+    python -m pytest tests/test_search.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_search')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-search"
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester"}
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_search"])
+    asyncio.run(server.ensure_indexes())
+    tasks = [
+        server.Task(organization_id=ORG, project_id="p1" if n % 2 else "p2", title=f"Login step {n}", description="",
+                    status="DONE" if n % 5 == 0 else "TODO").model_dump()
+        for n in range(45)
+    ]
+    tasks.append(server.Task(organization_id=ORG, project_id="p1", title="Billing", description="Fix the login redirect").model_dump())
+    tasks.append(server.Task(organization_id="other-org", project_id="p1", title="Login elsewhere", description="").model_dump())
+    asyncio.run(server.db.tasks.insert_many(tasks))
+    asyncio.run(server.db.stories.insert_one(server.Story(organization_id=ORG, project_id="p1", title="Login", description="").model_dump()))
+
+
+async def search(**params) -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        return await http.get("/search", params=params, headers=HEADERS)
+
+
+async def all_pages(**params) -> tuple:
+    pages = []
+    cursor = None
+    while True:
+        response = await search(**params, **({"cursor": cursor} if cursor else {}))
+        assert response.status_code == 200, response.text
+        pages.append(response.json()["results"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_cursor_pages_through_every_match_once(memory_db):
+    pages = asyncio.run(all_pages(q="login", limit=20))
+    assert [len(page) for page in pages] == [20, 20, 7]
+    ids = [row["id"] for page in pages for row in page]
+    assert len(ids) == len(set(ids)) == 47
+    # Title matches outrank the description-only match
+    assert pages[-1][-1]["title"] == "Billing"
+
+
+def test_filters_and_highlights(memory_db):
+    response = asyncio.run(search(q="login", project_id="p1", status="DONE"))
+    results = response.json()["results"]
+    assert {row["type"] for row in results} == {"task"}
+    assert {(row["project_id"], row["status"]) for row in results} == {("p1", "DONE")}
+    assert results[0]["highlights"][0]["field"] == "title"
+    assert results[0]["highlights"][0]["matches"] == [[0, 5]]
+
+
+def test_paging_stops_at_the_offset_cap(memory_db, monkeypatch):
+    monkeypatch.setattr(server, "SEARCH_MAX_OFFSET", 20)
+    pages = asyncio.run(all_pages(q="login", limit=10))
+    assert [len(page) for page in pages] == [10, 10, 10]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", server.encode_search_cursor(server.SEARCH_MAX_OFFSET + 1), server.encode_search_cursor(0)])
+def test_invalid_cursors_are_rejected(memory_db, cursor):
+    assert asyncio.run(search(q="login", cursor=cursor)).status_code == 400
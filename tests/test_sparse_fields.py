@@ -0,0 +1,92 @@
+"""
+Sparse fieldset tests
+
+?fields= on the task, story and user lists becomes a Mongo projection. These
+check the rows carry only the requested fields (plus the id and created_at
+the pagination cursor needs), that unknown or hidden fields are rejected,
+and that trimmed lists still page. Runs on the embedded memory backend, so
+no MongoDB server is needed.
+
+    python -m pytest tests/test_sparse_fields.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_fields')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-fields"
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester"}
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_fields"])
+    asyncio.run(server.db.tasks.insert_many([
+        server.Task(organization_id=ORG, project_id="p1", title=f"Task {n}", description="Long text " * 50,
+                    linked_tasks=["x"], priority="High").model_dump()
+        for n in range(5)
+    ]))
+    asyncio.run(server.db.stories.insert_one(server.Story(organization_id=ORG, project_id="p1", title="Story", description="Body").model_dump()))
+    asyncio.run(server.db.users.insert_one(server.User(name="Ada", email="ada@example.test", password="hash", organization_id=ORG).model_dump()))
+
+
+async def get(path: str, **params) -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        return await http.get(path, params=params, headers=HEADERS)
+
+
+@pytest.mark.parametrize("path, fields, expected", [
+    ("/tasks", "title,status, priority", {"id", "created_at", "title", "status", "priority"}),
+    ("/stories", "title", {"id", "created_at", "title"}),
+    ("/users", "name,role", {"id", "created_at", "name", "role"}),
+])
+def test_rows_carry_only_the_requested_fields(memory_db, path, fields, expected):
+    response = asyncio.run(get(path, fields=fields))
+    assert response.status_code == 200, response.text
+    assert {frozenset(row) for row in response.json()} == {frozenset(expected)}
+
+
+@pytest.mark.parametrize("path, fields", [
+    ("/tasks", "title,comments"),
+    ("/stories", "nonsense"),
+    ("/users", "name,password"),
+    ("/users", "temp_password"),
+])
+def test_unknown_and_hidden_fields_are_rejected(memory_db, path, fields):
+    response = asyncio.run(get(path, fields=fields))
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown fields")
+
+
+async def trimmed_pages() -> list:
+    titles = []
+    cursor = None
+    while True:
+        params = {"fields": "title", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await get("/tasks", **params)
+        titles += [row["title"] for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return titles
+
+
+def test_trimmed_lists_still_page(memory_db):
+    # Rows created together tie on created_at and page in id order
+    assert sorted(asyncio.run(trimmed_pages())) == [f"Task {n}" for n in range(5)]
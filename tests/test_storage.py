@@ -0,0 +1,264 @@
+"""
+Memory storage engine tests
+
+Exercises backend/storage.py directly: query and update operators, the
+aggregation stages server.py relies on, the text index behind /search,
+posting-list maintenance, command events and snapshot round trips. These
+pin the Motor behaviour the embedded backend stands in for, so a handler
+that passes its tests here behaves the same against MongoDB.
+
+    python -m pytest tests/test_storage.py
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+
+from pymongo import IndexModel, TEXT  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+from storage import MemoryClient  # noqa: E402
+
+TASKS = [
+    {"id": "t1", "org": "a", "status": "TODO", "points": 3, "tags": ["ui", "bug"], "owner": {"name": "Ada"}},
+    {"id": "t2", "org": "a", "status": "DONE", "points": 5, "tags": ["api"]},
+    {"id": "t3", "org": "a", "status": "TODO", "points": 8, "tags": []},
+    {"id": "t4", "org": "b", "status": "DONE", "points": None},
+]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def seeded(indexes: list = ()) -> "MemoryClient":
+    client = MemoryClient()
+    tasks = client["test"]["tasks"]
+    if indexes:
+        await tasks.create_indexes(list(indexes))
+    await tasks.insert_many([dict(task) for task in TASKS])
+    return client
+
+
+async def ids(filter: dict, indexes: list = ()) -> list:
+    client = await seeded(indexes)
+    return [doc["id"] for doc in await client["test"]["tasks"].find(filter).to_list(None)]
+
+
+@pytest.mark.parametrize("filter, expected", [
+    ({"status": "TODO"}, ["t1", "t3"]),
+    ({"status": {"$in": ["DONE", "BLOCKED"]}}, ["t2", "t4"]),
+    ({"status": {"$ne": "TODO"}}, ["t2", "t4"]),
+    ({"points": {"$gte": 5}}, ["t2", "t3"]),
+    ({"points": {"$lt": 5}}, ["t1"]),
+    ({"points": None}, ["t4"]),
+    ({"points": {"$exists": False}}, []),
+    ({"tags": "bug"}, ["t1"]),
+    ({"tags": {"$size": 0}}, ["t3"]),
+    ({"owner.name": "Ada"}, ["t1"]),
+    ({"id": {"$regex": "^t[12]$"}}, ["t1", "t2"]),
+    ({"$or": [{"org": "b"}, {"points": 8}]}, ["t3", "t4"]),
+    ({"$and": [{"org": "a"}, {"status": "TODO"}]}, ["t1", "t3"]),
+    ({"points": {"$not": {"$gt": 3}}}, ["t1", "t4"]),
+])
+def test_find_operators(filter, expected):
+    assert run(ids(filter)) == expected
+
+
+@pytest.mark.parametrize("filter", [
+    {"org": "a", "status": "TODO"},
+    {"org": {"$in": ["a", "b"]}, "status": "DONE"},
+    {"$and": [{"org": "a"}, {"status": {"$in": ["TODO"]}}]},
+])
+def test_indexed_reads_match_full_scans(filter):
+    index = IndexModel([("org", 1), ("status", 1)])
+    assert run(ids(filter, [index])) == run(ids(filter))
+
+
+async def find_after_writes() -> dict:
+    client = await seeded([IndexModel([("org", 1), ("status", 1)])])
+    tasks = client["test"]["tasks"]
+    # Build the postings, then move documents between keys
+    await tasks.find({"org": "a", "status": "TODO"}).to_list(None)
+    await tasks.update_one({"id": "t1"}, {"$set": {"status": "DONE"}})
+    await tasks.delete_one({"id": "t3"})
+    await tasks.insert_one({"id": "t5", "org": "a", "status": "TODO"})
+    return {
+        status: sorted(doc["id"] for doc in await tasks.find({"org": "a", "status": status}).to_list(None))
+        for status in ("TODO", "DONE")
+    }
+
+
+def test_postings_follow_updates_deletes_and_inserts():
+    assert run(find_after_writes()) == {"TODO": ["t5"], "DONE": ["t1", "t2"]}
+
+
+async def sorted_page() -> list:
+    client = await seeded()
+    cursor = client["test"]["tasks"].find({}, {"_id": 0, "id": 1}).sort([("points", -1), ("id", 1)]).skip(1).limit(2)
+    return [doc["id"] for doc in await cursor.to_list(None)]
+
+
+def test_sort_skip_limit_puts_nulls_last_descending():
+    assert run(sorted_page()) == ["t2", "t1"]
+
+
+async def updated() -> dict:
+    client = await seeded()
+    tasks = client["test"]["tasks"]
+    await tasks.update_one({"id": "t1"}, {"$inc": {"points": 2, "version": 1}, "$set": {"owner.name": "Grace"}})
+    await tasks.update_one({"id": "t1"}, {"$push": {"tags": {"$each": ["perf", "db"]}}, "$unset": {"status": ""}})
+    await tasks.update_one({"id": "t1"}, {"$pull": {"tags": "ui"}, "$addToSet": {"tags": "db"}})
+    await tasks.update_many({"org": "a"}, {"$set": {"archived": False}})
+    return await tasks.find_one({"id": "t1"}, {"_id": 0})
+
+
+def test_update_operators():
+    assert run(updated()) == {
+        "id": "t1", "org": "a", "points": 5, "version": 1, "archived": False,
+        "tags": ["bug", "perf", "db"], "owner": {"name": "Grace"},
+    }
+
+
+async def upserted() -> tuple:
+    client = MemoryClient()
+    counters = client["test"]["counters"]
+    first = await counters.update_one({"_id": "tasks:a"}, {"$inc": {"count": 1}, "$setOnInsert": {"org": "a"}}, upsert=True)
+    second = await counters.update_one({"_id": "tasks:a"}, {"$inc": {"count": 1}, "$setOnInsert": {"org": "z"}}, upsert=True)
+    returned = await counters.find_one_and_update({"_id": "tasks:a"}, {"$inc": {"count": 1}}, return_document=True)
+    return first.upserted_id, second.upserted_id, second.modified_count, returned
+
+
+def test_upsert_inserts_once_then_updates():
+    assert run(upserted()) == ("tasks:a", None, 1, {"_id": "tasks:a", "count": 3, "org": "a"})
+
+
+async def duplicate_insert():
+    client = MemoryClient()
+    users = client["test"]["users"]
+    await users.create_indexes([IndexModel([("email", 1)], unique=True)])
+    await users.insert_one({"email": "ada@example.test"})
+    await users.insert_one({"email": "ada@example.test"})
+
+
+def test_unique_index_rejects_duplicates():
+    with pytest.raises(DuplicateKeyError):
+        run(duplicate_insert())
+
+
+async def aggregated(pipeline: list) -> list:
+    client = await seeded()
+    await client["test"]["archive"].insert_one({"id": "old", "org": "a", "status": "DONE", "points": 1})
+    return await client["test"]["tasks"].aggregate(pipeline).to_list(None)
+
+
+def test_group_with_first_n_and_sum():
+    rows = run(aggregated([
+        {"$match": {"org": "a"}},
+        {"$sort": {"points": -1}},
+        {"$group": {
+            "_id": {"$ifNull": ["$status", "Unknown"]},
+            "count": {"$sum": 1},
+            "points": {"$sum": "$points"},
+            "top": {"$firstN": {"input": "$id", "n": 1}},
+        }},
+        {"$sort": {"_id": 1}},
+    ]))
+    assert rows == [
+        {"_id": "DONE", "count": 1, "points": 5, "top": ["t2"]},
+        {"_id": "TODO", "count": 2, "points": 11, "top": ["t3"]},
+    ]
+
+
+def test_facet_runs_each_branch_over_the_same_input():
+    rows = run(aggregated([
+        {"$match": {"org": "a"}},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "done": [{"$match": {"status": "DONE"}}, {"$project": {"_id": 0, "id": 1}}],
+        }},
+    ]))
+    assert rows == [{"total": [{"n": 3}], "done": [{"id": "t2"}]}]
+
+
+def test_union_with_appends_the_other_collection():
+    rows = run(aggregated([
+        {"$match": {"status": "DONE"}},
+        {"$unionWith": {"coll": "archive", "pipeline": [{"$match": {"org": "a"}}]}},
+        {"$project": {"_id": 0, "id": 1}},
+    ]))
+    assert rows == [{"id": "t2"}, {"id": "t4"}, {"id": "old"}]
+
+
+async def searched(search: str) -> list:
+    client = MemoryClient()
+    stories = client["test"]["stories"]
+    await stories.create_indexes([IndexModel([("title", TEXT), ("description", TEXT)], weights={"title": 10, "description": 2})])
+    await stories.insert_many([
+        {"id": "s1", "org": "a", "title": "Login page", "description": "Reset links"},
+        {"id": "s2", "org": "a", "title": "Reports", "description": "Export the login report"},
+        {"id": "s3", "org": "b", "title": "Login audit", "description": ""},
+        {"id": "s4", "org": "a", "title": "Billing", "description": "Invoices"},
+    ])
+    await stories.update_one({"id": "s4"}, {"$set": {"title": "Billing logins"}})
+    query = {"org": "a", "$text": {"$search": search}}
+    projection = {"_id": 0, "id": 1, "score": {"$meta": "textScore"}}
+    docs = await stories.find(query, projection).sort([("score", {"$meta": "textScore"})]).to_list(None)
+    return [doc["id"] for doc in docs]
+
+
+@pytest.mark.parametrize("search, expected", [
+    # Title hits outweigh description hits; stems match "logins"
+    ("login", ["s1", "s4", "s2"]),
+    ("login -reset", ["s4", "s2"]),
+    ('"login report"', ["s2"]),
+    ("invoices", ["s4"]),
+    ("payroll", []),
+])
+def test_text_search_scores_and_filters(search, expected):
+    assert run(searched(search)) == expected
+
+
+async def observed() -> list:
+    client = await seeded()
+    events = []
+    client.listeners.append(events.append)
+    tasks = client["test"]["tasks"]
+    await tasks.find_one({"id": "t1"})
+    await tasks.find({"org": "a"}).to_list(None)
+    await tasks.update_one({"id": "t1"}, {"$set": {"status": "DONE"}})
+    await tasks.aggregate([{"$match": {"org": "a"}}]).to_list(None)
+    return [(event.database_name, event.collection, event.command_name, event.succeeded) for event in events]
+
+
+def test_each_command_emits_one_event():
+    assert run(observed()) == [
+        ("test", "tasks", "find", True),
+        ("test", "tasks", "find", True),
+        ("test", "tasks", "update", True),
+        ("test", "tasks", "aggregate", True),
+    ]
+
+
+def test_snapshot_round_trip(tmp_path):
+    async def scenario():
+        client = await seeded()
+        client.snapshot_dir = tmp_path
+        await client["test"]["tasks"].update_one(
+            {"id": "t1"}, {"$set": {"created_at": datetime(2024, 1, 8, 9, 30, tzinfo=timezone.utc)}}
+        )
+        written = await client.snapshot()
+        unchanged = await client.snapshot()
+        original = await client["test"]["tasks"].find({}, {"_id": 0}).to_list(None)
+        reloaded = await MemoryClient(snapshot_dir=str(tmp_path))["test"]["tasks"].find({}, {"_id": 0}).to_list(None)
+        return written, unchanged, original, reloaded
+
+    written, unchanged, original, reloaded = run(scenario())
+    assert (written, unchanged) == (1, 0)
+    assert reloaded == original
+    assert reloaded[0]["created_at"] == datetime(2024, 1, 8, 9, 30, tzinfo=timezone.utc)
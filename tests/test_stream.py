@@ -0,0 +1,54 @@
+"""
+Task event stream tests
+
+Checks that a subscriber falling behind gets a single resync event, and that
+open streams and dropped events are exported through the metrics registry.
+No MongoDB server is needed.
+
+    python -m pytest tests/test_stream.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_stream')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import server  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_slow_subscriber_resyncs_and_drops_are_counted():
+    registry = MetricsRegistry()
+    broadcaster = server.Broadcaster(2, registry)
+
+    async def scenario():
+        slow = broadcaster.subscribe("org-a")
+        broadcaster.subscribe("org-a")
+        other = broadcaster.subscribe("org-b")
+        for n in range(3):
+            await broadcaster.publish(server.task_event("updated", "org-a", f"task-{n}", "Task", "Tester"))
+        opened = samples(registry.render())
+        broadcaster.unsubscribe(other)
+        broadcaster.unsubscribe(other)
+        return [slow.queue.get_nowait() for _ in range(slow.queue.qsize())], opened
+
+    events, opened = asyncio.run(scenario())
+    assert events == [{"type": "resync", "organization_id": "org-a"}]
+    assert opened["stream_subscribers"] == "3"
+    assert opened["stream_organizations"] == "2"
+    # Both org-a subscribers overflowed with two buffered events each
+    assert opened["stream_events_dropped_total"] == "4"
+
+    closed = samples(registry.render())
+    assert closed["stream_subscribers"] == "2"
+    assert closed["stream_organizations"] == "1"
@@ -0,0 +1,117 @@
+"""
+Team performance tests
+
+/dashboard/performance groups tasks by assignee in one aggregation and joins
+the team roster. These compare it with the per-member counting it replaced,
+including members with no tasks, assignees outside the team and members
+with more than the old 1000-task cap, and check it stays one command. Runs
+on the embedded memory backend, so no MongoDB server is needed.
+
+    python -m pytest tests/test_team_performance.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_performance')
+os.environ.setdefault('BLOB_STORAGE_DIR', tempfile.mkdtemp(prefix='taskflow_blobs_'))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from storage import MemoryClient  # noqa: E402
+
+ORG = "org-performance"
+HEADERS = {"X-Organization-Id": ORG, "X-User-Name": "Tester"}
+STATUSES = ["TODO", "IN_PROGRESS", "DONE", "DONE", "IN_REVIEW"]
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["taskflow_performance"])
+
+
+async def seed(members: list, assignments: dict):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    await server.db.team_members.insert_many([
+        server.TeamMember(organization_id=ORG, name=name, email=f"{n}@example.test", role="Developer", created_at=start + timedelta(days=n)).model_dump()
+        for n, name in enumerate(members)
+    ])
+    tasks = []
+    for assignee, count in assignments.items():
+        for n in range(count):
+            tasks.append(server.Task(
+                organization_id=ORG, project_id="p1", title=f"{assignee} {n}", description="",
+                assigned_to=assignee, status=STATUSES[n % len(STATUSES)], story_points=n % 4 or None,
+            ).model_dump())
+    await server.db.tasks.insert_many(tasks)
+    await server.db.tasks.insert_one(server.Task(organization_id="other-org", project_id="p9", title="Elsewhere", description="", assigned_to=members[0]).model_dump())
+
+
+# The per-member loop /dashboard/performance used to run, without its cap
+async def expected_performance() -> list:
+    performance = []
+    members = await server.db.team_members.find({"organization_id": ORG}, {"_id": 0}).sort("created_at", 1).to_list(None)
+    for member in members:
+        tasks = await server.db.tasks.find({"organization_id": ORG, "assigned_to": member["name"]}).to_list(None)
+        completed = sum(1 for t in tasks if t["status"] == "DONE")
+        performance.append({
+            "name": member["name"],
+            "email": member["email"],
+            "role": member["role"],
+            "total_tasks": len(tasks),
+            "completed_tasks": completed,
+            "in_progress_tasks": sum(1 for t in tasks if t["status"] == "IN_PROGRESS"),
+            "completion_rate": round((completed / len(tasks) * 100) if tasks else 0, 1),
+            "total_story_points": sum(t.get("story_points") or 0 for t in tasks),
+        })
+    return performance
+
+
+async def performance() -> tuple:
+    events = []
+    server.client.listeners.append(events.append)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api") as http:
+        response = await http.get("/dashboard/performance", headers=HEADERS)
+    server.client.listeners.remove(events.append)
+    assert response.status_code == 200, response.text
+    return response.json()["performance"], [(event.collection, event.command_name) for event in events]
+
+
+async def compared(members: list, assignments: dict) -> tuple:
+    await seed(members, assignments)
+    rows, commands = await performance()
+    return rows, await expected_performance(), commands
+
+
+def test_matches_per_member_counts(memory_db):
+    rows, expected, _ = asyncio.run(compared(
+        ["Ada", "Grace", "Linus", "Idle"],
+        {"Ada": 7, "Grace": 3, "Linus": 12, "Contractor": 4},
+    ))
+    assert rows == expected
+    assert [row["name"] for row in rows] == ["Ada", "Grace", "Linus", "Idle"]
+    assert rows[-1]["total_tasks"] == 0
+
+
+def test_counts_past_the_old_per_member_cap(memory_db):
+    rows, expected, _ = asyncio.run(compared(["Ada"], {"Ada": 1200}))
+    assert rows == expected
+    assert rows[0]["total_tasks"] == 1200
+
+
+def test_is_one_command_however_large_the_team(memory_db):
+    members = [f"Member {n}" for n in range(300)]
+    _, _, commands = asyncio.run(compared(members, {name: 2 for name in members}))
+    assert commands == [("tasks", "aggregate")]